@@ -0,0 +1,133 @@
+"""
+离线重分析API
+提交录制文件的批量重分析任务、查询任务状态
+"""
+
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, status
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from services.offline_analyzer import RecordingItem, get_offline_job_manager, resolve_recording_path
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter(prefix="/api/batch", tags=["Batch"])
+
+
+# ============================================================================
+# 请求/响应模型
+# ============================================================================
+
+
+class RecordingRequest(BaseModel):
+    """单个录制文件"""
+
+    media_path: str = Field(..., description="录制文件路径（OFFLINE_RECORDINGS_ROOT下的绝对路径，或相对于该目录的路径）")
+    session_id: str = Field(..., description="AI会话ID（检查点文件按此命名）")
+    exam_result_id: Optional[str] = Field(None, description="考试结果ID")
+    recorded_at: Optional[datetime] = Field(None, description="录制开始时间（UTC，默认当前时间）")
+
+
+class CreateBatchJobRequest(BaseModel):
+    """创建离线重分析任务请求"""
+
+    recordings: List[RecordingRequest] = Field(..., min_length=1, description="录制文件列表（按顺序处理）")
+    upload: bool = Field(default=False, description="完成后把聚合指标和文件信息写入后端API")
+    overwrite: bool = Field(default=True, description="覆盖会话已有的检查点文件")
+
+
+class BatchResponse(BaseModel):
+    """离线任务操作响应"""
+
+    success: bool
+    message: str
+    data: Optional[dict] = None
+
+
+# ============================================================================
+# API端点
+# ============================================================================
+
+
+@router.post("/jobs", response_model=BatchResponse)
+async def create_batch_job(request: CreateBatchJobRequest):
+    """
+    创建离线重分析任务
+
+    任务在后台运行，返回job_id用于查询进度
+    """
+    logger.info(
+        "api_create_batch_job_requested",
+        recordings=len(request.recordings),
+        upload=request.upload,
+    )
+
+    items = []
+    for recording in request.recordings:
+        try:
+            media_path = resolve_recording_path(recording.media_path)
+        except ValueError as e:
+            logger.warning("api_create_batch_job_rejected", media_path=recording.media_path)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        recorded_at = recording.recorded_at
+        if recorded_at is not None and recorded_at.tzinfo is not None:
+            recorded_at = recorded_at.astimezone(timezone.utc)
+
+        items.append(
+            RecordingItem(
+                media_path=str(media_path),
+                session_id=recording.session_id,
+                exam_result_id=recording.exam_result_id,
+                recorded_at=recorded_at.replace(tzinfo=None) if recorded_at else None,
+            )
+        )
+
+    try:
+        job = get_offline_job_manager().submit(items, upload=request.upload, overwrite=request.overwrite)
+    except Exception as e:
+        logger.error("api_create_batch_job_error", error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}",
+        )
+
+    return BatchResponse(
+        success=True,
+        message=f"Batch job {job.job_id} submitted",
+        data=job.to_dict(),
+    )
+
+
+@router.get("/jobs", response_model=BatchResponse)
+async def list_batch_jobs():
+    """获取所有离线重分析任务"""
+    jobs = get_offline_job_manager().list_jobs()
+    return BatchResponse(
+        success=True,
+        message="Batch jobs retrieved successfully",
+        data={"jobs": [job.to_dict() for job in jobs], "total": len(jobs)},
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=BatchResponse)
+async def get_batch_job(job_id: str):
+    """
+    获取离线重分析任务状态
+
+    Args:
+        job_id: 任务ID
+    """
+    job = get_offline_job_manager().get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Batch job not found: {job_id}",
+        )
+
+    return BatchResponse(
+        success=True,
+        message=f"Batch job status retrieved for {job_id}",
+        data=job.to_dict(),
+    )
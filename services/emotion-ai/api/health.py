@@ -42,19 +42,16 @@ async def health_check():
     """
     from config import settings
     from utils.logger import logger
-    from models.deepface_analyzer import get_deepface_analyzer
-    from models.emotion2vec_analyzer import get_emotion2vec_analyzer
+    from services.audio_analysis import is_audio_model_loaded
+    from services.face_analysis import is_emotion_model_loaded
 
     logger.info("health_check_requested")
 
     # 获取模型真实状态
     try:
-        deepface = get_deepface_analyzer()
-        emotion2vec = get_emotion2vec_analyzer()
-
         models_status = {
-            "deepface": deepface.is_initialized,
-            "emotion2vec": emotion2vec.is_initialized,
+            "deepface": is_emotion_model_loaded(),
+            "emotion2vec": is_audio_model_loaded(),
             "ppg_detector": True,  # PPG不需要初始化
         }
     except Exception as e:
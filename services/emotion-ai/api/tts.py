@@ -9,6 +9,10 @@ TTS API路由
 # 导入
 # ============================================================================
 
+import asyncio
+import base64
+import binascii
+import numpy as np
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel, Field
@@ -21,6 +25,9 @@ logger = get_logger(__name__)
 
 router = APIRouter(prefix="/api/tts", tags=["TTS"])
 
+# 参考音频统一转换到的采样率（与合成输出一致）
+REFERENCE_SAMPLE_RATE = 16000
+
 
 # ============================================================================
 # Pydantic模型定义
@@ -81,7 +88,7 @@ class HealthResponse(BaseModel):
 
 class CloneVoiceRequest(BaseModel):
     """音色克隆请求（预留）"""
-    audio: str = Field(..., description="参考音频（base64编码，3-10秒）")
+    audio: str = Field(..., description="参考音频（base64编码的wav/flac/ogg，3-10秒；无法解码或时长不符时返回400）")
     voice_id: str = Field(..., description="自定义音色ID")
     name: str = Field(..., description="音色名称")
     description: Optional[str] = Field(default=None, description="音色描述")
@@ -377,7 +384,7 @@ async def clone_voice(request: CloneVoiceRequest):
         CloneVoiceResponse: 克隆结果
 
     Raises:
-        HTTPException: 功能未实现或TTS服务未启用
+        HTTPException: TTS服务或音色缓存未启用（503），参考音频无法解码或时长不在3-10秒内（400）
     """
     if not settings.tts_enable:
         raise HTTPException(
@@ -397,12 +404,23 @@ async def clone_voice(request: CloneVoiceRequest):
         name=request.name
     )
 
+    # 解码并转换为16kHz单声道（任意采样率/声道的wav/flac/ogg均可）
+    loop = asyncio.get_event_loop()
+    reference = await loop.run_in_executor(None, load_reference_audio, request.audio)
+    if reference is None:
+        raise HTTPException(status_code=400, detail="参考音频解码失败")
+
+    duration = len(reference) / REFERENCE_SAMPLE_RATE
+    if not 3.0 <= duration <= 10.0:
+        raise HTTPException(
+            status_code=400,
+            detail=f"参考音频时长需为3-10秒（当前{duration:.1f}秒）"
+        )
+
     # TODO: 实现音色克隆逻辑
-    # 1. 解码base64音频
-    # 2. 验证音频时长（3-10秒）
-    # 3. 使用VoxCPM克隆音色
-    # 4. 保存音色到缓存
-    # 5. 返回音色ID
+    # 1. 使用VoxCPM克隆音色
+    # 2. 保存音色到缓存
+    # 3. 返回音色ID
 
     return CloneVoiceResponse(
         voice_id=request.voice_id,
@@ -417,7 +435,7 @@ async def clone_voice(request: CloneVoiceRequest):
 
 def decode_base64_audio(base64_str: Optional[str]) -> Optional[bytes]:
     """
-    解码base64音频（占位实现）
+    解码base64音频
 
     Args:
         base64_str: base64编码的音频字符串
@@ -428,8 +446,29 @@ def decode_base64_audio(base64_str: Optional[str]) -> Optional[bytes]:
     if not base64_str:
         return None
 
-    # TODO: 实现base64解码
-    # import base64
-    # return base64.b64decode(base64_str)
+    # 兼容data URL前缀（data:audio/wav;base64,...）
+    if base64_str.startswith("data:") and "," in base64_str:
+        base64_str = base64_str.split(",", 1)[1]
+
+    try:
+        return base64.b64decode(base64_str, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
 
-    return None
+def load_reference_audio(base64_str: Optional[str]) -> Optional[np.ndarray]:
+    """
+    解码参考音频并转换为REFERENCE_SAMPLE_RATE单声道float32
+
+    Args:
+        base64_str: base64编码的音频文件
+
+    Returns:
+        np.ndarray | None: 音频样本，解码失败时返回None
+    """
+    from services.audio_resampler import load_audio_bytes
+
+    data = decode_base64_audio(base64_str)
+    if not data:
+        return None
+    return load_audio_bytes(data, REFERENCE_SAMPLE_RATE)
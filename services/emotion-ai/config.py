@@ -118,6 +118,30 @@ class Settings(BaseSettings):
     deepface_enforce_detection: bool = Field(
         default=False, description="是否强制人脸检测（False提高容错性）"
     )
+    face_detection_min_confidence: float = Field(
+        default=0.5, description="人脸检测最低置信度（低于此值视为未检测到人脸）"
+    )
+    frame_preprocessing_enabled: bool = Field(
+        default=True, description="推理前缩放到推理分辨率，并按上一次人脸框裁剪ROI"
+    )
+    inference_frame_width: int = Field(
+        default=640, description="推理分辨率宽度上限（0表示不缩放）"
+    )
+    face_roi_padding: float = Field(
+        default=0.5, description="人脸ROI边距（相对人脸框宽高的比例，负数表示始终整帧检测）"
+    )
+    face_roi_redetect_seconds: float = Field(
+        default=2.0, description="ROI模式下整帧重新检测间隔（秒）"
+    )
+    face_tracking_enabled: bool = Field(
+        default=True, description="启用人脸跟踪（两次检测之间用光流传播人脸框，只做情绪分类）"
+    )
+    face_detect_interval: int = Field(
+        default=5, description="人脸跟踪模式下每隔多少个分析帧强制重新检测"
+    )
+    face_tracking_min_confidence: float = Field(
+        default=0.6, description="人脸跟踪最低置信度（成功跟踪的角点比例，低于此值重新检测）"
+    )
 
     # emotion2vec配置
     emotion2vec_model: str = Field(
@@ -126,6 +150,45 @@ class Settings(BaseSettings):
     emotion2vec_sample_rate: int = Field(
         default=16000, description="音频采样率"
     )
+    audio_window_seconds: float = Field(
+        default=3.0, description="音频情绪分析窗口长度（秒）"
+    )
+    audio_hop_seconds: float = Field(
+        default=3.0, description="音频分析窗口步长（秒）- 小于窗口长度时窗口重叠，时间线更平滑"
+    )
+    audio_resample_in_service: bool = Field(
+        default=False, description="在服务内做声道混合和重采样（ffmpeg按原始采样率/声道输出PCM，不再由-ar/-ac转换）"
+    )
+    audio_ingest_sample_rate: int = Field(
+        default=48000, description="服务内重采样时ffmpeg输出的采样率（WebRTC Opus原生48kHz）"
+    )
+    audio_ingest_channels: int = Field(
+        default=2, description="服务内重采样时ffmpeg输出的声道数"
+    )
+    vad_enabled: bool = Field(
+        default=True, description="启用语音活动检测（静音片段不送emotion2vec）"
+    )
+    vad_min_speech_ratio: float = Field(
+        default=0.2, description="片段中语音帧占比低于此值视为静音并丢弃"
+    )
+    vad_energy_threshold_db: float = Field(
+        default=-45.0, description="VAD绝对能量阈值（dBFS）"
+    )
+    vad_noise_margin_db: float = Field(
+        default=10.0, description="VAD语音能量需高于自适应噪声底的余量（dB）"
+    )
+    audio_embeddings_enabled: bool = Field(
+        default=False, description="保存每个音频片段的emotion2vec嵌入（float16，会话结束写入{session_id}_embeddings.npz）"
+    )
+    audio_batching_enabled: bool = Field(
+        default=True, description="启用跨会话音频微批推理（多个会话的片段合并为一次emotion2vec前向）"
+    )
+    audio_batch_size: int = Field(
+        default=8, description="音频推理微批的最大片段数"
+    )
+    audio_batch_max_wait_ms: float = Field(
+        default=200.0, description="音频微批最长等待时间（毫秒）"
+    )
 
     # ============================================================================
     # VoxCPM TTS配置
@@ -212,8 +275,132 @@ class Settings(BaseSettings):
     # ============================================================================
 
     max_concurrent_streams: int = Field(default=5, description="最大并发流数")
-    frame_skip_interval: int = Field(default=2, description="帧跳过间隔（分析每N帧）")
-    batch_size: int = Field(default=10, description="批处理大小")
+    frame_skip_interval: int = Field(default=2, description="帧跳过间隔（分析每N帧，关闭自适应帧率时生效）")
+    adaptive_frame_rate_enabled: bool = Field(
+        default=True,
+        description="启用自适应分析帧率（根据推理延迟、队列积压和活跃流数量调整）"
+    )
+    analysis_min_fps: float = Field(default=1.0, description="每个流的最低分析帧率")
+    analysis_max_fps: float = Field(default=10.0, description="每个流的最高分析帧率")
+    analysis_target_latency_ms: float = Field(
+        default=300.0,
+        description="目标推理延迟（毫秒，含排队）- 超过后降低分析帧率"
+    )
+    batch_size: int = Field(default=10, description="批处理大小（跨会话推理微批的最大帧数）")
+    inference_batching_enabled: bool = Field(
+        default=True,
+        description="启用跨会话批量推理（所有流的待分析帧合并为微批）"
+    )
+    inference_batch_max_wait_ms: int = Field(
+        default=50,
+        description="微批最长等待时间（毫秒）- 未凑满batch_size时到时即推理"
+    )
+    inference_batch_workers: int = Field(
+        default=0,
+        description="视频/音频批量推理线程数（0表示与默认线程池相同：min(32, CPU核心数+4)；启用推理进程池时自动取进程数）"
+    )
+    inference_worker_pool_enabled: bool = Field(
+        default=False,
+        description="启用多进程推理池（DeepFace/emotion2vec在独立进程中运行）"
+    )
+    worker_processes: int = Field(
+        default=0,
+        description="推理进程数（0表示按CPU核心数/每进程线程数自动计算）"
+    )
+    threads_per_worker: int = Field(
+        default=2,
+        description="每个推理进程的计算线程数（OMP/TensorFlow/PyTorch）"
+    )
+    frame_ring_slots: int = Field(
+        default=4,
+        description="每个流的共享内存帧环槽位数（启用推理进程池和抓帧线程时生效，0表示关闭）"
+    )
+    pipeline_frame_queue_size: int = Field(
+        default=2,
+        description="流水线帧队列容量（抓帧->预处理->推理，满时丢弃最旧帧）"
+    )
+    pipeline_publish_queue_size: int = Field(
+        default=256,
+        description="流水线发布队列容量（推理结果->检查点/Redis，满时只丢弃最旧的视频情绪结果，音频情绪和心率结果不丢弃）"
+    )
+    rtsp_grabber_thread_enabled: bool = Field(
+        default=True,
+        description="启用独立抓帧线程（cap.read()不阻塞事件循环，只保留最新帧）"
+    )
+    rtsp_ingest_mode: Literal["opencv", "ffmpeg"] = Field(
+        default="opencv",
+        description="RTSP拉流方式：opencv=视频用VideoCapture、音频单独启动ffmpeg（两个连接），ffmpeg=单个ffmpeg进程同时输出视频帧和音频"
+    )
+    ffmpeg_ingest_width: int = Field(
+        default=640,
+        description="ffmpeg拉流输出帧宽度（等比缩放后补边）"
+    )
+    ffmpeg_ingest_height: int = Field(
+        default=360,
+        description="ffmpeg拉流输出帧高度（等比缩放后补边）"
+    )
+    ffmpeg_ingest_fps: float = Field(
+        default=15.0,
+        description="ffmpeg拉流输出帧率上限（0表示保持源帧率）"
+    )
+    ffmpeg_ingest_buffer_frames: int = Field(
+        default=2,
+        description="ffmpeg拉流视频帧缓冲（帧数）- 排空线程持续读取视频管道，读取方跟不上时丢弃最旧帧"
+    )
+    ffmpeg_ingest_audio_buffer_seconds: float = Field(
+        default=5.0,
+        description="ffmpeg拉流音频缓冲（秒）- 排空线程持续读取音频管道，读取方跟不上时丢弃最旧音频"
+    )
+    ffmpeg_ingest_rw_timeout_seconds: float = Field(
+        default=10.0,
+        description="ffmpeg拉流读写超时（秒，-rw_timeout）- RTSP源停止发送数据超过该时间时ffmpeg退出，0表示不设置"
+    )
+
+    # ============================================================================
+    # PPG心率检测配置
+    # ============================================================================
+
+    ppg_window_seconds: float = Field(
+        default=10.0,
+        description="心率估计窗口（秒）- 每个会话独立缓冲"
+    )
+    ppg_hop_seconds: float = Field(
+        default=2.0,
+        description="心率估计间隔（秒）- 每个hop窗口执行一次带通滤波+FFT"
+    )
+    ppg_face_lost_grace_seconds: float = Field(
+        default=1.0,
+        description="人脸丢失宽限时间（秒）- 检测短暂失败时沿用上一个人脸框，超过此时长仍未检测到人脸才清空心率缓冲区"
+    )
+
+    # ============================================================================
+    # 离线重分析配置
+    # ============================================================================
+
+    offline_batch_size: int = Field(
+        default=16,
+        description="离线重分析每批推理的帧数/音频片段数"
+    )
+    offline_decode_fps: float = Field(
+        default=15.0,
+        description="离线解码帧率（所有帧用于PPG心率）"
+    )
+    offline_emotion_fps: float = Field(
+        default=2.0,
+        description="离线视频情绪分析帧率（每秒送DeepFace的帧数，按媒体时间计）"
+    )
+    offline_use_worker_pool: bool = Field(
+        default=True,
+        description="离线重分析使用多进程推理池（占满所有CPU核心）"
+    )
+    offline_max_concurrent_jobs: int = Field(
+        default=1,
+        description="同时运行的离线重分析任务数"
+    )
+    offline_recordings_root: str = Field(
+        default="./recordings",
+        description="录制文件目录（离线重分析API只接受此目录下的文件）"
+    )
 
     # ============================================================================
     # 数据配置
@@ -239,11 +426,11 @@ class Settings(BaseSettings):
     )
     checkpoint_file_pattern: str = Field(
         default="{year}/{month:02d}/{day:02d}/{session_id}_data.json",
-        description="检查点文件路径模式（相对于storage_root）"
+        description="检查点文件路径模式（未使用：实际路径固定为YYYY/MM/DD/{session_id}_data.ndjson，修改此项不生效）"
     )
     checkpoint_file_max_size_mb: int = Field(
         default=50,
-        description="单个检查点文件最大大小（MB）- 超过后切分"
+        description="单个检查点文件最大大小（MB）- 超过后滚动到新分段，0表示不分段"
     )
     checkpoint_archive_days: int = Field(
         default=30,
@@ -253,6 +440,22 @@ class Settings(BaseSettings):
         default=90,
         description="删除天数（超过后永久删除）"
     )
+    checkpoint_compaction_enabled: bool = Field(
+        default=False,
+        description="启用后台归档/清理（按checkpoint_archive_days/checkpoint_delete_days处理日分区；归档后按相对路径无法直接访问文件，需通过read_checkpoint_data读取）"
+    )
+    checkpoint_compaction_interval_hours: float = Field(
+        default=6.0,
+        description="归档/清理执行间隔（小时）"
+    )
+    checkpoint_compaction_max_mb_per_sec: float = Field(
+        default=8.0,
+        description="归档/清理读写限速（MB/秒，0表示不限速）- 避免影响实时会话的文件写入"
+    )
+    checkpoint_columnar_enabled: bool = Field(
+        default=False,
+        description="会话结束后把NDJSON检查点转换为列式.npz（float16得分、毫秒时间戳，体积约为1/10）"
+    )
 
     def model_post_init(self, __context):
         """模型初始化后设置环境变量（强制所有AI库使用项目目录）"""
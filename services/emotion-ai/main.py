@@ -9,6 +9,7 @@ AI分析服务 - FastAPI应用入口
 - 实时数据写入后端API
 """
 
+import asyncio
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -20,8 +21,14 @@ from api.health import router as health_router
 from api.rtsp import router as rtsp_router
 from api.models import router as models_router
 from api.tts import router as tts_router
+from api.batch import router as batch_router
 from services.rtsp_manager import get_rtsp_manager
 from services.redis_publisher import get_redis_publisher
+from services.inference_scheduler import get_audio_inference_scheduler, get_inference_scheduler
+from services.inference_workers import get_inference_worker_pool
+from services.offline_analyzer import get_offline_job_manager
+from services.checkpoint_persister import get_checkpoint_persister
+from services.checkpoint_compactor import get_checkpoint_compactor
 
 
 # ============================================================================
@@ -55,6 +62,8 @@ async def lifespan(app: FastAPI):
 
     from models.deepface_analyzer import get_deepface_analyzer
     from models.emotion2vec_analyzer import get_emotion2vec_analyzer
+    from services.audio_analysis import get_audio_model, is_audio_model_loaded
+    from services.face_analysis import is_emotion_model_loaded, load_emotion_models
 
     deepface = get_deepface_analyzer()
     emotion2vec = get_emotion2vec_analyzer()
@@ -103,17 +112,17 @@ async def lifespan(app: FastAPI):
 
     try:
         # 预加载DeepFace模型
-        if deepface_info["exists"] and not deepface.is_initialized:
-            deepface.initialize()
-            logger.info("deepface_preloaded", message="✅ DeepFace模型预加载完成")
+        if deepface_info["exists"] and not is_emotion_model_loaded():
+            batched = load_emotion_models()
+            logger.info("deepface_preloaded", batched=batched, message="✅ DeepFace模型预加载完成")
         elif not deepface_info["exists"]:
             logger.warning("deepface_skipped", message="⚠️ DeepFace模型不存在，跳过加载")
         else:
             logger.info("deepface_already_loaded")
 
-        # 预加载emotion2vec模型
-        if emotion2vec_info["exists"] and not emotion2vec.is_initialized:
-            emotion2vec.initialize()
+        # 预加载emotion2vec模型（推理路径使用的实例，不再初始化封装器）
+        if emotion2vec_info["exists"] and not is_audio_model_loaded():
+            get_audio_model()
             logger.info("emotion2vec_preloaded", message="✅ emotion2vec模型预加载完成")
         elif not emotion2vec_info["exists"]:
             logger.warning("emotion2vec_skipped", message="⚠️ emotion2vec模型不存在，跳过加载")
@@ -135,6 +144,14 @@ async def lifespan(app: FastAPI):
         if settings.require_models_on_startup:
             raise
 
+    # 启动推理进程池（每个进程加载一次模型）
+    if settings.inference_worker_pool_enabled:
+        get_inference_worker_pool().start()
+
+    # 启动检查点归档/清理后台线程
+    if settings.checkpoint_compaction_enabled:
+        get_checkpoint_compactor().start()
+
     logger.info("ai_service_started")
 
     yield
@@ -146,6 +163,31 @@ async def lifespan(app: FastAPI):
     await rtsp_manager.stop_all_consumers()
     logger.info("all_rtsp_consumers_stopped")
 
+    # 取消未完成的离线重分析任务
+    await get_offline_job_manager().cancel_all()
+
+    # 停止检查点归档/清理
+    if settings.checkpoint_compaction_enabled:
+        await asyncio.get_event_loop().run_in_executor(None, get_checkpoint_compactor().stop)
+
+    # 写完剩余检查点数据
+    await asyncio.get_event_loop().run_in_executor(None, get_checkpoint_persister().shutdown)
+    logger.info("checkpoint_persister_stopped")
+
+    # 停止批量推理调度器
+    if settings.inference_batching_enabled:
+        await asyncio.get_event_loop().run_in_executor(None, get_inference_scheduler().stop)
+        logger.info("inference_scheduler_stopped")
+
+    if settings.audio_batching_enabled:
+        await asyncio.get_event_loop().run_in_executor(None, get_audio_inference_scheduler().stop)
+        logger.info("audio_inference_scheduler_stopped")
+
+    # 关闭推理进程池（离线重分析也可能启动进程池）
+    if settings.inference_worker_pool_enabled or settings.offline_use_worker_pool:
+        await asyncio.get_event_loop().run_in_executor(None, get_inference_worker_pool().shutdown)
+        logger.info("inference_worker_pool_closed")
+
     # 关闭Redis连接
     redis_publisher = get_redis_publisher()
     await redis_publisher.disconnect()
@@ -191,6 +233,7 @@ app.include_router(health_router)
 app.include_router(rtsp_router)
 app.include_router(models_router)
 app.include_router(tts_router)
+app.include_router(batch_router)
 
 # TODO: 注册会话管理路由（Phase 5）
 
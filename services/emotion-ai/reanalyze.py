@@ -0,0 +1,82 @@
+"""
+离线重分析命令行工具
+
+对录制的考试音视频文件运行与实时流相同的分析流水线，写入标准检查点文件并计算聚合指标
+
+用法：
+    python reanalyze.py exam.mp4 --session-id SESSION_ID [--exam-result-id ID] [--upload]
+    python reanalyze.py recordings/*.mp4          # 会话ID取文件名（不含扩展名）
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from config import settings
+from services.offline_analyzer import RecordingAnalyzer, RecordingItem, upload_results
+from utils.logger import logger
+
+
+def parse_args() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="录制文件离线重分析（回填检查点文件和聚合指标）")
+    parser.add_argument("media", nargs="+", help="录制文件路径（视频或音频）")
+    parser.add_argument("--session-id", help="AI会话ID（只处理一个文件时可用，默认取文件名）")
+    parser.add_argument("--exam-result-id", help="考试结果ID（只处理一个文件时可用）")
+    parser.add_argument("--recorded-at", help="录制开始时间（UTC，ISO格式，默认当前时间）")
+    parser.add_argument("--batch-size", type=int, default=None, help="每批推理的帧数/片段数")
+    parser.add_argument("--no-worker-pool", action="store_true", help="不使用多进程推理池")
+    parser.add_argument("--keep-existing", action="store_true", help="追加到已有检查点文件（默认覆盖）")
+    parser.add_argument("--upload", action="store_true", help="把聚合指标和文件信息写入后端API")
+    args = parser.parse_args()
+
+    if len(args.media) > 1 and (args.session_id or args.exam_result_id):
+        parser.error("--session-id/--exam-result-id只能用于单个文件")
+
+    return args
+
+
+async def run(args: argparse.Namespace) -> int:
+    """
+    依次分析所有文件
+
+    Returns:
+        失败的文件数
+    """
+    recorded_at = datetime.fromisoformat(args.recorded_at).replace(tzinfo=None) if args.recorded_at else None
+    failed = 0
+
+    for media in args.media:
+        item = RecordingItem(
+            media_path=media,
+            session_id=args.session_id or Path(media).stem,
+            exam_result_id=args.exam_result_id,
+            recorded_at=recorded_at,
+        )
+
+        try:
+            analyzer = RecordingAnalyzer(
+                item,
+                batch_size=args.batch_size,
+                use_worker_pool=False if args.no_worker_pool else None,
+            )
+            result = await analyzer.run(overwrite=not args.keep_existing)
+            if args.upload:
+                await upload_results(result)
+            print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+        except Exception as e:
+            failed += 1
+            logger.error("reanalyze_failed", media_path=media, error=str(e), error_type=type(e).__name__)
+
+    if settings.offline_use_worker_pool and not args.no_worker_pool:
+        from services.inference_workers import get_inference_worker_pool
+        get_inference_worker_pool().shutdown()
+
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(run(parse_args())) else 0)
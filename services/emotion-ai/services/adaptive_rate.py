@@ -0,0 +1,162 @@
+"""
+自适应分析帧率控制器
+根据推理延迟、推理队列积压和活跃流数量动态调整每个流的分析帧率
+"""
+
+import threading
+import time
+import weakref
+from typing import Optional, Dict, Any
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class AdaptiveRateController:
+    """
+    每个流一个的分析帧率控制器（AIMD策略）
+
+    - 延迟超过目标或队列积压：帧率乘性下降
+    - 延迟远低于目标且无积压：帧率加性上升
+    - 帧率限制在[min_fps, max_fps]，并按活跃流数量分摊全局推理吞吐
+    """
+
+    # 所有活跃控制器（用于统计活跃流数量）
+    _active: "weakref.WeakSet[AdaptiveRateController]" = weakref.WeakSet()
+    _active_lock = threading.Lock()
+
+    def __init__(
+        self,
+        session_id: str,
+        min_fps: Optional[float] = None,
+        max_fps: Optional[float] = None,
+        target_latency_ms: Optional[float] = None,
+    ):
+        """
+        Args:
+            session_id: 会话ID
+            min_fps: 最低分析帧率
+            max_fps: 最高分析帧率
+            target_latency_ms: 目标推理延迟（含排队，毫秒）
+        """
+        self.session_id = session_id
+        self.min_fps = min_fps or settings.analysis_min_fps
+        self.max_fps = max(self.min_fps, max_fps or settings.analysis_max_fps)
+        self.target_latency_ms = target_latency_ms or settings.analysis_target_latency_ms
+
+        # 从中间值起步，由反馈逐步收敛
+        self.target_fps = (self.min_fps + self.max_fps) / 2
+        self.last_analysis_time = 0.0
+
+        # 测量值（指数滑动平均）
+        self.avg_latency_ms: Optional[float] = None
+        self.effective_fps = 0.0
+        self.last_queue_depth = 0
+
+        self.adjustments = 0
+
+    # ------------------------------------------------------------------
+    # 活跃流登记
+    # ------------------------------------------------------------------
+
+    def register(self):
+        """登记为活跃流"""
+        with self._active_lock:
+            self._active.add(self)
+
+    def unregister(self):
+        """取消登记"""
+        with self._active_lock:
+            self._active.discard(self)
+
+    @classmethod
+    def active_streams(cls) -> int:
+        """当前活跃流数量"""
+        with cls._active_lock:
+            return max(1, len(cls._active))
+
+    # ------------------------------------------------------------------
+    # 控制逻辑
+    # ------------------------------------------------------------------
+
+    def should_analyze(self, now: Optional[float] = None) -> bool:
+        """
+        当前帧是否需要分析（替代固定的"每N帧分析一次"）
+
+        Args:
+            now: 当前时间（秒，单调时钟）
+
+        Returns:
+            是否分析该帧
+        """
+        now = now if now is not None else time.monotonic()
+        interval = now - self.last_analysis_time
+
+        if interval < 1.0 / self.target_fps:
+            return False
+
+        if self.last_analysis_time > 0:
+            measured = 1.0 / interval
+            self.effective_fps = (
+                measured if self.effective_fps == 0 else self.effective_fps + 0.2 * (measured - self.effective_fps)
+            )
+
+        self.last_analysis_time = now
+        return True
+
+    def update(self, latency_ms: float, queue_depth: int, throughput_fps: Optional[float] = None):
+        """
+        根据一次推理的反馈调整帧率
+
+        Args:
+            latency_ms: 本次推理延迟（含排队，毫秒）
+            queue_depth: 推理队列中等待的请求数
+            throughput_fps: 全局推理吞吐估计（帧/秒，可选）
+        """
+        self.avg_latency_ms = (
+            latency_ms
+            if self.avg_latency_ms is None
+            else self.avg_latency_ms + 0.2 * (latency_ms - self.avg_latency_ms)
+        )
+        self.last_queue_depth = queue_depth
+
+        active = self.active_streams()
+        previous = self.target_fps
+
+        if self.avg_latency_ms > self.target_latency_ms or queue_depth > active:
+            # 过载：乘性下降
+            self.target_fps *= 0.8
+        elif self.avg_latency_ms < self.target_latency_ms * 0.6 and queue_depth == 0:
+            # 空闲：加性上升
+            self.target_fps += 0.5
+
+        # 按活跃流数量分摊全局吞吐
+        if throughput_fps:
+            self.target_fps = min(self.target_fps, throughput_fps / active)
+
+        self.target_fps = min(self.max_fps, max(self.min_fps, self.target_fps))
+
+        if abs(self.target_fps - previous) >= 0.5:
+            self.adjustments += 1
+            logger.debug(
+                "analysis_rate_adjusted",
+                session_id=self.session_id,
+                target_fps=round(self.target_fps, 2),
+                avg_latency_ms=round(self.avg_latency_ms, 1),
+                queue_depth=queue_depth,
+                active_streams=active,
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取控制器统计信息"""
+        return {
+            "target_fps": round(self.target_fps, 2),
+            "effective_fps": round(self.effective_fps, 2),
+            "min_fps": self.min_fps,
+            "max_fps": self.max_fps,
+            "avg_latency_ms": round(self.avg_latency_ms, 1) if self.avg_latency_ms is not None else None,
+            "queue_depth": self.last_queue_depth,
+            "active_streams": self.active_streams(),
+            "adjustments": self.adjustments,
+        }
@@ -0,0 +1,154 @@
+"""
+音频情绪分析
+多个会话的音频片段合并为一批，直接调用FunASR的emotion2vec模型，每批一次generate
+
+结果格式与models.emotion2vec_analyzer.analyze_audio_array一致：
+dominant_emotion、emotion_scores（标签 -> 概率）、confidence（主情绪概率）；
+启用audio_embeddings_enabled时额外返回embedding（utterance级emotion2vec特征，float32一维数组）
+
+推理路径不再初始化emotion2vec_analyzer封装器，每个进程只持有这里加载的一份模型；
+音频分析开关以load_audio_model()是否成功为准
+"""
+
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 不参与主情绪判定的标签
+_IGNORED_LABELS = {"<unk>"}
+
+_audio_model = None
+_audio_model_lock = threading.Lock()
+
+
+def get_audio_model():
+    """
+    获取emotion2vec模型（每个进程只加载一次）
+
+    模型文件从MODELSCOPE_CACHE加载，与emotion2vec_analyzer使用同一份缓存
+    """
+    global _audio_model
+    if _audio_model is None:
+        with _audio_model_lock:
+            if _audio_model is None:
+                from funasr import AutoModel
+
+                _audio_model = AutoModel(
+                    model=settings.emotion2vec_model,
+                    hub="ms",
+                    disable_update=True,
+                    disable_pbar=True,
+                )
+                logger.info("audio_emotion_model_loaded", model=settings.emotion2vec_model)
+    return _audio_model
+
+
+def load_audio_model() -> bool:
+    """
+    加载emotion2vec模型（音频情绪分析开关）
+
+    Returns:
+        是否加载成功，失败时调用方禁用音频情绪分析
+    """
+    try:
+        get_audio_model()
+        return True
+    except Exception as e:
+        logger.error("audio_emotion_model_load_failed", error=str(e), error_type=type(e).__name__)
+        return False
+
+
+def is_audio_model_loaded() -> bool:
+    """当前进程是否已加载emotion2vec模型（供健康检查使用）"""
+    return _audio_model is not None
+
+
+def _label_name(label: str) -> str:
+    """emotion2vec标签形如"生气/angry"，取英文部分"""
+    return label.split("/")[-1]
+
+
+def format_audio_result(output: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    把FunASR单条输出转换为分析结果
+
+    Args:
+        output: generate返回列表中的一项（labels、scores，提取嵌入时还有feats）
+
+    Returns:
+        分析结果；没有有效标签时返回None
+    """
+    scores = {
+        _label_name(label): float(score)
+        for label, score in zip(output.get("labels", []), output.get("scores", []))
+        if label not in _IGNORED_LABELS
+    }
+    if not scores:
+        return None
+
+    dominant = max(scores, key=scores.get)
+    result = {
+        "dominant_emotion": dominant,
+        "emotion_scores": scores,
+        "confidence": scores[dominant],
+    }
+    if output.get("feats") is not None:
+        result["embedding"] = np.asarray(output["feats"], dtype=np.float32).reshape(-1)
+    return result
+
+
+def analyze_audio_batch(segments: List[np.ndarray]) -> List[Optional[Dict[str, Any]]]:
+    """
+    批量分析音频情绪（供音频推理调度器调用）
+
+    整批片段作为一个输入列表交给一次generate调用（batch_size=片段数）；
+    整批失败时逐段重试，单段失败不影响同批其它片段
+
+    Args:
+        segments: float32单声道片段列表（16kHz）
+
+    Returns:
+        与输入等长的结果列表
+    """
+    if not segments:
+        return []
+
+    model = get_audio_model()
+
+    try:
+        outputs = model.generate(
+            input=list(segments),
+            batch_size=len(segments),
+            fs=settings.emotion2vec_sample_rate,
+            granularity="utterance",
+            extract_embedding=settings.audio_embeddings_enabled,
+        )
+        if len(outputs) == len(segments):
+            return [format_audio_result(output) for output in outputs]
+        logger.warning(
+            "audio_batch_result_mismatch",
+            expected=len(segments),
+            actual=len(outputs),
+        )
+    except Exception as e:
+        logger.error("audio_batch_inference_failed", error=str(e), error_type=type(e).__name__)
+
+    results: List[Optional[Dict[str, Any]]] = []
+    for segment in segments:
+        try:
+            outputs = model.generate(
+                input=segment,
+                fs=settings.emotion2vec_sample_rate,
+                granularity="utterance",
+                extract_embedding=settings.audio_embeddings_enabled,
+            )
+            results.append(format_audio_result(outputs[0]) if outputs else None)
+        except Exception as e:
+            logger.error("audio_analysis_failed", error=str(e), error_type=type(e).__name__)
+            results.append(None)
+
+    return results
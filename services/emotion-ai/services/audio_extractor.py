@@ -4,13 +4,15 @@
 """
 
 import asyncio
-import subprocess
 import tempfile
 import os
 import numpy as np
 from typing import Optional, Callable
 from pathlib import Path
 from config import settings
+from services.audio_resampler import AudioConverter
+from services.audio_ring_buffer import AudioRingBuffer
+from services.vad import EnergyVAD
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -20,48 +22,91 @@ class AudioExtractor:
     """
     音频提取器
     使用ffmpeg从RTSP流中提取音频，并进行预处理
+
+    共享拉流模式下不启动自己的ffmpeg，而是读取FFmpegIngest的音频管道
+
+    管道读取全部基于asyncio StreamReader，不占用默认线程池
     """
 
-    def __init__(self, rtsp_url: str, session_id: str):
+    def __init__(self, rtsp_url: str, session_id: str, shared_ingest: bool = False):
         """
         Args:
             rtsp_url: RTSP流URL
             session_id: 会话ID（用于日志和临时文件命名）
+            shared_ingest: 是否从消费器的FFmpegIngest读取音频（不单独连接RTSP）
         """
         self.rtsp_url = rtsp_url
         self.session_id = session_id
+        self.shared_ingest = shared_ingest
+        self.ingest = None  # FFmpegIngest（共享拉流模式，由消费器在每次连接后设置）
 
         # 音频配置
         self.sample_rate = settings.emotion2vec_sample_rate  # 16000Hz
         self.channels = 1  # 单声道
         self.bit_depth = 16  # 16-bit PCM
 
-        # 缓冲区配置
-        self.buffer_duration = 3.0  # 缓冲时长（秒）
+        # 服务内重采样：ffmpeg按原始采样率/声道输出，由AudioConverter混合声道并重采样到sample_rate
+        self.converter: Optional[AudioConverter] = None
+        self.ingest_sample_rate = self.sample_rate
+        self.ingest_channels = self.channels
+        if settings.audio_resample_in_service:
+            self.ingest_sample_rate = settings.audio_ingest_sample_rate
+            self.ingest_channels = settings.audio_ingest_channels
+            self.converter = AudioConverter(self.ingest_sample_rate, self.ingest_channels, self.sample_rate)
+
+        # 缓冲区配置（预分配环形缓冲区，按窗口/步长输出视图）
+        self.buffer_duration = settings.audio_window_seconds  # 窗口时长（秒）
+        self.hop_duration = settings.audio_hop_seconds        # 窗口步长（秒）
         self.buffer_samples = int(self.sample_rate * self.buffer_duration)
-        self.audio_buffer = np.array([], dtype=np.float32)
+        self.audio_buffer = AudioRingBuffer(
+            self.buffer_samples,
+            hop_samples=int(self.sample_rate * self.hop_duration),
+        )
+
+        # 语音活动检测（静音片段不送emotion2vec）
+        self.vad = EnergyVAD(self.sample_rate) if settings.vad_enabled else None
+        self.min_speech_ratio = settings.vad_min_speech_ratio
+        self.segments_emitted = 0
+        self.segments_dropped_silent = 0
 
         # 状态
         self.is_running = False
-        self.process: Optional[subprocess.Popen] = None
+        self.process: Optional[asyncio.subprocess.Process] = None
         self.task: Optional[asyncio.Task] = None
+        self.stderr_task: Optional[asyncio.Task] = None
+
+        # 共享拉流模式：消费器设置新的拉流进程（或停止）时唤醒读取循环
+        self._ingest_changed = asyncio.Event()
 
-        # 回调函数（当音频片段准备好时调用）
-        self.on_audio_ready: Optional[Callable[[np.ndarray], None]] = None
+        # 回调函数（当音频片段准备好时调用，参数为片段和语音占比）
+        self.on_audio_ready: Optional[Callable[[np.ndarray, Optional[float]], None]] = None
 
         logger.info(
             "audio_extractor_created",
             session_id=session_id,
             sample_rate=self.sample_rate,
             buffer_duration=self.buffer_duration,
+            hop_duration=self.hop_duration,
         )
 
-    def set_audio_callback(self, callback: Callable[[np.ndarray], None]):
+    def attach_ingest(self, ingest):
+        """
+        设置共享拉流进程（消费器每次（重新）连接后调用）
+
+        Args:
+            ingest: FFmpegIngest实例，None表示断开
+        """
+        self.ingest = ingest
+        if ingest is not None:
+            self._ingest_changed.set()
+
+    def set_audio_callback(self, callback: Callable[[np.ndarray, Optional[float]], None]):
         """
         设置音频准备就绪回调
 
         Args:
-            callback: 回调函数，接收音频numpy数组（float32, 单声道）
+            callback: 回调函数，接收音频numpy数组（float32, 单声道）和语音占比（未启用VAD时为None）；
+                协程函数在事件循环中直接等待，普通函数在线程池中执行
         """
         self.on_audio_ready = callback
         logger.info("audio_callback_set", session_id=self.session_id)
@@ -88,14 +133,19 @@ class AudioExtractor:
         logger.info("stopping_audio_extractor", session_id=self.session_id)
 
         self.is_running = False
+        self._ingest_changed.set()
 
         # 停止ffmpeg进程
-        if self.process:
+        if self.process and self.process.returncode is None:
             try:
                 self.process.terminate()
-                await asyncio.sleep(1)
-                if self.process.poll() is None:
+                try:
+                    await asyncio.wait_for(self.process.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
                     self.process.kill()
+                    await self.process.wait()
+            except ProcessLookupError:
+                pass
             except Exception as e:
                 logger.error("ffmpeg_termination_error", error=str(e))
 
@@ -116,6 +166,10 @@ class AudioExtractor:
 
         while self.is_running and retry_count < max_retries:
             try:
+                if self.shared_ingest:
+                    await self._read_shared_ingest()
+                    continue
+
                 # 启动ffmpeg进程
                 if not await self._start_ffmpeg():
                     retry_count += 1
@@ -160,29 +214,31 @@ class AudioExtractor:
         try:
             logger.info("starting_ffmpeg_for_audio", rtsp_url=self.rtsp_url)
 
-            # ffmpeg命令：提取音频并输出为16kHz单声道PCM
+            # ffmpeg命令：提取音频并输出为PCM（默认16kHz单声道；服务内重采样时为原始采样率/声道）
             cmd = [
                 'ffmpeg',
+                '-hide_banner',
+                '-nostats',                        # 不输出进度行（避免stderr出现超长的\r行）
                 '-rtsp_transport', 'tcp',         # 🔧 强制使用TCP传输（更稳定）
                 '-i', self.rtsp_url,              # 输入RTSP流
                 '-vn',                             # 忽略视频
-                '-ar', str(self.sample_rate),     # 采样率16kHz
-                '-ac', str(self.channels),        # 单声道
+                '-ar', str(self.ingest_sample_rate),  # 采样率
+                '-ac', str(self.ingest_channels),     # 声道数
                 '-f', 's16le',                    # 16-bit PCM little-endian
                 '-acodec', 'pcm_s16le',           # PCM编解码器
                 'pipe:1',                          # 输出到stdout
             ]
 
-            # 启动进程
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,           # 🔧 捕获stderr以便诊断错误
-                bufsize=10**6,  # 1MB缓冲
+            # 启动进程（asyncio子进程，stdout/stderr为非阻塞StreamReader）
+            self.process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,   # 🔧 捕获stderr以便诊断错误
             )
 
             # 🔧 启动stderr监控任务
-            asyncio.create_task(self._monitor_ffmpeg_stderr())
+            self.stderr_task = asyncio.create_task(self._monitor_ffmpeg_stderr())
 
             logger.info("ffmpeg_started", session_id=self.session_id, pid=self.process.pid)
             return True
@@ -191,48 +247,78 @@ class AudioExtractor:
             logger.error("ffmpeg_start_error", error=str(e), session_id=self.session_id)
             return False
 
-    async def _read_audio_data(self):
-        """从ffmpeg读取音频数据"""
-        if not self.process or not self.process.stdout:
+    async def _read_shared_ingest(self):
+        """共享拉流模式：读取当前FFmpegIngest的音频管道，断开后等待消费器重连"""
+        ingest = self.ingest
+        if ingest is None or ingest.audio_buffer is None or not ingest.isOpened():
+            # 等待attach_ingest()或stop()通知，不轮询
+            if self.is_running:
+                self._ingest_changed.clear()
+                if self.ingest is ingest:
+                    await self._ingest_changed.wait()
             return
 
+        logger.info("audio_reading_from_shared_ingest", session_id=self.session_id)
+
+        # 拉流的排空线程把音频管道读入有界缓冲区，这里在事件循环中等待读取
+        await self._read_audio_data(ingest.audio_buffer, ingest.isOpened)
+
+        # 同一个拉流进程只读一次，等待消费器设置新的进程
+        if self.ingest is ingest:
+            self.ingest = None
+
+    async def _read_audio_data(
+        self,
+        reader: Optional[asyncio.StreamReader] = None,
+        is_alive: Optional[Callable[[], bool]] = None,
+    ):
+        """
+        从ffmpeg读取音频数据
+
+        Args:
+            reader: 音频字节流（提供readexactly()，默认为自有ffmpeg进程的stdout）
+            is_alive: 进程存活判断（默认检查自有ffmpeg进程）
+        """
+        if reader is None:
+            if not self.process or not self.process.stdout:
+                return
+            reader = self.process.stdout
+            is_alive = lambda: self.process.returncode is None
+
         # 每次读取的字节数（0.5秒音频）
         chunk_duration = 0.5  # 秒
-        chunk_samples = int(self.sample_rate * chunk_duration)
-        chunk_bytes = chunk_samples * 2  # 16-bit = 2 bytes per sample
+        chunk_samples = int(self.ingest_sample_rate * chunk_duration)
+        chunk_bytes = chunk_samples * 2 * self.ingest_channels  # 16-bit = 2 bytes per sample
 
-        while self.is_running and self.process.poll() is None:
+        while self.is_running and is_alive():
             try:
-                # 读取音频chunk
-                audio_bytes = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    self.process.stdout.read,
-                    chunk_bytes
-                )
+                # 读取音频chunk（流结束时取剩余的部分数据）
+                ended = False
+                try:
+                    audio_bytes = await reader.readexactly(chunk_bytes)
+                except asyncio.IncompleteReadError as e:
+                    audio_bytes = e.partial
+                    ended = True
 
                 if not audio_bytes:
                     logger.warning("audio_stream_ended", session_id=self.session_id)
                     break
 
-                # 转换为numpy数组（int16 -> float32）
-                audio_chunk = np.frombuffer(audio_bytes, dtype=np.int16)
-                audio_chunk = audio_chunk.astype(np.float32) / 32768.0  # 归一化到[-1, 1]
-
-                # 添加到缓冲区
-                self.audio_buffer = np.concatenate([self.audio_buffer, audio_chunk])
-
-                # 检查是否达到缓冲时长
-                if len(self.audio_buffer) >= self.buffer_samples:
-                    # 提取一个完整的音频段
-                    audio_segment = self.audio_buffer[:self.buffer_samples]
-                    self.audio_buffer = self.audio_buffer[self.buffer_samples:]
+                if self.converter is not None:
+                    # 服务内混合声道并重采样后写入环形缓冲区
+                    self.audio_buffer.write(self.converter.process_pcm16(audio_bytes))
+                else:
+                    # int16 -> float32直接写入环形缓冲区（归一化到[-1, 1]）
+                    self.audio_buffer.write_pcm16(audio_bytes)
 
-                    # 调用回调函数
+                # 每个完整窗口调用一次回调（视图在回调返回前有效）
+                for audio_segment in self.audio_buffer.pop_windows():
                     if self.on_audio_ready:
-                        await self._invoke_callback(audio_segment)
+                        await self._emit_segment(audio_segment)
 
-                # 让出控制权
-                await asyncio.sleep(0.01)
+                if ended:
+                    logger.warning("audio_stream_ended", session_id=self.session_id)
+                    break
 
             except Exception as e:
                 logger.error(
@@ -243,16 +329,42 @@ class AudioExtractor:
                 )
                 break
 
-    async def _invoke_callback(self, audio_data: np.ndarray):
+    async def _emit_segment(self, audio_data: np.ndarray):
+        """
+        VAD过滤后输出音频片段（语音占比低于阈值的静音片段直接丢弃）
+
+        Args:
+            audio_data: 音频numpy数组
+        """
+        speech_ratio = None
+        if self.vad:
+            speech_ratio = self.vad.speech_ratio(audio_data)
+            if speech_ratio < self.min_speech_ratio:
+                self.segments_dropped_silent += 1
+                logger.debug(
+                    "audio_segment_silent_skipped",
+                    session_id=self.session_id,
+                    speech_ratio=round(speech_ratio, 3),
+                )
+                return
+
+        self.segments_emitted += 1
+        await self._invoke_callback(audio_data, speech_ratio)
+
+    async def _invoke_callback(self, audio_data: np.ndarray, speech_ratio: Optional[float] = None):
         """
         调用音频准备就绪回调
 
         Args:
             audio_data: 音频numpy数组
+            speech_ratio: 语音占比
         """
         try:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, self.on_audio_ready, audio_data)
+            if asyncio.iscoroutinefunction(self.on_audio_ready):
+                await self.on_audio_ready(audio_data, speech_ratio)
+            else:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, self.on_audio_ready, audio_data, speech_ratio)
 
             logger.debug(
                 "audio_callback_invoked",
@@ -273,16 +385,18 @@ class AudioExtractor:
         """
         监控ffmpeg的stderr输出以诊断错误
         """
-        if not self.process or not self.process.stderr:
+        process = self.process
+        if not process or not process.stderr:
             return
 
         try:
-            while self.is_running and self.process.poll() is None:
+            while self.is_running and process.returncode is None:
                 # 非阻塞读取stderr
-                line = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    self.process.stderr.readline
-                )
+                try:
+                    line = await process.stderr.readline()
+                except ValueError:
+                    # 单行超过StreamReader上限，丢弃后继续
+                    continue
 
                 if not line:
                     break
@@ -328,5 +442,16 @@ class AudioExtractor:
             "is_running": self.is_running,
             "buffer_size": len(self.audio_buffer),
             "buffer_duration_sec": len(self.audio_buffer) / self.sample_rate,
-            "ffmpeg_running": self.process is not None and self.process.poll() is None,
+            "windows_emitted": self.audio_buffer.windows_emitted,
+            "segments_emitted": self.segments_emitted,
+            "segments_dropped_silent": self.segments_dropped_silent,
+            "vad": self.vad.get_stats() if self.vad else None,
+            "resampler": self.converter.get_stats() if self.converter else None,
+            "samples_overrun": self.audio_buffer.samples_overrun,
+            "shared_ingest": self.shared_ingest,
+            "ffmpeg_running": (
+                self.ingest is not None and self.ingest.isOpened()
+                if self.shared_ingest
+                else self.process is not None and self.process.returncode is None
+            ),
         }
@@ -0,0 +1,294 @@
+"""
+流式重采样与声道混合
+多相FIR重采样（跨块保留滤波器状态），供实时音频提取、TTS参考音频和离线重分析共用
+"""
+
+from math import gcd
+from typing import Any, Dict, Optional, Union
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+_PCM16_SCALE = np.float32(1.0 / 32768.0)
+
+
+def to_float32(samples: np.ndarray) -> np.ndarray:
+    """
+    转换为[-1, 1]范围的float32（int16缩放，浮点直接转换）
+
+    Args:
+        samples: 音频样本
+
+    Returns:
+        float32样本（已是float32时不复制）
+    """
+    if samples.dtype == np.float32:
+        return samples
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) * _PCM16_SCALE
+    return samples.astype(np.float32)
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """
+    多声道混合为单声道（各声道取平均）
+
+    Args:
+        samples: (N,)单声道或(N, C)多声道样本
+
+    Returns:
+        float32单声道样本
+    """
+    samples = to_float32(samples)
+    if samples.ndim == 1:
+        return samples
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def design_lowpass(up: int, down: int, taps_per_phase: int, beta: float = 8.0) -> np.ndarray:
+    """
+    设计多相重采样用的Kaiser窗低通FIR
+
+    截止频率取输入/输出奈奎斯特频率中较低者（相对上采样后的采样率），
+    系数归一化为直流增益等于up，使每个相位的直流增益为1。
+
+    Args:
+        up: 上采样倍数
+        down: 下采样倍数
+        taps_per_phase: 每个相位的抽头数
+        beta: Kaiser窗参数
+
+    Returns:
+        float32滤波器系数，长度up * taps_per_phase
+    """
+    length = up * taps_per_phase
+    cutoff = 1.0 / max(up, down)
+    n = np.arange(length, dtype=np.float64) - (length - 1) / 2.0
+    taps = cutoff * np.sinc(cutoff * n) * np.kaiser(length, beta)
+    taps *= up / taps.sum()
+    return taps.astype(np.float32)
+
+
+class StreamingResampler:
+    """
+    流式多相重采样器（单声道）
+
+    - 采样率比例约分为up/down，输出样本n对应上采样后的位置n*down，
+      相位为(n*down) % up，所需输入为截至(n*down) // up的taps_per_phase个样本
+    - 每次process()用滑动窗口视图一次性计算本块所有输出（向量化，无逐样本循环）
+    - 块之间保留最近taps_per_phase-1个输入样本和输出计数，分块结果与整段处理一致
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 16):
+        """
+        Args:
+            in_rate: 输入采样率
+            out_rate: 输出采样率
+            taps_per_phase: 每个相位的抽头数（越大过渡带越窄，计算量越大）
+        """
+        if in_rate <= 0 or out_rate <= 0:
+            raise ValueError(f"invalid sample rates: {in_rate} -> {out_rate}")
+
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+
+        divisor = gcd(self.in_rate, self.out_rate)
+        self.up = self.out_rate // divisor
+        self.down = self.in_rate // divisor
+        self.taps_per_phase = taps_per_phase
+
+        # 多相矩阵：phases[p, k] = h[p + k*up]，按时间倒序存放以便与滑动窗口直接点乘
+        taps = design_lowpass(self.up, self.down, taps_per_phase)
+        self._phases = np.ascontiguousarray(taps.reshape(taps_per_phase, self.up).T[:, ::-1])
+
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._consumed = 0   # 累计输入样本数
+        self._produced = 0   # 累计输出样本数
+
+    @property
+    def passthrough(self) -> bool:
+        """输入输出采样率相同"""
+        return self.up == self.down
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        重采样一块单声道样本
+
+        Args:
+            samples: float32或int16单声道样本
+
+        Returns:
+            float32输出样本（长度随块边界在理论值附近浮动一个样本）
+        """
+        samples = to_float32(samples)
+        if self.passthrough:
+            return samples
+        if len(samples) == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        extended = np.concatenate((self._history, samples))
+        start = self._consumed
+        self._consumed += len(samples)
+
+        # 本块能计算的输出：所需最新输入样本(n*down)//up已到达
+        last = (self._consumed * self.up - 1) // self.down
+        outputs = np.arange(self._produced, last + 1, dtype=np.int64)
+        self._produced = last + 1
+
+        positions = outputs * self.down
+        windows = sliding_window_view(extended, self.taps_per_phase)[positions // self.up - start]
+        result = np.einsum("nk,nk->n", self._phases[positions % self.up], windows)
+
+        self._history = extended[-(self.taps_per_phase - 1):].copy()
+        return result.astype(np.float32, copy=False)
+
+    def flush(self) -> np.ndarray:
+        """
+        输出滤波器中剩余的尾部样本（流结束时调用）
+
+        Returns:
+            float32尾部样本
+        """
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        consumed = self._consumed
+        tail = self.process(np.zeros(self.taps_per_phase // 2, dtype=np.float32))
+        # 只保留对应真实输入时长的部分
+        expected = -(-consumed * self.up // self.down)
+        keep = max(0, expected - (self._produced - len(tail)))
+        self.reset()
+        return tail[:keep]
+
+    def reset(self):
+        """清空滤波器状态"""
+        self._history[:] = 0
+        self._consumed = 0
+        self._produced = 0
+
+
+class AudioConverter:
+    """
+    流式音频格式转换：int16交错PCM字节/多声道数组 -> 目标采样率的float32单声道
+
+    先混合声道再重采样（重采样只算一个声道）；PCM字节允许在任意位置截断，
+    不完整的帧留到下一次。
+    """
+
+    def __init__(self, in_rate: int, in_channels: int, out_rate: int, taps_per_phase: int = 16):
+        """
+        Args:
+            in_rate: 输入采样率
+            in_channels: 输入声道数
+            out_rate: 输出采样率
+            taps_per_phase: 重采样器每相位抽头数
+        """
+        self.in_channels = max(1, int(in_channels))
+        self.resampler = StreamingResampler(in_rate, out_rate, taps_per_phase)
+        self._frame_bytes = 2 * self.in_channels
+        self._remainder = b""
+
+        # 统计
+        self.samples_in = 0
+        self.samples_out = 0
+
+    def process_pcm16(self, data: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+        """
+        转换int16小端交错PCM字节
+
+        Args:
+            data: PCM字节
+
+        Returns:
+            float32单声道样本
+        """
+        if self._remainder:
+            data = self._remainder + bytes(data)
+            self._remainder = b""
+
+        usable = len(data) - len(data) % self._frame_bytes
+        if usable < len(data):
+            self._remainder = bytes(data[usable:])
+
+        samples = np.frombuffer(data, dtype="<i2", count=usable // 2)
+        return self.process(samples.reshape(-1, self.in_channels))
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """
+        转换样本数组
+
+        Args:
+            samples: (N,)或(N, C)样本（int16或浮点）
+
+        Returns:
+            float32单声道样本
+        """
+        mono = downmix(samples)
+        out = self.resampler.process(mono)
+        self.samples_in += len(mono)
+        self.samples_out += len(out)
+        return out
+
+    def flush(self) -> np.ndarray:
+        """输出重采样器剩余样本并清空状态"""
+        self._remainder = b""
+        out = self.resampler.flush()
+        self.samples_out += len(out)
+        return out
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取转换统计信息"""
+        return {
+            "in_rate": self.resampler.in_rate,
+            "in_channels": self.in_channels,
+            "out_rate": self.resampler.out_rate,
+            "samples_in": self.samples_in,
+            "samples_out": self.samples_out,
+        }
+
+
+def resample_audio(
+    samples: np.ndarray,
+    in_rate: int,
+    out_rate: int,
+    taps_per_phase: int = 16,
+) -> np.ndarray:
+    """
+    一次性转换整段音频为目标采样率的单声道float32
+
+    Args:
+        samples: (N,)或(N, C)样本
+        in_rate: 输入采样率
+        out_rate: 输出采样率
+        taps_per_phase: 重采样器每相位抽头数
+
+    Returns:
+        float32单声道样本
+    """
+    resampler = StreamingResampler(in_rate, out_rate, taps_per_phase)
+    mono = downmix(samples)
+    if resampler.passthrough:
+        return mono
+    return np.concatenate((resampler.process(mono), resampler.flush()))
+
+
+def load_audio_bytes(data: bytes, out_rate: int) -> Optional[np.ndarray]:
+    """
+    解码内存中的音频文件（wav/flac/ogg等）并转换为目标采样率的单声道float32
+
+    Args:
+        data: 音频文件字节
+        out_rate: 输出采样率
+
+    Returns:
+        float32单声道样本，解码失败时返回None
+    """
+    import io
+    import soundfile as sf
+
+    try:
+        samples, sample_rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except Exception:
+        return None
+
+    return resample_audio(samples, sample_rate, out_rate)
@@ -0,0 +1,135 @@
+"""
+音频环形缓冲区
+固定容量的float32缓冲区，int16 PCM原地转换写入，按窗口/步长输出连续视图（不复制）
+"""
+
+from typing import Iterator, Optional, Union
+import numpy as np
+
+_PCM16_SCALE = np.float32(1.0 / 32768.0)
+
+
+class AudioRingBuffer:
+    """
+    镜像环形缓冲区
+
+    底层数组长度为2倍容量，每个样本同时写入i和i+capacity两个位置，
+    因此任意不超过容量的窗口都是一段连续内存，可以直接返回切片视图。
+
+    - write_pcm16(): int16小端PCM直接缩放写入缓冲区（无中间数组拼接）
+    - pop_windows(): 按窗口长度和步长依次产出视图（hop < window时窗口重叠）
+
+    返回的视图在之后写入超过(capacity - window)个样本前保持有效；
+    需要长期持有时由调用方复制。
+    """
+
+    def __init__(self, window_samples: int, hop_samples: Optional[int] = None, capacity: Optional[int] = None):
+        """
+        Args:
+            window_samples: 窗口长度（样本数）
+            hop_samples: 窗口步长（样本数，默认等于窗口长度，即不重叠）
+            capacity: 缓冲区容量（样本数，默认2倍窗口长度）
+        """
+        self.window = int(window_samples)
+        self.hop = max(1, int(hop_samples or window_samples))
+        self.capacity = max(int(capacity or 2 * self.window), self.window + self.hop)
+
+        self._buffer = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._written = 0        # 累计写入样本数
+        self._next_start = 0     # 下一个窗口的起始样本（累计计数）
+        self._odd_byte = b""     # 上次读取剩下的半个样本
+
+        # 统计
+        self.windows_emitted = 0
+        self.samples_overrun = 0
+
+    def __len__(self) -> int:
+        """尚未被窗口消费的样本数"""
+        return self._written - self._next_start
+
+    @property
+    def duration_samples(self) -> int:
+        """缓冲区中可用样本数（不超过容量）"""
+        return min(len(self), self.capacity)
+
+    def write_pcm16(self, data: Union[bytes, bytearray, memoryview]):
+        """
+        写入int16小端PCM字节
+
+        Args:
+            data: PCM字节（允许奇数长度，剩余半个样本留到下次）
+        """
+        if self._odd_byte:
+            data = self._odd_byte + bytes(data)
+            self._odd_byte = b""
+        if len(data) % 2:
+            self._odd_byte = bytes(data[-1:])
+            data = data[:-1]
+
+        samples = np.frombuffer(data, dtype="<i2")
+        # 超过容量的部分只保留最新的
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity:]
+            self._written += len(data) // 2 - self.capacity
+
+        self._write(samples)
+
+    def write(self, samples: np.ndarray):
+        """
+        写入float32样本
+
+        Args:
+            samples: 单声道样本
+        """
+        if len(samples) > self.capacity:
+            self._written += len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+        self._write(samples)
+
+    def _write(self, samples: np.ndarray):
+        """写入镜像缓冲区的两个位置（int16时原地缩放）"""
+        count = len(samples)
+        if count == 0:
+            return
+
+        start = self._written % self.capacity
+        first = min(count, self.capacity - start)
+        for offset in (0, self.capacity):
+            self._store(self._buffer[offset + start:offset + start + first], samples[:first])
+            if first < count:
+                self._store(self._buffer[offset:offset + count - first], samples[first:])
+
+        self._written += count
+
+        # 写入超过未消费窗口的可用空间时丢弃最旧的样本
+        overrun = self._written - self._next_start - self.capacity
+        if overrun > 0:
+            self.samples_overrun += overrun
+            self._next_start += overrun
+
+    @staticmethod
+    def _store(out: np.ndarray, samples: np.ndarray):
+        """写入并转换为float32（int16缩放到[-1, 1]）"""
+        if samples.dtype == np.float32:
+            out[...] = samples
+        else:
+            np.multiply(samples, _PCM16_SCALE, out=out, casting="unsafe")
+
+    def pop_windows(self) -> Iterator[np.ndarray]:
+        """
+        依次产出已完整的窗口（连续视图，不复制）
+
+        Yields:
+            float32窗口视图，长度为window
+        """
+        while self._written - self._next_start >= self.window:
+            start = self._next_start % self.capacity
+            self._next_start += self.hop
+            self.windows_emitted += 1
+            yield self._buffer[start:start + self.window]
+
+    def reset(self):
+        """清空缓冲区"""
+        self._written = 0
+        self._next_start = 0
+        self._odd_byte = b""
@@ -0,0 +1,428 @@
+"""
+列式检查点格式
+会话结束时把检查点数据点转换为固定类型的列（.npz），并可还原为原JSON结构
+
+文件内容（每种数据类型一组列，前缀video_/audio_/heart_rate_）：
+- header: 头记录JSON字符串（session_id、exam_result_id、created_at、metadata）
+- {prefix}timestamp_ms: (N,) int64，UTC毫秒时间戳
+- video_/audio_:
+    - emotion: (N,) int8，主导情绪在labels中的下标（-1表示缺失）
+    - scores: (N, L) float16，各情绪得分（NaN表示该点没有这个情绪）
+    - labels: (L,) 字符串，情绪标签（常见7种在前，其余按出现顺序追加）
+    - confidence: (N,) float16
+- video_frame_number: (N,) int32
+- audio_segment_number / audio_duration / audio_speech_ratio
+- heart_rate_bpm / heart_rate_confidence / heart_rate_quality / heart_rate_measurement_number / heart_rate_frame_number
+- {prefix}extra: (N,) 字符串，不属于以上列的字段（JSON，仅在存在时写入）
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 常见情绪标签（DeepFace 7类），固定在标签表前部
+BASE_EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+# 整数列缺失值
+_MISSING_INT = -1
+
+
+def _to_epoch_ms(timestamp: Optional[str]) -> int:
+    """ISO时间戳（UTC，可带Z）转换为毫秒时间戳"""
+    if not timestamp:
+        return 0
+    parsed = datetime.fromisoformat(timestamp.rstrip("Z"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(round(parsed.timestamp() * 1000))
+
+
+def _from_epoch_ms(epoch_ms: int) -> str:
+    """毫秒时间戳转换为ISO时间戳（UTC，带Z，与检查点文件格式一致）"""
+    value = datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc).replace(tzinfo=None)
+    return value.isoformat() + "Z"
+
+
+def _float_or_nan(value: Any) -> float:
+    """None转换为NaN"""
+    return np.nan if value is None else value
+
+
+def _optional_float(value: float) -> Optional[float]:
+    """NaN还原为None"""
+    return None if np.isnan(value) else float(value)
+
+
+def _optional_int(value: int) -> Optional[int]:
+    """缺失值还原为None"""
+    return None if value == _MISSING_INT else int(value)
+
+
+class _ColumnBuilder:
+    """一种数据类型的列构建器"""
+
+    def __init__(self, prefix: str, known_fields: set, known_metadata: set):
+        self.prefix = prefix
+        self.known_fields = known_fields | {"timestamp", "data_type", "confidence", "metadata"}
+        self.known_metadata = known_metadata
+        self.columns: Dict[str, List[Any]] = {}
+        self.extra: List[str] = []
+
+    def add(self, point: Dict[str, Any], values: Dict[str, Any]):
+        """追加一个数据点（values为各列的值），其余字段记入extra"""
+        for name, value in values.items():
+            self.columns.setdefault(name, []).append(value)
+
+        extra = {k: v for k, v in point.items() if k not in self.known_fields}
+        metadata = point.get("metadata") or {}
+        extra_metadata = {k: v for k, v in metadata.items() if k not in self.known_metadata}
+        if extra_metadata:
+            extra["metadata"] = extra_metadata
+        self.extra.append(json.dumps(extra, ensure_ascii=False) if extra else "")
+
+    def arrays(self, dtypes: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """生成带前缀的列数组"""
+        result = {
+            self.prefix + name: np.asarray(self.columns.get(name, []), dtype=dtype)
+            for name, dtype in dtypes.items()
+        }
+        if any(self.extra):
+            result[self.prefix + "extra"] = np.array(self.extra, dtype=str)
+        return result
+
+
+def _emotion_labels(points: List[Dict[str, Any]]) -> List[str]:
+    """收集情绪标签表（常见7类在前，其余按出现顺序）"""
+    labels = list(BASE_EMOTION_LABELS)
+    seen = set(labels)
+    for point in points:
+        for label in list((point.get("emotion_scores") or {}).keys()) + [point.get("dominant_emotion")]:
+            if label and label not in seen:
+                seen.add(label)
+                labels.append(label)
+    return labels
+
+
+def _emotion_columns(
+    prefix: str,
+    points: List[Dict[str, Any]],
+    metadata_columns: Dict[str, Any],
+) -> Dict[str, np.ndarray]:
+    """
+    情绪类数据点（video_emotion/audio_emotion）转换为列
+
+    Args:
+        prefix: 列名前缀
+        points: 数据点列表
+        metadata_columns: 额外的metadata列（metadata字段名 -> dtype）
+
+    Returns:
+        列数组字典
+    """
+    labels = _emotion_labels(points)
+    index = {label: i for i, label in enumerate(labels)}
+    scores = np.full((len(points), len(labels)), np.nan, dtype=np.float16)
+
+    builder = _ColumnBuilder(prefix, {"dominant_emotion", "emotion_scores"}, set(metadata_columns))
+    for row, point in enumerate(points):
+        for label, score in (point.get("emotion_scores") or {}).items():
+            scores[row, index[label]] = _float_or_nan(score)
+
+        metadata = point.get("metadata") or {}
+        values = {
+            "timestamp_ms": _to_epoch_ms(point.get("timestamp")),
+            "emotion": index.get(point.get("dominant_emotion"), _MISSING_INT),
+            "confidence": _float_or_nan(point.get("confidence")),
+        }
+        for name, dtype in metadata_columns.items():
+            value = metadata.get(name)
+            if value is None:
+                value = np.nan if np.issubdtype(dtype, np.floating) else _MISSING_INT
+            values[name] = value
+        builder.add(point, values)
+
+    arrays = builder.arrays({
+        "timestamp_ms": np.int64,
+        "emotion": np.int8,
+        "confidence": np.float16,
+        **metadata_columns,
+    })
+    arrays[prefix + "scores"] = scores
+    arrays[prefix + "labels"] = np.array(labels, dtype=str)
+    return arrays
+
+
+def _heart_rate_columns(points: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """心率数据点转换为列"""
+    metadata_columns = {"measurement_number": np.int32, "frame_number": np.int32}
+    builder = _ColumnBuilder(
+        "heart_rate_",
+        {"heart_rate", "signal_quality"},
+        set(metadata_columns),
+    )
+    for point in points:
+        metadata = point.get("metadata") or {}
+        values = {
+            "timestamp_ms": _to_epoch_ms(point.get("timestamp")),
+            "bpm": _float_or_nan(point.get("heart_rate")),
+            "confidence": _float_or_nan(point.get("confidence")),
+            "quality": _float_or_nan(point.get("signal_quality")),
+        }
+        for name in metadata_columns:
+            value = metadata.get(name)
+            values[name] = _MISSING_INT if value is None else value
+        builder.add(point, values)
+
+    return builder.arrays({
+        "timestamp_ms": np.int64,
+        "bpm": np.float32,
+        "confidence": np.float16,
+        "quality": np.float16,
+        **metadata_columns,
+    })
+
+
+def checkpoint_to_columns(checkpoint_data: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    检查点数据（read_checkpoint_data()的结构）转换为列数组
+
+    Args:
+        checkpoint_data: 检查点数据
+
+    Returns:
+        列名 -> 数组
+    """
+    header = {
+        "session_id": checkpoint_data.get("session_id"),
+        "exam_result_id": checkpoint_data.get("exam_result_id"),
+        "created_at": checkpoint_data.get("created_at"),
+        "updated_at": checkpoint_data.get("updated_at"),
+        "metadata": checkpoint_data.get("metadata", {}),
+    }
+    arrays = {"header": np.array(json.dumps(header, ensure_ascii=False))}
+    arrays.update(_emotion_columns(
+        "video_",
+        checkpoint_data.get("video_emotions", []),
+        {"frame_number": np.int32},
+    ))
+    arrays.update(_emotion_columns(
+        "audio_",
+        checkpoint_data.get("audio_emotions", []),
+        {"audio_segment_number": np.int32, "audio_duration": np.float32, "speech_ratio": np.float16},
+    ))
+    arrays.update(_heart_rate_columns(checkpoint_data.get("heart_rate_data", [])))
+    return arrays
+
+
+def save_columnar(file_path: Path, checkpoint_data: Dict[str, Any]) -> int:
+    """
+    写入列式检查点文件（先写临时文件再原子替换）
+
+    Args:
+        file_path: 目标.npz路径
+        checkpoint_data: 检查点数据
+
+    Returns:
+        文件大小（字节）
+    """
+    arrays = checkpoint_to_columns(checkpoint_data)
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, file_path)
+    return file_path.stat().st_size
+
+
+def _restore_point(
+    data_type: str,
+    timestamp_ms: int,
+    confidence: float,
+    fields: Dict[str, Any],
+    metadata: Dict[str, Any],
+    extra: str,
+) -> Dict[str, Any]:
+    """按检查点文件中的字段顺序还原一个数据点"""
+    point = {
+        "timestamp": _from_epoch_ms(timestamp_ms),
+        "data_type": data_type,
+        "confidence": _optional_float(confidence),
+        **fields,
+        "metadata": metadata,
+    }
+    if extra:
+        extra_fields = json.loads(extra)
+        point["metadata"].update(extra_fields.pop("metadata", {}))
+        point.update(extra_fields)
+    return point
+
+
+def _restore_emotions(
+    data: Dict[str, np.ndarray],
+    prefix: str,
+    data_type: str,
+    metadata_columns: List[str],
+    float_metadata: set,
+) -> List[Dict[str, Any]]:
+    """还原情绪类数据点"""
+    labels = [str(label) for label in data[prefix + "labels"]]
+    scores = data[prefix + "scores"].astype(np.float32)
+    extra = data.get(prefix + "extra")
+
+    points = []
+    for row in range(len(data[prefix + "timestamp_ms"])):
+        code = int(data[prefix + "emotion"][row])
+        fields = {
+            "dominant_emotion": labels[code] if code >= 0 else None,
+            "emotion_scores": {
+                label: float(scores[row, i])
+                for i, label in enumerate(labels)
+                if not np.isnan(scores[row, i])
+            },
+        }
+        metadata = {
+            name: (
+                _optional_float(data[prefix + name][row])
+                if name in float_metadata
+                else _optional_int(data[prefix + name][row])
+            )
+            for name in metadata_columns
+        }
+        points.append(_restore_point(
+            data_type,
+            int(data[prefix + "timestamp_ms"][row]),
+            data[prefix + "confidence"][row],
+            fields,
+            metadata,
+            str(extra[row]) if extra is not None else "",
+        ))
+    return points
+
+
+def _restore_heart_rate(data: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """还原心率数据点"""
+    prefix = "heart_rate_"
+    extra = data.get(prefix + "extra")
+
+    points = []
+    for row in range(len(data[prefix + "timestamp_ms"])):
+        confidence = data[prefix + "confidence"][row]
+        fields = {
+            "heart_rate": _optional_float(data[prefix + "bpm"][row]),
+            "signal_quality": _optional_float(data[prefix + "quality"][row]),
+        }
+        metadata = {
+            "measurement_number": _optional_int(data[prefix + "measurement_number"][row]),
+            "frame_number": _optional_int(data[prefix + "frame_number"][row]),
+        }
+        points.append(_restore_point(
+            "heart_rate",
+            int(data[prefix + "timestamp_ms"][row]),
+            confidence,
+            fields,
+            metadata,
+            str(extra[row]) if extra is not None else "",
+        ))
+    return points
+
+
+def load_columnar(file_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    读取列式检查点文件并转换为检查点JSON结构（与read_checkpoint_data()相同）
+
+    得分和置信度为float16精度，时间戳为毫秒精度
+
+    Args:
+        file_path: .npz文件路径
+
+    Returns:
+        检查点数据，文件不存在时返回None
+    """
+    if not file_path.exists():
+        return None
+
+    return parse_columnar(file_path)
+
+
+def parse_columnar(source: Union[Path, BinaryIO]) -> Dict[str, Any]:
+    """
+    解析列式检查点（文件路径或内存中的文件对象，例如从归档中解压的内容）
+
+    Args:
+        source: .npz文件路径或二进制文件对象
+
+    Returns:
+        检查点数据
+    """
+    with np.load(source) as npz:
+        data = {key: npz[key] for key in npz.files}
+
+    header = json.loads(str(data["header"]))
+    video_emotions = _restore_emotions(data, "video_", "video_emotion", ["frame_number"], set())
+    audio_emotions = _restore_emotions(
+        data,
+        "audio_",
+        "audio_emotion",
+        ["audio_segment_number", "audio_duration", "speech_ratio"],
+        {"audio_duration", "speech_ratio"},
+    )
+    heart_rate_data = _restore_heart_rate(data)
+
+    return {
+        "session_id": header.get("session_id"),
+        "exam_result_id": header.get("exam_result_id"),
+        "created_at": header.get("created_at"),
+        "updated_at": header.get("updated_at"),
+        "metadata": header.get("metadata", {}),
+        "video_emotions": video_emotions,
+        "audio_emotions": audio_emotions,
+        "heart_rate_data": heart_rate_data,
+        "stats": {
+            "video_emotion_count": len(video_emotions),
+            "audio_emotion_count": len(audio_emotions),
+            "heart_rate_count": len(heart_rate_data),
+        },
+    }
+
+
+def count_columnar(file_path: Path) -> int:
+    """
+    列式检查点文件中的数据点总数（只读取时间戳列）
+
+    Args:
+        file_path: .npz文件路径
+
+    Returns:
+        数据点数量
+    """
+    with np.load(file_path) as npz:
+        return sum(
+            len(npz[prefix + "timestamp_ms"])
+            for prefix in ("video_", "audio_", "heart_rate_")
+        )
+
+
+def convert_to_json(file_path: Path, output_path: Path) -> int:
+    """
+    把列式检查点文件导出为JSON文件（旧的整文件JSON格式）
+
+    Args:
+        file_path: .npz文件路径
+        output_path: 输出JSON路径
+
+    Returns:
+        导出的数据点数量
+    """
+    checkpoint_data = load_columnar(file_path)
+    if checkpoint_data is None:
+        raise FileNotFoundError(str(file_path))
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
+
+    return sum(checkpoint_data["stats"].values())
@@ -0,0 +1,354 @@
+"""
+检查点存储归档与清理
+后台线程定期扫描按日期分区的检查点目录：超过归档天数的日分区打包压缩到archive/，
+超过删除天数的分区和归档直接删除。读写按字节限速，避免影响实时会话的文件写入。
+"""
+
+import shutil
+import tarfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 每次读写的块大小
+_CHUNK_SIZE = 256 * 1024
+
+# 最近仍有写入的分区不处理（秒）
+_MIN_IDLE_SECONDS = 3600
+
+
+class CompactionAborted(Exception):
+    """压缩过程中收到停止请求"""
+
+
+class _Throttle:
+    """按字节数限速（令牌桶，在工作线程中等待）"""
+
+    def __init__(self, bytes_per_second: float, stop_event: threading.Event):
+        self.bytes_per_second = bytes_per_second
+        self.stop_event = stop_event
+        self._started = time.monotonic()
+        self._consumed = 0
+
+    def consume(self, num_bytes: int):
+        """
+        记录处理的字节数，超出速率时等待
+
+        Raises:
+            CompactionAborted: 等待期间收到停止请求
+        """
+        if self.stop_event.is_set():
+            raise CompactionAborted()
+        if self.bytes_per_second <= 0:
+            return
+
+        self._consumed += num_bytes
+        ahead = self._consumed / self.bytes_per_second - (time.monotonic() - self._started)
+        if ahead > 0 and self.stop_event.wait(ahead):
+            raise CompactionAborted()
+
+
+class _ThrottledReader:
+    """读取时限速的文件包装（供tarfile.addfile使用）"""
+
+    def __init__(self, f, throttle: _Throttle):
+        self._f = f
+        self._throttle = throttle
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._f.read(_CHUNK_SIZE if size is None or size < 0 else min(size, _CHUNK_SIZE))
+        self._throttle.consume(len(data))
+        return data
+
+
+def get_archive_path(storage_root: Path, day: date) -> Path:
+    """日分区的归档文件路径（archive/YYYY/MM/DD.tar.gz）"""
+    return storage_root / "archive" / f"{day.year}" / f"{day.month:02d}" / f"{day.day:02d}.tar.gz"
+
+
+def read_archived_files(storage_root: Path, day: date, prefix: str) -> Dict[str, Tuple[bytes, float]]:
+    """
+    从日分区归档中读取文件名以prefix开头的文件（在内存中解压，不写回磁盘）
+
+    Args:
+        storage_root: 检查点存储根目录
+        day: 分区日期
+        prefix: 文件名前缀（例如"{session_id}_data."）
+
+    Returns:
+        文件名 -> (内容, 修改时间)，归档不存在或没有匹配文件时为空
+    """
+    archive_path = get_archive_path(storage_root, day)
+    if not archive_path.exists():
+        return {}
+
+    files: Dict[str, Tuple[bytes, float]] = {}
+    with tarfile.open(archive_path, "r:gz") as tar:
+        for member in tar:
+            name = Path(member.name).name
+            if member.isfile() and name.startswith(prefix):
+                files[name] = (tar.extractfile(member).read(), float(member.mtime))
+    return files
+
+
+def _directory_size(path: Path) -> int:
+    """目录下所有文件的总大小（字节）"""
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class CheckpointCompactor:
+    """
+    检查点存储后台归档/清理
+
+    - 日分区（YYYY/MM/DD）超过checkpoint_archive_days：打包为archive/YYYY/MM/DD.tar.gz，删除原目录
+    - 日分区或归档超过checkpoint_delete_days：直接删除
+    - 当天分区和最近一小时内仍有写入的分区不处理
+    - 读写限速checkpoint_compaction_max_mb_per_sec，每次运行统计回收的字节数
+    """
+
+    def __init__(self):
+        self.storage_root = Path(settings.checkpoint_storage_root)
+        self.archive_root = self.storage_root / "archive"
+        self.archive_days = settings.checkpoint_archive_days
+        self.delete_days = settings.checkpoint_delete_days
+        self.interval = settings.checkpoint_compaction_interval_hours * 3600
+        self.bytes_per_second = settings.checkpoint_compaction_max_mb_per_sec * 1024 * 1024
+
+        self._stop_event = threading.Event()
+        self._run_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.total_bytes_reclaimed = 0
+
+    def start(self):
+        """启动后台线程（启动1分钟后执行第一次，之后按间隔执行）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="checkpoint-compactor", daemon=True)
+        self._thread.start()
+        logger.info(
+            "checkpoint_compactor_started",
+            archive_days=self.archive_days,
+            delete_days=self.delete_days,
+            interval_hours=settings.checkpoint_compaction_interval_hours,
+        )
+
+    def stop(self, timeout: float = 10.0):
+        """停止后台线程（正在进行的归档会中止，已写入的临时文件被删除）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("checkpoint_compactor_stop_timeout")
+            self._thread = None
+
+    def _run(self):
+        """后台线程主循环"""
+        delay = min(60.0, self.interval)
+        while not self._stop_event.wait(delay):
+            try:
+                self.run_once()
+            except CompactionAborted:
+                break
+            except Exception as e:
+                logger.error("checkpoint_compaction_failed", error=str(e), error_type=type(e).__name__)
+            delay = self.interval
+
+    def _list_partitions(self) -> List[Tuple[date, Path]]:
+        """列出所有日分区（YYYY/MM/DD目录）"""
+        partitions = []
+        for day_dir in self.storage_root.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]"):
+            if not day_dir.is_dir():
+                continue
+            year, month, day = day_dir.parts[-3:]
+            try:
+                partitions.append((date(int(year), int(month), int(day)), day_dir))
+            except ValueError:
+                continue
+        return sorted(partitions)
+
+    def _list_archives(self) -> List[Tuple[date, Path]]:
+        """列出所有归档文件（archive/YYYY/MM/DD.tar.gz）"""
+        archives = []
+        for archive in self.archive_root.glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9].tar.gz"):
+            year, month = archive.parts[-3:-1]
+            try:
+                archives.append((date(int(year), int(month), int(archive.name[:2])), archive))
+            except ValueError:
+                continue
+        return sorted(archives)
+
+    def _is_idle(self, day_dir: Path) -> bool:
+        """分区最近一段时间内没有写入"""
+        cutoff = time.time() - _MIN_IDLE_SECONDS
+        return all(f.stat().st_mtime < cutoff for f in day_dir.rglob("*") if f.is_file())
+
+    def _archive_partition(self, day: date, day_dir: Path, throttle: _Throttle) -> Tuple[int, int]:
+        """
+        把日分区打包压缩到archive/并删除原目录
+
+        Returns:
+            (原目录大小, 归档文件大小)
+        """
+        archive_path = get_archive_path(self.storage_root, day)
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = archive_path.with_name(archive_path.name + ".tmp")
+
+        original_size = _directory_size(day_dir)
+        try:
+            with tarfile.open(tmp_path, "w:gz", compresslevel=6) as tar:
+                # 已有归档（分区在归档后又被写入）先合并进来
+                if archive_path.exists():
+                    with tarfile.open(archive_path, "r:gz") as existing:
+                        for member in existing:
+                            source = existing.extractfile(member) if member.isfile() else None
+                            tar.addfile(member, _ThrottledReader(source, throttle) if source else None)
+
+                for file_path in sorted(f for f in day_dir.rglob("*") if f.is_file()):
+                    info = tar.gettarinfo(str(file_path), arcname=str(file_path.relative_to(self.storage_root)))
+                    with open(file_path, "rb") as f:
+                        tar.addfile(info, _ThrottledReader(f, throttle))
+            tmp_path.replace(archive_path)
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+
+        shutil.rmtree(day_dir)
+        return original_size, archive_path.stat().st_size
+
+    def _delete_path(self, path: Path, throttle: _Throttle) -> int:
+        """
+        删除分区目录或归档文件（逐个文件删除并限速）
+
+        Returns:
+            释放的字节数
+        """
+        if path.is_file():
+            size = path.stat().st_size
+            path.unlink()
+            throttle.consume(size)
+            return size
+
+        freed = 0
+        for file_path in sorted(f for f in path.rglob("*") if f.is_file()):
+            size = file_path.stat().st_size
+            file_path.unlink()
+            freed += size
+            throttle.consume(size)
+        shutil.rmtree(path)
+        return freed
+
+    def _remove_empty_parents(self, path: Path, root: Path):
+        """删除变空的月/年目录"""
+        for parent in (path.parent, path.parent.parent):
+            if parent != root and parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+
+    def run_once(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        执行一次归档/清理
+
+        Args:
+            today: 计算天数的基准日期（默认UTC当天）
+
+        Returns:
+            统计信息（归档/删除的分区数、回收的字节数等）
+        """
+        with self._run_lock:
+            today = today or datetime.utcnow().date()
+            throttle = _Throttle(self.bytes_per_second, self._stop_event)
+            started = time.monotonic()
+            result = {
+                "partitions_archived": 0,
+                "partitions_deleted": 0,
+                "archives_deleted": 0,
+                "bytes_reclaimed": 0,
+                "skipped_active": 0,
+            }
+
+            delete_before = today - timedelta(days=self.delete_days) if self.delete_days > 0 else None
+            archive_before = today - timedelta(days=self.archive_days) if self.archive_days > 0 else None
+
+            for day, day_dir in self._list_partitions():
+                expired = delete_before is not None and day <= delete_before
+                archivable = archive_before is not None and day <= archive_before
+                if day >= today or not (expired or archivable):
+                    continue
+                if not self._is_idle(day_dir):
+                    result["skipped_active"] += 1
+                    continue
+
+                if expired:
+                    result["bytes_reclaimed"] += self._delete_path(day_dir, throttle)
+                    result["partitions_deleted"] += 1
+                    logger.info("checkpoint_partition_deleted", partition=str(day))
+                else:
+                    original_size, archive_size = self._archive_partition(day, day_dir, throttle)
+                    result["bytes_reclaimed"] += max(0, original_size - archive_size)
+                    result["partitions_archived"] += 1
+                    logger.info(
+                        "checkpoint_partition_archived",
+                        partition=str(day),
+                        original_kb=round(original_size / 1024, 2),
+                        archive_kb=round(archive_size / 1024, 2),
+                    )
+                self._remove_empty_parents(day_dir, self.storage_root)
+
+            if delete_before is not None:
+                for day, archive_path in self._list_archives():
+                    if day > delete_before:
+                        break
+                    result["bytes_reclaimed"] += self._delete_path(archive_path, throttle)
+                    result["archives_deleted"] += 1
+                    self._remove_empty_parents(archive_path, self.archive_root)
+
+            result["elapsed_seconds"] = round(time.monotonic() - started, 2)
+
+            self.runs += 1
+            self.last_run_at = datetime.utcnow()
+            self.last_result = result
+            self.total_bytes_reclaimed += result["bytes_reclaimed"]
+
+            logger.info(
+                "checkpoint_compaction_completed",
+                **result,
+                reclaimed_mb=round(result["bytes_reclaimed"] / 1024 / 1024, 2),
+            )
+            return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取归档/清理统计信息"""
+        return {
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() + "Z" if self.last_run_at else None,
+            "last_result": self.last_result,
+            "total_bytes_reclaimed": self.total_bytes_reclaimed,
+        }
+
+
+# ============================================================================
+# 全局实例
+# ============================================================================
+
+_checkpoint_compactor: Optional[CheckpointCompactor] = None
+
+
+def get_checkpoint_compactor() -> CheckpointCompactor:
+    """获取全局检查点归档/清理实例"""
+    global _checkpoint_compactor
+    if _checkpoint_compactor is None:
+        _checkpoint_compactor = CheckpointCompactor()
+    return _checkpoint_compactor
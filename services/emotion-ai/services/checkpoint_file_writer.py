@@ -1,47 +1,106 @@
 """
 检查点文件写入器
-负责将AI分析结果写入JSON文件（替代数据库存储）
+负责将AI分析结果写入NDJSON文件（替代数据库存储）
+
+文件格式（{session_id}_data.ndjson）：第一行为头记录（会话ID、考试结果ID、元数据），
+之后每行一个数据点，按data_type区分类型。每次刷新只追加新数据点，
+写入开销与会话时长无关。旧格式的整文件JSON（{session_id}_data.json）仍可读取，
+首次追加时自动转换。
+
+文件超过checkpoint_file_max_size_mb后滚动到分段文件（{session_id}_data.0001.ndjson、
+.0002……，分段列表记录在{session_id}_data.manifest.json），每次追加只写最后一个分段，
+读取时按顺序流式读取所有分段。
+
+启用checkpoint_columnar_enabled时，会话结束后转换为列式文件（{session_id}_data.npz，
+见checkpoint_columnar），读取时优先使用。
+
+已被后台归档（archive/YYYY/MM/DD.tar.gz，见checkpoint_compactor）的日分区只读：
+read_checkpoint_data在分区目录中找不到文件时从归档中解压读取。
 """
 
+import glob
+import io
 import json
 import os
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from threading import Lock
 from config import settings
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 头记录/分段记录标识和格式版本
+HEADER_RECORD = "header"
+SEGMENT_RECORD = "segment"
+FORMAT_VERSION = 1
+
+# data_type -> 读取结果中的数组名
+DATA_TYPE_KEYS = {
+    "video_emotion": "video_emotions",
+    "audio_emotion": "audio_emotions",
+    "heart_rate": "heart_rate_data",
+}
+
+
+def _encode_line(record: Dict[str, Any]) -> str:
+    """序列化为一行JSON（紧凑格式，以换行结尾）"""
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _empty_counts() -> Dict[str, int]:
+    """各类型数据点计数初始值"""
+    return {data_type: 0 for data_type in DATA_TYPE_KEYS}
+
+
+def _peek_data_type(line: str) -> Optional[str]:
+    """解析一行记录的data_type（头记录、空行和不完整行返回None）"""
+    try:
+        return json.loads(line).get("data_type")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+def _iter_segment_files(segments: List[Path]) -> Iterable[Tuple[str, Iterable[str]]]:
+    """依次打开分段文件（每个文件在读完后关闭）"""
+    for segment in segments:
+        with open(segment, 'r', encoding='utf-8') as f:
+            yield segment.name, f
+
 
 class CheckpointFileWriter:
     """
-    检查点JSON文件写入器
+    检查点NDJSON文件写入器
 
     功能：
     - 按日期分区存储（YYYY/MM/DD/目录结构）
     - 线程安全写入
     - 自动创建目录
-    - 文件大小控制
-    - 实时更新和追加写入
+    - 文件大小控制（超过上限后滚动到新分段）
+    - 只追加新数据点（不重写整个文件）
+    - 兼容读取旧格式JSON文件
     """
 
     def __init__(self):
         self.storage_root = Path(settings.checkpoint_storage_root)
         self.file_locks: Dict[str, Lock] = {}  # 每个文件一个锁
+        self._locks_lock = Lock()  # 保护file_locks（写入线程、线程池和事件循环都会获取文件锁）
+        self._type_counts: Dict[str, Dict[str, int]] = {}  # 每个文件各类型数据点数量（所有分段合计）
+        self._segments: Dict[str, List[Path]] = {}  # 每个文件的分段列表（按顺序，第一个为主文件）
         self.max_file_size_bytes = settings.checkpoint_file_max_size_mb * 1024 * 1024
 
         # 确保根目录存在
         self.storage_root.mkdir(parents=True, exist_ok=True)
 
-    def _get_file_path(self, session_id: str, timestamp: Optional[datetime] = None) -> Path:
+    def _get_file_path(self, session_id: str, timestamp: Optional[datetime] = None, create: bool = True) -> Path:
         """
         构建检查点文件路径
 
         Args:
             session_id: 会话ID
             timestamp: 时间戳（用于日期分区，默认当前时间）
+            create: 是否创建分区目录（只读访问时传False，避免重新创建已归档的分区）
 
         Returns:
             完整文件路径
@@ -56,12 +115,79 @@ class CheckpointFileWriter:
 
         # 构建目录路径
         dir_path = self.storage_root / str(year) / f"{month:02d}" / f"{day:02d}"
-        dir_path.mkdir(parents=True, exist_ok=True)
+        if create:
+            dir_path.mkdir(parents=True, exist_ok=True)
 
         # 文件名
-        file_name = f"{session_id}_data.json"
+        file_name = f"{session_id}_data.ndjson"
         return dir_path / file_name
 
+    def get_artifact_path(
+        self,
+        session_id: str,
+        suffix: str,
+        timestamp: Optional[datetime] = None,
+        create: bool = True,
+    ) -> Path:
+        """
+        会话附属文件路径（与检查点文件同目录，例如{session_id}_embeddings.npz）
+
+        Args:
+            session_id: 会话ID
+            suffix: 文件名后缀（例如"embeddings.npz"）
+            timestamp: 会话所在日期分区（默认当天）
+            create: 是否创建分区目录（只读访问时传False）
+
+        Returns:
+            完整文件路径
+        """
+        data_path = self._get_file_path(session_id, timestamp, create=create)
+        return data_path.with_name(f"{session_id}_{suffix}")
+
+    def save_embeddings(self, session_id: str, store, timestamp: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        保存会话音频嵌入（SessionEmbeddingStore）
+
+        Args:
+            session_id: 会话ID
+            store: SessionEmbeddingStore实例
+            timestamp: 会话所在日期分区（默认当天）
+
+        Returns:
+            文件信息（相对路径、嵌入数量、文件大小），没有数据时返回None
+        """
+        file_path = self.get_artifact_path(session_id, "embeddings.npz", timestamp)
+        lock = self._get_or_create_lock(file_path)
+
+        with lock:
+            file_size = store.save(file_path)
+
+        if file_size is None:
+            return None
+
+        return {
+            "relative_path": self._get_relative_path(file_path),
+            "embedding_count": store.count,
+            "file_size": file_size,
+        }
+
+    def read_embeddings(self, session_id: str, timestamp: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        读取会话音频嵌入
+
+        Args:
+            session_id: 会话ID
+            timestamp: 会话所在日期分区（默认当天，与save_embeddings一致）
+
+        Returns:
+            嵌入数组字典（文件不存在时返回None）
+        """
+        from services.embedding_store import load_session_embeddings
+
+        return load_session_embeddings(
+            self.get_artifact_path(session_id, "embeddings.npz", timestamp, create=False)
+        )
+
     def _get_relative_path(self, file_path: Path) -> str:
         """
         获取相对于storage_root的相对路径（用于数据库存储）
@@ -70,10 +196,30 @@ class CheckpointFileWriter:
             file_path: 完整文件路径
 
         Returns:
-            相对路径字符串（例如：2025/01/21/session_id_data.json）
+            相对路径字符串（例如：2025/01/21/session_id_data.ndjson）
         """
         return str(file_path.relative_to(self.storage_root))
 
+    def find_partition(self, session_id: str) -> Optional[datetime]:
+        """
+        查找会话已有检查点文件所在的日期分区（不含已归档的分区）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            分区日期（最近的一个），没有文件时返回None
+        """
+        pattern = f"[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]/{glob.escape(session_id)}_data.*"
+        partitions = []
+        for path in self.storage_root.glob(pattern):
+            year, month, day = path.parts[-4:-1]
+            try:
+                partitions.append(datetime(int(year), int(month), int(day)))
+            except ValueError:
+                continue
+        return max(partitions) if partitions else None
+
     def _get_or_create_lock(self, file_path: Path) -> Lock:
         """
         获取文件锁（线程安全）
@@ -85,37 +231,255 @@ class CheckpointFileWriter:
             文件锁
         """
         file_key = str(file_path)
-        if file_key not in self.file_locks:
-            self.file_locks[file_key] = Lock()
-        return self.file_locks[file_key]
+        with self._locks_lock:
+            lock = self.file_locks.get(file_key)
+            if lock is None:
+                lock = self.file_locks[file_key] = Lock()
+            return lock
+
+    def _get_legacy_path(self, file_path: Path) -> Path:
+        """旧格式（整文件JSON）检查点文件路径"""
+        return file_path.with_name(file_path.name[: -len(".ndjson")] + ".json")
+
+    def _build_header(
+        self,
+        session_id: str,
+        exam_result_id: Optional[str],
+        metadata: Optional[Dict[str, Any]],
+        created_at: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """构建头记录（文件第一行）"""
+        return {
+            "record": HEADER_RECORD,
+            "format_version": FORMAT_VERSION,
+            "session_id": session_id,
+            "exam_result_id": exam_result_id,
+            "created_at": created_at or datetime.utcnow().isoformat() + "Z",
+            "metadata": metadata or {},
+        }
+
+    def _write_header(self, file_path: Path, header: Dict[str, Any]):
+        """创建只含头记录的新文件（调用方持有文件锁）"""
+        self._remove_segments(file_path)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(_encode_line(header))
+        self._type_counts[str(file_path)] = _empty_counts()
+
+    def _get_segment_path(self, file_path: Path, index: int) -> Path:
+        """第index个分段文件路径（0为主文件，之后为{session_id}_data.0001.ndjson等）"""
+        if index == 0:
+            return file_path
+        return file_path.with_name(f"{file_path.name[: -len('.ndjson')]}.{index:04d}.ndjson")
+
+    def _get_manifest_path(self, file_path: Path) -> Path:
+        """分段清单路径（{session_id}_data.manifest.json，只有发生过滚动时才存在）"""
+        return file_path.with_name(file_path.name[: -len(".ndjson")] + ".manifest.json")
+
+    def _get_segment_paths(self, file_path: Path) -> List[Path]:
+        """
+        获取文件的所有分段（按写入顺序，第一个为主文件）
+
+        首次访问时读取分段清单，之后由滚动维护
+        """
+        file_key = str(file_path)
+        segments = self._segments.get(file_key)
+        if segments is not None:
+            return segments
+
+        manifest_path = self._get_manifest_path(file_path)
+        if manifest_path.exists():
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            segments = [file_path.with_name(segment["file"]) for segment in manifest["segments"]]
+        else:
+            segments = [file_path]
+
+        self._segments[file_key] = segments
+        return segments
+
+    def _write_manifest(self, file_path: Path, segments: List[Path]):
+        """写入分段清单（先写临时文件再原子替换）"""
+        manifest = {
+            "file": file_path.name,
+            "max_segment_size_mb": settings.checkpoint_file_max_size_mb,
+            "updated_at": datetime.utcnow().isoformat() + "Z",
+            "segments": [{"index": index, "file": path.name} for index, path in enumerate(segments)],
+        }
+        manifest_path = self._get_manifest_path(file_path)
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    def _remove_segments(self, file_path: Path):
+        """删除主文件之外的分段和分段清单（调用方持有文件锁）"""
+        for path in self._get_segment_paths(file_path)[1:]:
+            if path.exists():
+                path.unlink()
+        manifest_path = self._get_manifest_path(file_path)
+        if manifest_path.exists():
+            manifest_path.unlink()
+        self._segments[str(file_path)] = [file_path]
+
+    def _get_active_segment(self, session_id: str, file_path: Path) -> Path:
+        """
+        获取当前写入的分段（最后一个分段超过大小上限时先滚动到新分段）
+
+        Args:
+            session_id: 会话ID
+            file_path: 主文件路径
+
+        Returns:
+            本次追加写入的分段路径
+        """
+        segments = self._get_segment_paths(file_path)
+        current = segments[-1]
+        if self.max_file_size_bytes <= 0 or current.stat().st_size < self.max_file_size_bytes:
+            return current
+
+        index = len(segments)
+        current = self._get_segment_path(file_path, index)
+        with open(current, 'w', encoding='utf-8') as f:
+            f.write(_encode_line({"record": SEGMENT_RECORD, "session_id": session_id, "index": index}))
+
+        segments = segments + [current]
+        self._write_manifest(file_path, segments)
+        self._segments[str(file_path)] = segments
+
+        logger.info(
+            "checkpoint_segment_rolled_over",
+            session_id=session_id,
+            segment=current.name,
+            segment_count=len(segments),
+        )
+        return current
+
+    def _get_total_size(self, file_path: Path) -> int:
+        """所有分段的总大小（字节）"""
+        return sum(path.stat().st_size for path in self._get_segment_paths(file_path) if path.exists())
+
+    def _get_columnar_path(self, file_path: Path) -> Path:
+        """列式检查点文件路径（{session_id}_data.npz）"""
+        return file_path.with_name(file_path.name[: -len(".ndjson")] + ".npz")
+
+    def _restore_ndjson(self, session_id: str, file_path: Path) -> bool:
+        """
+        把旧格式JSON文件或列式文件还原为NDJSON（调用方持有文件锁）
+
+        会话结束后又需要追加数据时使用；先写临时文件再原子替换，完成后删除原文件
+
+        Returns:
+            是否存在可还原的文件并已还原
+        """
+        if file_path.exists():
+            return False
+
+        legacy_path = self._get_legacy_path(file_path)
+        columnar_path = self._get_columnar_path(file_path)
+        if legacy_path.exists():
+            source_path = legacy_path
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                source = json.load(f)
+        elif columnar_path.exists():
+            from services.checkpoint_columnar import load_columnar
+
+            source_path = columnar_path
+            source = load_columnar(columnar_path)
+        else:
+            return False
+
+        header = self._build_header(
+            source.get("session_id", session_id),
+            source.get("exam_result_id"),
+            source.get("metadata"),
+            created_at=source.get("created_at"),
+        )
+        self._remove_segments(file_path)
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        counts = _empty_counts()
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(_encode_line(header))
+            for data_type, key in DATA_TYPE_KEYS.items():
+                points = source.get(key, [])
+                for point in points:
+                    f.write(_encode_line(point))
+                counts[data_type] = len(points)
+        os.replace(tmp_path, file_path)
+        source_path.unlink()
+
+        self._type_counts[str(file_path)] = counts
+        logger.info(
+            "checkpoint_file_restored",
+            session_id=session_id,
+            file_path=str(file_path),
+            source=source_path.name,
+            checkpoint_count=sum(counts.values()),
+        )
+        return True
+
+    def _load_counts(self, file_path: Path) -> Dict[str, int]:
+        """
+        获取文件中各类型数据点数量（首次访问时扫描所有分段，之后由追加写入维护）
+
+        扫描时若最后一个分段的最后一行不完整（进程在写入中途退出），补一个换行，
+        使后续追加的记录从新行开始
+        """
+        file_key = str(file_path)
+        counts = self._type_counts.get(file_key)
+        if counts is not None:
+            return counts
+
+        counts = _empty_counts()
+        ends_with_newline = True
+        last_segment = None
+        for segment in self._get_segment_paths(file_path):
+            if not segment.exists():
+                continue
+            last_segment = segment
+            ends_with_newline = True
+            with open(segment, 'r', encoding='utf-8') as f:
+                for line in f:
+                    ends_with_newline = line.endswith("\n")
+                    data_type = _peek_data_type(line)
+                    if data_type in counts:
+                        counts[data_type] += 1
+
+        if not ends_with_newline:
+            logger.warning("checkpoint_file_truncated_line", file_path=str(last_segment))
+            with open(last_segment, 'a', encoding='utf-8') as f:
+                f.write("\n")
+
+        self._type_counts[file_key] = counts
+        return counts
 
     def initialize_file(
         self,
         session_id: str,
         exam_result_id: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[datetime] = None
     ) -> str:
         """
-        初始化检查点文件（创建空JSON结构）
+        初始化检查点文件（写入头记录）
 
         Args:
             session_id: 会话ID
             exam_result_id: 考试结果ID
             metadata: 元数据（如fps、采样策略等）
+            timestamp: 会话所在日期分区（默认当天）
 
         Returns:
             相对文件路径（用于数据库存储）
         """
-        file_path = self._get_file_path(session_id)
+        file_path = self._get_file_path(session_id, timestamp)
         lock = self._get_or_create_lock(file_path)
 
         with lock:
-            # 如果文件已存在，不覆盖
-            if file_path.exists():
+            # 如果文件已存在，不覆盖（旧格式或列式文件还原后继续使用）
+            if self._restore_ndjson(session_id, file_path) or file_path.exists():
                 logger.warning("checkpoint_file_exists", session_id=session_id, file_path=str(file_path))
                 return self._get_relative_path(file_path)
 
-            # 创建初始JSON结构
             logger.info(
                 "initializing_checkpoint_file",
                 session_id=session_id,
@@ -131,25 +495,7 @@ class CheckpointFileWriter:
                     message="Checkpoint文件将创建为exam_result_id=null，请确认是否为设备检测流程"
                 )
 
-            initial_data = {
-                "session_id": session_id,
-                "exam_result_id": exam_result_id,
-                "created_at": datetime.utcnow().isoformat() + "Z",
-                "updated_at": datetime.utcnow().isoformat() + "Z",
-                "metadata": metadata or {},
-                "video_emotions": [],
-                "audio_emotions": [],
-                "heart_rate_data": [],
-                "stats": {
-                    "video_emotion_count": 0,
-                    "audio_emotion_count": 0,
-                    "heart_rate_count": 0
-                }
-            }
-
-            # 写入文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(initial_data, f, ensure_ascii=False, indent=2)
+            self._write_header(file_path, self._build_header(session_id, exam_result_id, metadata))
 
             logger.info(
                 "checkpoint_file_initialized",
@@ -163,41 +509,38 @@ class CheckpointFileWriter:
     def append_data_points(
         self,
         session_id: str,
-        data_points: List[Dict[str, Any]]
+        data_points: List[Dict[str, Any]],
+        timestamp: Optional[datetime] = None
     ) -> Dict[str, Any]:
         """
-        追加数据点到检查点文件（按类型分发到三个数组）
+        追加数据点到检查点文件（每个数据点一行，只写入新数据；超过大小上限时滚动到新分段）
 
         Args:
             session_id: 会话ID
             data_points: 数据点列表
+            timestamp: 会话所在日期分区（默认当天）
 
         Returns:
             文件信息（相对路径、数据点数量、文件大小）
         """
-        file_path = self._get_file_path(session_id)
+        file_path = self._get_file_path(session_id, timestamp)
         lock = self._get_or_create_lock(file_path)
 
         with lock:
-            # 读取现有数据
-            if not file_path.exists():
+            if not file_path.exists() and not self._restore_ndjson(session_id, file_path):
                 logger.error("checkpoint_file_not_found", session_id=session_id, file_path=str(file_path))
                 # 自动初始化
-                self.initialize_file(session_id)
+                self._write_header(file_path, self._build_header(session_id, None, None))
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                checkpoint_data = json.load(f)
+            counts = self._load_counts(file_path)
 
-            # 按data_type分发数据点
+            lines = []
             for point in data_points:
                 data_type = point.get("data_type")
 
-                if data_type == "video_emotion":
-                    checkpoint_data["video_emotions"].append(point)
-                elif data_type == "audio_emotion":
-                    checkpoint_data["audio_emotions"].append(point)
-                elif data_type == "heart_rate":
-                    checkpoint_data["heart_rate_data"].append(point)
+                if data_type in counts:
+                    lines.append(_encode_line(point))
+                    counts[data_type] += 1
                 else:
                     # 未知类型，记录警告
                     logger.warning(
@@ -206,37 +549,21 @@ class CheckpointFileWriter:
                         data_type=data_type
                     )
 
-            # 更新时间戳
-            checkpoint_data["updated_at"] = datetime.utcnow().isoformat() + "Z"
+            # 一次写入本批所有行
+            if lines:
+                with open(self._get_active_segment(session_id, file_path), 'a', encoding='utf-8') as f:
+                    f.write("".join(lines))
 
-            # 更新统计信息
-            video_emotion_count = len(checkpoint_data["video_emotions"])
-            audio_emotion_count = len(checkpoint_data["audio_emotions"])
-            heart_rate_count = len(checkpoint_data["heart_rate_data"])
-
-            checkpoint_data["stats"] = {
-                "video_emotion_count": video_emotion_count,
-                "audio_emotion_count": audio_emotion_count,
-                "heart_rate_count": heart_rate_count
-            }
-
-            # 写回文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
-
-            # 获取文件大小
-            file_size = file_path.stat().st_size
-
-            total_added = len(data_points)
-            total_stored = video_emotion_count + audio_emotion_count + heart_rate_count
+            file_size = self._get_total_size(file_path)
+            total_stored = sum(counts.values())
 
             logger.info(
                 "data_points_appended",
                 session_id=session_id,
-                added_points=total_added,
-                video_emotion_count=video_emotion_count,
-                audio_emotion_count=audio_emotion_count,
-                heart_rate_count=heart_rate_count,
+                added_points=len(lines),
+                video_emotion_count=counts["video_emotion"],
+                audio_emotion_count=counts["audio_emotion"],
+                heart_rate_count=counts["heart_rate"],
                 total_points=total_stored,
                 file_size_kb=round(file_size / 1024, 2)
             )
@@ -247,53 +574,261 @@ class CheckpointFileWriter:
                 "file_size": file_size
             }
 
-    def read_checkpoint_data(self, session_id: str) -> Optional[Dict[str, Any]]:
+    def read_checkpoint_data(self, session_id: str, timestamp: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
         """
         读取检查点文件内容
 
+        返回与旧JSON文件相同的结构（session_id、exam_result_id、metadata、
+        video_emotions、audio_emotions、heart_rate_data、stats等）。
+        按顺序流式读取所有分段；优先读取列式文件（.npz），尚未转换的旧格式文件直接读取；
+        分区已归档时从归档中读取
+
         Args:
             session_id: 会话ID
+            timestamp: 会话所在日期分区（默认当天）
 
         Returns:
             检查点数据（如果文件存在）
         """
-        file_path = self._get_file_path(session_id)
+        file_path = self._get_file_path(session_id, timestamp, create=False)
+
+        columnar_path = self._get_columnar_path(file_path)
+        if columnar_path.exists():
+            from services.checkpoint_columnar import load_columnar
+            return load_columnar(columnar_path)
 
         if not file_path.exists():
-            logger.warning("checkpoint_file_not_found_for_read", session_id=session_id)
+            legacy_path = self._get_legacy_path(file_path)
+            if legacy_path.exists():
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+
+            archived = self._read_archived(session_id, file_path, timestamp)
+            if archived is None:
+                logger.warning("checkpoint_file_not_found_for_read", session_id=session_id)
+            return archived
+
+        segments = [path for path in self._get_segment_paths(file_path) if path.exists()]
+        updated_at = datetime.utcfromtimestamp(segments[-1].stat().st_mtime)
+        return self._parse_ndjson(session_id, _iter_segment_files(segments), updated_at)
+
+    def _read_archived(
+        self,
+        session_id: str,
+        file_path: Path,
+        timestamp: Optional[datetime],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        从日分区归档中读取检查点（列式、NDJSON分段或旧格式JSON）
+
+        Returns:
+            检查点数据，归档中没有该会话时返回None
+        """
+        from services.checkpoint_compactor import read_archived_files
+
+        day = (timestamp or datetime.utcnow()).date()
+        base_name = file_path.name[: -len(".ndjson")]
+        files = read_archived_files(self.storage_root, day, f"{base_name}.")
+        if not files:
             return None
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        logger.info("checkpoint_read_from_archive", session_id=session_id, partition=str(day))
 
-    def get_file_info(self, session_id: str) -> Optional[Dict[str, Any]]:
+        columnar = files.get(self._get_columnar_path(file_path).name)
+        if columnar is not None:
+            from services.checkpoint_columnar import parse_columnar
+            return parse_columnar(io.BytesIO(columnar[0]))
+
+        if file_path.name not in files:
+            legacy = files.get(self._get_legacy_path(file_path).name)
+            return json.loads(legacy[0].decode("utf-8")) if legacy is not None else None
+
+        names = [file_path.name]
+        manifest = files.get(self._get_manifest_path(file_path).name)
+        if manifest is not None:
+            names = [segment["file"] for segment in json.loads(manifest[0].decode("utf-8"))["segments"]]
+        names = [name for name in names if name in files]
+
+        segments = [(name, io.StringIO(files[name][0].decode("utf-8"))) for name in names]
+        updated_at = datetime.utcfromtimestamp(files[names[-1]][1])
+        return self._parse_ndjson(session_id, segments, updated_at)
+
+    def _parse_ndjson(
+        self,
+        session_id: str,
+        segments: Iterable[Tuple[str, Iterable[str]]],
+        updated_at: datetime,
+    ) -> Dict[str, Any]:
         """
-        获取检查点文件信息（不读取内容）
+        按顺序解析NDJSON分段（跳过不完整行）
 
         Args:
             session_id: 会话ID
+            segments: (分段文件名, 行迭代器)序列
+            updated_at: 最后一个分段的修改时间
 
         Returns:
-            文件信息（相对路径、数据点数量、文件大小）
+            检查点数据
         """
-        file_path = self._get_file_path(session_id)
+        header: Dict[str, Any] = {}
+        arrays: Dict[str, List[Dict[str, Any]]] = {key: [] for key in DATA_TYPE_KEYS.values()}
+
+        for segment_name, lines in segments:
+            for line_number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 写入中途退出留下的不完整行
+                    logger.warning(
+                        "checkpoint_line_invalid",
+                        session_id=session_id,
+                        segment=segment_name,
+                        line_number=line_number
+                    )
+                    continue
 
-        if not file_path.exists():
-            return None
+                if record.get("record") == HEADER_RECORD:
+                    header = record
+                    continue
+
+                key = DATA_TYPE_KEYS.get(record.get("data_type"))
+                if key is not None:
+                    arrays[key].append(record)
+
+        return {
+            "session_id": header.get("session_id", session_id),
+            "exam_result_id": header.get("exam_result_id"),
+            "created_at": header.get("created_at"),
+            "updated_at": updated_at.isoformat() + "Z",
+            "metadata": header.get("metadata", {}),
+            **arrays,
+            "stats": {
+                "video_emotion_count": len(arrays["video_emotions"]),
+                "audio_emotion_count": len(arrays["audio_emotions"]),
+                "heart_rate_count": len(arrays["heart_rate_data"])
+            }
+        }
+
+    def compact_to_columnar(self, session_id: str, timestamp: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        把会话的NDJSON检查点（所有分段）转换为列式文件（.npz）并删除NDJSON（会话结束后调用）
+
+        得分和置信度保存为float16，时间戳保存为毫秒精度
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        Args:
+            session_id: 会话ID
+            timestamp: 会话所在日期分区（默认当天）
+
+        Returns:
+            列式文件信息（相对路径、数据点数量、文件大小），没有NDJSON文件时返回None
+        """
+        from services.checkpoint_columnar import save_columnar
 
-        file_size = file_path.stat().st_size
+        file_path = self._get_file_path(session_id, timestamp)
+        lock = self._get_or_create_lock(file_path)
 
-        # 计算总数据点数量
-        stats = data.get("stats", {})
-        total_checkpoint_count = (
-            stats.get("video_emotion_count", 0) +
-            stats.get("audio_emotion_count", 0) +
-            stats.get("heart_rate_count", 0)
+        with lock:
+            if not file_path.exists():
+                return None
+
+            ndjson_size = self._get_total_size(file_path)
+            checkpoint_data = self.read_checkpoint_data(session_id, timestamp)
+            columnar_path = self._get_columnar_path(file_path)
+            file_size = save_columnar(columnar_path, checkpoint_data)
+
+            self._remove_segments(file_path)
+            file_path.unlink()
+            self._type_counts.pop(str(file_path), None)
+
+        checkpoint_count = sum(checkpoint_data["stats"].values())
+        logger.info(
+            "checkpoint_file_compacted",
+            session_id=session_id,
+            file_path=str(columnar_path),
+            checkpoint_count=checkpoint_count,
+            ndjson_size_kb=round(ndjson_size / 1024, 2),
+            columnar_size_kb=round(file_size / 1024, 2),
         )
 
+        return {
+            "relative_path": self._get_relative_path(columnar_path),
+            "checkpoint_count": checkpoint_count,
+            "file_size": file_size
+        }
+
+    def delete_file(self, session_id: str, timestamp: Optional[datetime] = None) -> bool:
+        """
+        删除检查点文件（离线重分析覆盖已有结果时使用，分段、旧格式、列式文件和音频嵌入一并删除）
+
+        Args:
+            session_id: 会话ID
+            timestamp: 会话所在日期分区（默认当天）
+
+        Returns:
+            文件是否存在并已删除
+        """
+        file_path = self._get_file_path(session_id, timestamp)
+        lock = self._get_or_create_lock(file_path)
+
+        with lock:
+            self._type_counts.pop(str(file_path), None)
+            deleted = len(self._get_segment_paths(file_path)) > 1
+            self._remove_segments(file_path)
+            stale_paths = (
+                file_path,
+                self._get_legacy_path(file_path),
+                self._get_columnar_path(file_path),
+                file_path.with_name(f"{session_id}_embeddings.npz"),
+            )
+            for path in stale_paths:
+                if path.exists():
+                    path.unlink()
+                    deleted = True
+
+        if deleted:
+            logger.info("checkpoint_file_deleted", session_id=session_id, file_path=str(file_path))
+        return deleted
+
+    def get_file_info(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取检查点文件信息（不解析数据点内容，大小为所有分段合计）
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            文件信息（相对路径、数据点数量、文件大小）
+        """
+        file_path = self._get_file_path(session_id)
+        lock = self._get_or_create_lock(file_path)
+
+        with lock:
+            columnar_path = self._get_columnar_path(file_path)
+            if columnar_path.exists():
+                from services.checkpoint_columnar import count_columnar
+
+                total_checkpoint_count = count_columnar(columnar_path)
+                file_path = columnar_path
+                file_size = file_path.stat().st_size
+            elif not file_path.exists():
+                legacy_path = self._get_legacy_path(file_path)
+                if not legacy_path.exists():
+                    return None
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    stats = json.load(f).get("stats", {})
+                total_checkpoint_count = (
+                    stats.get("video_emotion_count", 0) +
+                    stats.get("audio_emotion_count", 0) +
+                    stats.get("heart_rate_count", 0)
+                )
+                file_path = legacy_path
+                file_size = file_path.stat().st_size
+            else:
+                total_checkpoint_count = sum(self._load_counts(file_path).values())
+                file_size = self._get_total_size(file_path)
+
         return {
             "relative_path": self._get_relative_path(file_path),
             "checkpoint_count": total_checkpoint_count,
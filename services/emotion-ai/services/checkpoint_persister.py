@@ -0,0 +1,285 @@
+"""
+检查点异步持久化
+独立写入线程负责所有检查点文件I/O，事件循环只把数据点放入每个会话的待写队列
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from services.checkpoint_file_writer import get_checkpoint_file_writer
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 写入失败后的重试间隔（秒，指数退避）
+_RETRY_BASE_DELAY = 1.0
+_RETRY_MAX_DELAY = 60.0
+
+
+class _SessionQueue:
+    """单个会话的待写数据和等待者"""
+
+    def __init__(self):
+        self.pending: List[Dict[str, Any]] = []
+        self.submitted_seq = 0    # 已提交的批次序号
+        self.written_seq = 0      # 已写入磁盘的批次序号
+        self.last_info: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[Exception] = None
+        self.failures = 0         # 连续写入失败次数
+        self.retry_at = 0.0       # 下一次重试时间（单调时钟）
+        # (需要等到的批次序号, future, 所属事件循环)
+        self.waiters: List[Tuple[int, asyncio.Future, asyncio.AbstractEventLoop]] = []
+
+
+class CheckpointPersister:
+    """
+    检查点写入线程
+
+    - submit()只把数据点放入会话队列（不阻塞事件循环）
+    - 写入线程每次取走一个会话的全部待写数据点，合并为一次追加写入：
+      磁盘慢时多次刷新自动合并，队列长度不随刷新次数增长
+    - flush()返回可等待的持久化点：在此之前提交的数据全部写入文件后完成
+    - 写入失败时数据点放回队列，按指数退避（1s起，最长60s）自动重试；flush()立即重试
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, _SessionQueue] = {}
+        self._ready: Set[str] = set()
+        self._retrying: Set[str] = set()  # 写入失败、等待退避重试的会话
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # 统计
+        self.batches_written = 0
+        self.points_written = 0
+        self.write_failures = 0
+
+    def _ensure_thread(self):
+        """启动写入线程（调用方持有条件锁）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run,
+                name="checkpoint-persister",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def submit(self, session_id: str, data_points: List[Dict[str, Any]]):
+        """
+        提交数据点（立即返回）
+
+        Args:
+            session_id: 会话ID
+            data_points: JSON友好格式的数据点列表
+        """
+        if not data_points:
+            return
+
+        with self._cond:
+            queue = self._sessions.setdefault(session_id, _SessionQueue())
+            queue.pending.extend(data_points)
+            queue.submitted_seq += 1
+            if session_id not in self._retrying:
+                # 退避中的会话由重试计时统一写入
+                self._ready.add(session_id)
+            self._ensure_thread()
+            self._cond.notify()
+
+    async def flush(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        等待会话已提交的数据点全部写入文件
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            最后一次写入的文件信息（相对路径、数据点数量、文件大小），从未写入时返回None
+
+        Raises:
+            Exception: 写入失败时抛出写入线程的异常
+        """
+        loop = asyncio.get_running_loop()
+
+        with self._cond:
+            queue = self._sessions.get(session_id)
+            if queue is None:
+                return None
+            if queue.written_seq >= queue.submitted_seq:
+                return queue.last_info
+
+            future = loop.create_future()
+            queue.waiters.append((queue.submitted_seq, future, loop))
+            # 之前写入失败的会话立即重试
+            self._retrying.discard(session_id)
+            self._ready.add(session_id)
+            self._ensure_thread()
+            self._cond.notify()
+
+        return await future
+
+    def discard(self, session_id: str):
+        """释放会话队列（会话结束且已flush后调用）"""
+        with self._cond:
+            queue = self._sessions.get(session_id)
+            if queue is not None and not queue.pending and not queue.waiters:
+                del self._sessions[session_id]
+                self._ready.discard(session_id)
+                self._retrying.discard(session_id)
+
+    def _run(self):
+        """写入线程主循环"""
+        file_writer = get_checkpoint_file_writer()
+
+        while True:
+            with self._cond:
+                while True:
+                    timeout = self._promote_retries()
+                    if self._ready or self._stopping:
+                        break
+                    self._cond.wait(timeout)
+                if not self._ready:
+                    return
+
+                session_id = self._ready.pop()
+                queue = self._sessions[session_id]
+                points, queue.pending = queue.pending, []
+                seq = queue.submitted_seq
+
+            info = None
+            error = None
+            try:
+                if points:
+                    info = file_writer.append_data_points(session_id, points)
+                else:
+                    # 没有新数据（只等待持久化点），返回当前文件信息
+                    info = queue.last_info or file_writer.get_file_info(session_id)
+            except Exception as e:
+                error = e
+                logger.error(
+                    "checkpoint_persist_failed",
+                    session_id=session_id,
+                    points=len(points),
+                    error=str(e),
+                )
+
+            with self._cond:
+                if error is None:
+                    queue.written_seq = seq
+                    queue.last_info = info
+                    queue.last_error = None
+                    queue.failures = 0
+                    if points:
+                        self.batches_written += 1
+                        self.points_written += len(points)
+                    done = [w for w in queue.waiters if w[0] <= seq]
+                    queue.waiters = [w for w in queue.waiters if w[0] > seq]
+                else:
+                    # 放回队首，保持写入顺序
+                    queue.pending[:0] = points
+                    queue.last_error = error
+                    queue.failures += 1
+                    self.write_failures += 1
+                    done, queue.waiters = queue.waiters, []
+
+                    if not self._stopping:
+                        delay = min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** (queue.failures - 1))
+                        queue.retry_at = time.monotonic() + delay
+                        self._retrying.add(session_id)
+                        self._ready.discard(session_id)
+                        logger.warning(
+                            "checkpoint_persist_retry_scheduled",
+                            session_id=session_id,
+                            pending_points=len(queue.pending),
+                            failures=queue.failures,
+                            delay_seconds=delay,
+                        )
+
+            for _, future, loop in done:
+                try:
+                    loop.call_soon_threadsafe(_resolve, future, info, error)
+                except RuntimeError:
+                    # 事件循环已关闭
+                    pass
+
+    def _promote_retries(self) -> Optional[float]:
+        """
+        把退避时间已到的会话放回待写集合（调用方持有条件锁）
+
+        Returns:
+            距下一个重试的等待时间（秒），没有等待重试的会话时返回None
+        """
+        if not self._retrying:
+            return None
+
+        now = time.monotonic()
+        next_delay = None
+        for session_id in list(self._retrying):
+            queue = self._sessions.get(session_id)
+            if queue is None:
+                self._retrying.discard(session_id)
+            elif self._stopping or queue.retry_at <= now:
+                # 关闭时不再等待退避，最后尝试一次
+                self._retrying.discard(session_id)
+                self._ready.add(session_id)
+            else:
+                delay = queue.retry_at - now
+                next_delay = delay if next_delay is None else min(next_delay, delay)
+        return next_delay
+
+    def shutdown(self, timeout: float = 10.0):
+        """
+        写完所有待写数据后停止写入线程（服务关闭时调用）
+
+        Args:
+            timeout: 最长等待时间（秒）
+        """
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify()
+
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning("checkpoint_persister_shutdown_timeout")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入统计信息"""
+        with self._cond:
+            pending_points = sum(len(queue.pending) for queue in self._sessions.values())
+            return {
+                "sessions": len(self._sessions),
+                "pending_points": pending_points,
+                "retrying_sessions": len(self._retrying),
+                "batches_written": self.batches_written,
+                "points_written": self.points_written,
+                "write_failures": self.write_failures,
+            }
+
+
+def _resolve(future: asyncio.Future, info: Optional[Dict[str, Any]], error: Optional[Exception]):
+    """在事件循环线程中完成等待者的future"""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(info)
+
+
+# ============================================================================
+# 全局实例
+# ============================================================================
+
+_checkpoint_persister: Optional[CheckpointPersister] = None
+
+
+def get_checkpoint_persister() -> CheckpointPersister:
+    """获取全局检查点写入线程实例"""
+    global _checkpoint_persister
+    if _checkpoint_persister is None:
+        _checkpoint_persister = CheckpointPersister()
+    return _checkpoint_persister
@@ -132,7 +132,7 @@ class DataWriter:
         metadata: Optional[Dict[str, Any]] = None
     ) -> str:
         """
-        初始化检查点文件（创建空JSON结构）
+        初始化检查点文件（写入头记录）
 
         Args:
             session_id: 会话ID
@@ -155,7 +155,7 @@ class DataWriter:
         data_points: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
         """
-        写入检查点数据到JSON文件
+        追加检查点数据到NDJSON文件
 
         Args:
             session_id: 会话ID
@@ -0,0 +1,144 @@
+"""
+音频嵌入存储
+保存每个音频片段的emotion2vec嵌入（float16），供后续重新打分、聚类和报告生成使用，无需重新跑模型
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class SessionEmbeddingStore:
+    """
+    每个会话一个的嵌入存储（内存中按容量倍增的float16数组，会话结束时写入.npz）
+
+    文件内容：
+    - embeddings: (N, D) float16
+    - segment_numbers: (N,) int32，对应检查点metadata.audio_segment_number
+    - timestamps: (N,) float64，UTC时间戳（秒）
+    - dominant_emotions: (N,) 字符串
+    """
+
+    def __init__(self, session_id: str, initial_capacity: int = 256):
+        """
+        Args:
+            session_id: 会话ID
+            initial_capacity: 初始容量（片段数）
+        """
+        self.session_id = session_id
+        self.initial_capacity = initial_capacity
+
+        self.count = 0
+        self._embeddings: Optional[np.ndarray] = None
+        self._segment_numbers = np.zeros(initial_capacity, dtype=np.int32)
+        self._timestamps = np.zeros(initial_capacity, dtype=np.float64)
+        self._emotions: list = []
+
+    @property
+    def dim(self) -> Optional[int]:
+        """嵌入维度（尚未写入时为None）"""
+        return self._embeddings.shape[1] if self._embeddings is not None else None
+
+    def append(self, embedding: Any, segment_number: int, timestamp: float, dominant_emotion: str = ""):
+        """
+        追加一个片段的嵌入
+
+        Args:
+            embedding: 一维嵌入向量（list或ndarray）
+            segment_number: 音频片段序号
+            timestamp: UTC时间戳（秒）
+            dominant_emotion: 主导情绪
+        """
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.initial_capacity, vector.size), dtype=np.float16)
+        elif vector.size != self._embeddings.shape[1]:
+            logger.warning(
+                "embedding_dim_mismatch",
+                session_id=self.session_id,
+                expected=self._embeddings.shape[1],
+                actual=vector.size,
+            )
+            return
+
+        if self.count == len(self._embeddings):
+            self._grow()
+
+        self._embeddings[self.count] = vector
+        self._segment_numbers[self.count] = segment_number
+        self._timestamps[self.count] = timestamp
+        self._emotions.append(dominant_emotion)
+        self.count += 1
+
+    def _grow(self):
+        """容量翻倍"""
+        capacity = len(self._embeddings) * 2
+        self._embeddings = np.resize(self._embeddings, (capacity, self._embeddings.shape[1]))
+        self._segment_numbers = np.resize(self._segment_numbers, capacity)
+        self._timestamps = np.resize(self._timestamps, capacity)
+
+    def save(self, file_path: Path) -> Optional[int]:
+        """
+        写入.npz文件（先写临时文件再原子替换）
+
+        Args:
+            file_path: 目标路径
+
+        Returns:
+            文件大小（字节），没有数据时返回None
+        """
+        if self.count == 0:
+            return None
+
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                embeddings=self._embeddings[:self.count],
+                segment_numbers=self._segment_numbers[:self.count],
+                timestamps=self._timestamps[:self.count],
+                dominant_emotions=np.array(self._emotions, dtype=str),
+            )
+        os.replace(tmp_path, file_path)
+
+        file_size = file_path.stat().st_size
+        logger.info(
+            "audio_embeddings_saved",
+            session_id=self.session_id,
+            count=self.count,
+            dim=self.dim,
+            file_size_kb=round(file_size / 1024, 2),
+        )
+        return file_size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        return {
+            "count": self.count,
+            "dim": self.dim,
+            "memory_kb": (
+                round(self._embeddings.nbytes / 1024, 1) if self._embeddings is not None else 0
+            ),
+        }
+
+
+def load_session_embeddings(file_path: Path) -> Optional[Dict[str, np.ndarray]]:
+    """
+    读取会话嵌入文件
+
+    Args:
+        file_path: .npz文件路径
+
+    Returns:
+        {'embeddings', 'segment_numbers', 'timestamps', 'dominant_emotions'}，文件不存在时返回None
+    """
+    if not file_path.exists():
+        return None
+
+    with np.load(file_path) as data:
+        return {key: data[key] for key in data.files}
@@ -0,0 +1,537 @@
+"""
+帧分析流水线
+人脸检测只执行一次，检测结果同时供情绪分类和PPG心率检测使用
+
+情绪分类直接调用DeepFace情绪模型，同一批次的人脸一次前向推理；
+预处理（归一化、等比缩放补边到224x224）与DeepFace.analyze(detector_backend="skip")相同。
+
+批量路径用到DeepFace的内部模块（deepface.modules.preprocessing），只在已验证的版本上启用，
+启用前用一个固定样本对比批量路径与DeepFace.analyze的结果（主导情绪相同、得分差在容差内）；
+版本不匹配或对比失败时回退到models.deepface_analyzer.analyze_emotion逐帧推理，
+只有回退时才初始化该封装器。
+
+与models.deepface_analyzer.analyze_emotion的对应关系（结果可以互换使用）：
+- 人脸检测：同一个DeepFace检测器（settings.deepface_backend），人脸框对应analyze()的region；
+  裁剪不做人脸对齐，倾斜较大的人脸得分可能与analyze()略有差异
+- 情绪模型：DeepFace.build_model("Emotion")，即analyze()内部使用的同一个模型实例
+- emotion_scores：7类百分比（和为100），对应analyze()结果的emotion字段
+- confidence：主导情绪得分/100；face_region：{x, y, w, h}
+"""
+
+import threading
+import numpy as np
+from typing import Optional, Dict, Any, List, NamedTuple, Tuple
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 人脸框格式：(x, y, w, h)
+FaceBox = Tuple[int, int, int, int]
+
+
+class FrameRequest(NamedTuple):
+    """
+    带人脸框的推理请求（跟踪模式：跳过检测，直接对给定人脸框做情绪分类）
+
+    image可以是BGR帧或共享内存帧环的FrameSlot
+    """
+
+    image: Any
+    face_box: FaceBox
+    face_count: int = 1
+
+
+def detect_faces(frame: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    人脸检测阶段（使用settings.deepface_backend）
+
+    Args:
+        frame: BGR帧
+
+    Returns:
+        人脸列表（按面积从大到小），每项包含box和confidence
+    """
+    from deepface import DeepFace
+
+    faces = DeepFace.extract_faces(
+        img_path=frame,
+        detector_backend=settings.deepface_backend,
+        enforce_detection=False,
+        align=False,
+    )
+
+    detections = []
+    for face in faces:
+        # enforce_detection=False时，未检测到人脸会返回整帧且confidence为0
+        confidence = float(face.get("confidence") or 0.0)
+        if confidence < settings.face_detection_min_confidence:
+            continue
+
+        area = face.get("facial_area") or {}
+        box = (int(area.get("x", 0)), int(area.get("y", 0)), int(area.get("w", 0)), int(area.get("h", 0)))
+        if box[2] <= 0 or box[3] <= 0:
+            continue
+
+        detections.append({"box": box, "confidence": confidence})
+
+    detections.sort(key=lambda d: d["box"][2] * d["box"][3], reverse=True)
+    return detections
+
+
+def crop_face(frame: np.ndarray, box: FaceBox) -> Optional[np.ndarray]:
+    """
+    按人脸框裁剪（视图，不复制）
+
+    Args:
+        frame: BGR帧
+        box: 人脸框 (x, y, w, h)
+
+    Returns:
+        人脸区域，框无效时返回None
+    """
+    x, y, w, h = box
+    frame_h, frame_w = frame.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(frame_w, x + w), min(frame_h, y + h)
+
+    if x1 <= x0 or y1 <= y0:
+        return None
+
+    return frame[y0:y1, x0:x1]
+
+
+# DeepFace Emotion模型的输出顺序
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+# DeepFace.analyze送入属性模型前的输入尺寸
+_ANALYZE_INPUT_SIZE = (224, 224)
+
+# 已验证批量路径与DeepFace.analyze一致的版本（升级DeepFace时需重新验证后加入）
+_BATCHED_DEEPFACE_VERSIONS = ("0.0.95",)
+
+# 一致性检查的得分容差（百分点）
+_PARITY_TOLERANCE = 0.5
+
+_emotion_model = None
+_emotion_model_lock = threading.Lock()
+
+# 批量路径状态：None表示尚未检查
+_batched_enabled: Optional[bool] = None
+_batched_lock = threading.Lock()
+_resize_image = None
+
+
+def get_emotion_model():
+    """
+    获取DeepFace情绪模型（每个进程构建一次，与DeepFace.analyze内部使用的是同一个缓存实例）
+
+    Returns:
+        DeepFace EmotionClient
+    """
+    global _emotion_model
+    if _emotion_model is None:
+        with _emotion_model_lock:
+            if _emotion_model is None:
+                from deepface import DeepFace
+
+                _emotion_model = DeepFace.build_model(task="facial_attribute", model_name="Emotion")
+    return _emotion_model
+
+
+def prepare_emotion_input(face_crop: np.ndarray) -> np.ndarray:
+    """
+    按DeepFace.analyze(detector_backend="skip")的方式预处理人脸：
+    归一化到[0, 1]，等比缩放并补边到224x224（BGR）
+
+    只能在batched_emotion_enabled()返回True后调用
+
+    Args:
+        face_crop: BGR人脸区域（uint8）
+
+    Returns:
+        (224, 224, 3) float32，可直接堆叠为批次
+    """
+    face = face_crop.astype(np.float32) / 255.0
+    return _resize_image(img=face, target_size=_ANALYZE_INPUT_SIZE)[0]
+
+
+def format_emotion_result(predictions: np.ndarray) -> Dict[str, Any]:
+    """
+    把模型输出格式化为情绪结果
+
+    emotion_scores为百分比（和为100），confidence为主导情绪得分/100
+
+    Args:
+        predictions: (7,) 模型输出
+
+    Returns:
+        {'dominant_emotion', 'emotion_scores', 'confidence'}
+    """
+    total = float(predictions.sum()) or 1.0
+    emotion_scores = {
+        label: 100.0 * float(predictions[i]) / total
+        for i, label in enumerate(EMOTION_LABELS)
+    }
+    dominant_emotion = EMOTION_LABELS[int(np.argmax(predictions))]
+
+    return {
+        "dominant_emotion": dominant_emotion,
+        "emotion_scores": emotion_scores,
+        "confidence": emotion_scores[dominant_emotion] / 100.0,
+    }
+
+
+def classify_emotions(inputs: List[np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    批量情绪分类：所有人脸一次前向推理
+
+    Args:
+        inputs: prepare_emotion_input()的输出列表
+
+    Returns:
+        与输入等长的情绪结果列表
+    """
+    if not inputs:
+        return []
+
+    predictions = np.asarray(get_emotion_model().predict(list(inputs)))
+    predictions = predictions.reshape(len(inputs), len(EMOTION_LABELS))
+    return [format_emotion_result(row) for row in predictions]
+
+
+def check_emotion_parity(face_crop: np.ndarray, tolerance: float = _PARITY_TOLERANCE) -> Tuple[bool, float]:
+    """
+    对比同一人脸在批量路径和DeepFace.analyze(detector_backend="skip")下的结果
+
+    Args:
+        face_crop: BGR人脸区域（uint8）
+        tolerance: 得分容差（百分点）
+
+    Returns:
+        (主导情绪相同且各类得分差不超过容差, 最大得分差)
+    """
+    from deepface import DeepFace
+
+    batched = classify_emotions([prepare_emotion_input(face_crop)])[0]
+    reference = DeepFace.analyze(
+        img_path=face_crop,
+        actions=["emotion"],
+        detector_backend="skip",
+        enforce_detection=False,
+        silent=True,
+    )[0]
+
+    max_diff = max(
+        abs(batched["emotion_scores"][label] - float(reference["emotion"][label]))
+        for label in EMOTION_LABELS
+    )
+    same_dominant = batched["dominant_emotion"] == reference["dominant_emotion"]
+    return same_dominant and max_diff <= tolerance, max_diff
+
+
+def _parity_sample() -> np.ndarray:
+    """一致性检查用的固定样本（平滑渐变，避免各类得分过于接近）"""
+    ys, xs = np.mgrid[0:96, 0:80]
+    return np.stack([xs * 3, ys * 2, (xs + ys) * 1.4], axis=-1).astype(np.uint8)
+
+
+def _init_batched_emotion() -> bool:
+    """检查DeepFace版本并做一致性检查，决定是否启用批量路径"""
+    global _resize_image
+
+    try:
+        from importlib.metadata import version
+        deepface_version = version("deepface")
+    except Exception:
+        deepface_version = None
+
+    if deepface_version not in _BATCHED_DEEPFACE_VERSIONS:
+        logger.warning(
+            "deepface_batched_emotion_disabled",
+            deepface_version=deepface_version,
+            supported_versions=list(_BATCHED_DEEPFACE_VERSIONS),
+            message="DeepFace版本未验证，情绪分类回退到逐帧analyze",
+        )
+        return False
+
+    try:
+        from deepface.modules.preprocessing import resize_image
+
+        _resize_image = resize_image
+        parity_ok, max_diff = check_emotion_parity(_parity_sample())
+    except Exception as e:
+        logger.warning(
+            "deepface_batched_emotion_disabled",
+            deepface_version=deepface_version,
+            error=str(e),
+            error_type=type(e).__name__,
+            message="批量路径初始化失败，情绪分类回退到逐帧analyze",
+        )
+        return False
+
+    if not parity_ok:
+        logger.error(
+            "deepface_batched_emotion_parity_failed",
+            deepface_version=deepface_version,
+            max_score_diff=round(max_diff, 4),
+            tolerance=_PARITY_TOLERANCE,
+            message="批量路径与DeepFace.analyze结果不一致，情绪分类回退到逐帧analyze",
+        )
+        return False
+
+    logger.info(
+        "deepface_batched_emotion_enabled",
+        deepface_version=deepface_version,
+        max_score_diff=round(max_diff, 4),
+    )
+    return True
+
+
+def batched_emotion_enabled() -> bool:
+    """
+    是否使用批量情绪分类路径（每个进程检查一次）
+
+    Returns:
+        False时analyze_frames()逐帧调用models.deepface_analyzer.analyze_emotion
+    """
+    global _batched_enabled
+    if _batched_enabled is None:
+        with _batched_lock:
+            if _batched_enabled is None:
+                _batched_enabled = _init_batched_emotion()
+    return _batched_enabled
+
+
+def _get_deepface_wrapper():
+    """获取DeepFace封装器（仅回退路径使用，首次调用时初始化）"""
+    from models.deepface_analyzer import get_deepface_analyzer
+
+    deepface = get_deepface_analyzer()
+    if not deepface.is_initialized:
+        deepface.initialize()
+    return deepface
+
+
+def load_emotion_models() -> bool:
+    """
+    预加载情绪分类实际使用的模型（进程启动或会话开始时调用）
+
+    Returns:
+        是否使用批量路径（否则已初始化封装器）
+    """
+    if batched_emotion_enabled():
+        return True
+    _get_deepface_wrapper()
+    return False
+
+
+def is_emotion_model_loaded() -> bool:
+    """当前进程是否已加载情绪分类模型（供健康检查使用）"""
+    if _batched_enabled:
+        return _emotion_model is not None
+    from models.deepface_analyzer import get_deepface_analyzer
+
+    return get_deepface_analyzer().is_initialized
+
+
+def classify_emotion(face_crop: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    情绪分类阶段（输入已裁剪的人脸，跳过检测）
+
+    Args:
+        face_crop: BGR人脸区域
+
+    Returns:
+        {'dominant_emotion', 'emotion_scores', 'confidence'}
+    """
+    if batched_emotion_enabled():
+        return classify_emotions([prepare_emotion_input(face_crop)])[0]
+
+    result = _get_deepface_wrapper().analyze_emotion(face_crop)
+    if result is None:
+        return None
+    return {key: result[key] for key in ("dominant_emotion", "emotion_scores", "confidence")}
+
+
+def _locate_face(
+    frame: np.ndarray,
+    face_box: Optional[FaceBox] = None,
+    face_count: int = 1,
+) -> Optional[Tuple[np.ndarray, FaceBox, int]]:
+    """
+    检测（或使用已知人脸框）并预处理最大人脸
+
+    Returns:
+        (模型输入, 人脸框, 人脸数)，未检测到人脸时返回None
+    """
+    if face_box is not None:
+        box = face_box
+    else:
+        faces = detect_faces(frame)
+        if not faces:
+            return None
+        box = faces[0]["box"]
+        face_count = len(faces)
+
+    face_crop = crop_face(frame, box)
+    if face_crop is None:
+        return None
+
+    return prepare_emotion_input(face_crop), box, face_count
+
+
+def _with_face_info(emotion: Dict[str, Any], box: FaceBox, face_count: int) -> Dict[str, Any]:
+    """附加人脸信息（face_detected、face_count、face_region）"""
+    x, y, w, h = box
+    emotion.update({
+        "face_detected": True,
+        "face_count": face_count,
+        "face_region": {"x": x, "y": y, "w": w, "h": h},
+    })
+    return emotion
+
+
+def analyze_frame(
+    frame: np.ndarray,
+    face_box: Optional[FaceBox] = None,
+    face_count: int = 1,
+) -> Optional[Dict[str, Any]]:
+    """
+    分析单帧：检测一次人脸，对最大人脸做情绪分类
+
+    Args:
+        frame: BGR帧
+        face_box: 已知人脸框（跟踪得到，给出时跳过检测）
+        face_count: 已知人脸数（与face_box一起使用）
+
+    Returns:
+        情绪结果（附带face_detected、face_count、face_region），未检测到人脸时返回None
+    """
+    item = FrameRequest(frame, face_box, face_count) if face_box is not None else frame
+    return analyze_frames([item])[0]
+
+
+def _resolve_request(item: Any) -> Tuple[np.ndarray, Optional[FaceBox], int]:
+    """解析推理请求（BGR帧、FrameSlot或FrameRequest）为(帧, 已知人脸框, 人脸数)"""
+    from services.frame_ring import FrameSlot, resolve_frame_slot
+
+    if isinstance(item, FrameRequest):
+        image = resolve_frame_slot(item.image) if isinstance(item.image, FrameSlot) else item.image
+        return image, item.face_box, item.face_count
+
+    if isinstance(item, FrameSlot):
+        return resolve_frame_slot(item), None, 1
+
+    return item, None, 1
+
+
+def _analyze_with_wrapper(item: Any) -> Optional[Dict[str, Any]]:
+    """回退路径：逐帧调用models.deepface_analyzer.analyze_emotion"""
+    frame, face_box, face_count = _resolve_request(item)
+
+    if face_box is not None:
+        face_crop = crop_face(frame, face_box)
+        if face_crop is None:
+            return None
+        emotion = classify_emotion(face_crop)
+        return _with_face_info(emotion, face_box, face_count) if emotion else None
+
+    result = _get_deepface_wrapper().analyze_emotion(frame)
+    if result is None:
+        return None
+    box = face_region_to_box(result.get("face_region"))
+    if box is None:
+        return None
+    emotion = {key: result[key] for key in ("dominant_emotion", "emotion_scores", "confidence")}
+    return _with_face_info(emotion, box, 1)
+
+
+def analyze_request(item: Any) -> Optional[Dict[str, Any]]:
+    """
+    分析单个推理请求
+
+    Args:
+        item: BGR帧、FrameSlot或FrameRequest
+
+    Returns:
+        情绪结果
+    """
+    return analyze_frames([item])[0]
+
+
+def analyze_frames(frames: List[Any]) -> List[Optional[Dict[str, Any]]]:
+    """
+    批量分析（供推理调度器调用）
+
+    人脸检测逐帧进行（单帧失败不影响同批其它帧），检测到的人脸堆叠后
+    由情绪模型一次前向推理完成分类；批量路径不可用时逐帧调用封装器
+
+    Args:
+        frames: BGR帧、FrameSlot或FrameRequest列表
+
+    Returns:
+        与输入等长的结果列表
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(frames)
+
+    if not batched_emotion_enabled():
+        for index, frame in enumerate(frames):
+            try:
+                results[index] = _analyze_with_wrapper(frame)
+            except Exception as e:
+                logger.error("emotion_analysis_failed", error=str(e), error_type=type(e).__name__)
+        return results
+
+    inputs: List[np.ndarray] = []
+    located: List[Tuple[int, FaceBox, int]] = []
+
+    for index, frame in enumerate(frames):
+        try:
+            face = _locate_face(*_resolve_request(frame))
+        except Exception as e:
+            logger.error("face_detection_failed", error=str(e), error_type=type(e).__name__)
+            continue
+        if face is not None:
+            model_input, box, face_count = face
+            inputs.append(model_input)
+            located.append((index, box, face_count))
+
+    if not inputs:
+        return results
+
+    try:
+        emotions = classify_emotions(inputs)
+    except Exception as e:
+        logger.error(
+            "emotion_batch_failed",
+            batch_size=len(inputs),
+            error=str(e),
+            error_type=type(e).__name__,
+        )
+        return results
+
+    for (index, box, face_count), emotion in zip(located, emotions):
+        results[index] = _with_face_info(emotion, box, face_count)
+
+    return results
+
+
+def face_region_to_box(face_region: Optional[Dict[str, int]]) -> Optional[FaceBox]:
+    """
+    将结果中的face_region字典转换为人脸框元组
+
+    Args:
+        face_region: {'x', 'y', 'w', 'h'}
+
+    Returns:
+        (x, y, w, h)，无效时返回None
+    """
+    if not face_region:
+        return None
+
+    box = (face_region.get("x", 0), face_region.get("y", 0), face_region.get("w", 0), face_region.get("h", 0))
+    if box[2] <= 0 or box[3] <= 0:
+        return None
+
+    return box
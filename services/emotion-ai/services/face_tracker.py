@@ -0,0 +1,213 @@
+"""
+人脸跟踪器
+两次检测之间用稀疏光流传播人脸框，检测器只每K帧或跟踪置信度下降时运行
+"""
+
+from typing import Any, Dict, Optional
+import cv2
+import numpy as np
+from config import settings
+from services.face_analysis import FaceBox
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 光流参数
+_LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+)
+_MAX_FEATURES = 40
+_MIN_FEATURES = 6
+
+
+class FaceTracker:
+    """
+    每个流一个的人脸跟踪器（Lucas-Kanade稀疏光流）
+
+    功能：
+    - 检测后在人脸框内提取角点，之后每帧用光流估计平移和缩放
+    - 跟踪置信度 = 成功跟踪的角点比例；低于阈值或角点过少时判定丢失
+    - 连续跟踪满face_detect_interval帧后强制重新检测
+    - 在缩小的灰度图上计算（track_width），每帧开销约1-2ms
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        detect_interval: Optional[int] = None,
+        min_confidence: Optional[float] = None,
+        track_width: int = 320,
+    ):
+        """
+        Args:
+            session_id: 会话ID（用于日志）
+            detect_interval: 两次检测之间最多跟踪的帧数（默认取settings.face_detect_interval）
+            min_confidence: 最低跟踪置信度（默认取settings.face_tracking_min_confidence）
+            track_width: 光流计算分辨率宽度
+        """
+        self.session_id = session_id
+        self.detect_interval = max(
+            1, settings.face_detect_interval if detect_interval is None else detect_interval
+        )
+        self.min_confidence = (
+            settings.face_tracking_min_confidence if min_confidence is None else min_confidence
+        )
+        self.track_width = track_width
+
+        self.box: Optional[FaceBox] = None  # 原始帧坐标
+        self.face_count = 0
+        self.confidence = 0.0
+        self.frames_since_detection = 0
+
+        self._prev_gray: Optional[np.ndarray] = None
+        self._points: Optional[np.ndarray] = None
+        self._scale = 1.0
+
+        # 统计
+        self.detections = 0
+        self.tracked_frames = 0
+        self.track_losses = 0
+
+    @property
+    def is_tracking(self) -> bool:
+        """当前是否有可用的跟踪框"""
+        return self.box is not None
+
+    def _to_gray(self, frame: np.ndarray) -> np.ndarray:
+        """缩小并转灰度"""
+        height, width = frame.shape[:2]
+        self._scale = min(1.0, self.track_width / width) if width else 1.0
+        if self._scale < 1.0:
+            frame = cv2.resize(
+                frame,
+                (int(width * self._scale), int(height * self._scale)),
+                interpolation=cv2.INTER_AREA,
+            )
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def on_detection(self, frame: np.ndarray, box: Optional[FaceBox], face_count: int = 0):
+        """
+        用检测结果（原始帧坐标）重新初始化跟踪
+
+        Args:
+            frame: 检测所用的原始帧
+            box: 检测到的人脸框，None表示未检测到人脸
+            face_count: 检测到的人脸数
+        """
+        self.detections += 1
+        self.frames_since_detection = 0
+
+        if box is None:
+            self.reset()
+            return
+
+        gray = self._to_gray(frame)
+        x, y, w, h = (int(v * self._scale) for v in box)
+        mask = np.zeros_like(gray)
+        mask[max(0, y):y + h, max(0, x):x + w] = 255
+
+        points = cv2.goodFeaturesToTrack(
+            gray, maxCorners=_MAX_FEATURES, qualityLevel=0.01, minDistance=3, mask=mask
+        )
+        if points is None or len(points) < _MIN_FEATURES:
+            # 纹理太少无法跟踪，下一帧继续检测
+            self.reset()
+            return
+
+        self.box = box
+        self.face_count = face_count
+        self.confidence = 1.0
+        self._prev_gray = gray
+        self._points = points
+
+    def track(self, frame: np.ndarray) -> Optional[FaceBox]:
+        """
+        将人脸框传播到当前帧
+
+        Args:
+            frame: 当前原始帧
+
+        Returns:
+            跟踪到的人脸框（原始帧坐标）；需要重新检测时返回None
+        """
+        if self.box is None or self._prev_gray is None:
+            return None
+
+        if self.frames_since_detection >= self.detect_interval:
+            return None
+
+        gray = self._to_gray(frame)
+        if gray.shape != self._prev_gray.shape:
+            self.reset()
+            return None
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+            self._prev_gray, gray, self._points, None, **_LK_PARAMS
+        )
+        if next_points is None:
+            self._lose_track()
+            return None
+
+        ok = status.reshape(-1) == 1
+        self.confidence = float(ok.mean()) if len(ok) else 0.0
+        if self.confidence < self.min_confidence or ok.sum() < _MIN_FEATURES:
+            self._lose_track()
+            return None
+
+        old = self._points.reshape(-1, 2)[ok]
+        new = next_points.reshape(-1, 2)[ok]
+
+        # 平移取中位数；缩放取点到中心距离之比的中位数（抗离群点）
+        dx, dy = np.median(new - old, axis=0)
+        old_spread = np.linalg.norm(old - old.mean(axis=0), axis=1)
+        new_spread = np.linalg.norm(new - new.mean(axis=0), axis=1)
+        valid = old_spread > 1e-3
+        zoom = float(np.median(new_spread[valid] / old_spread[valid])) if valid.any() else 1.0
+        zoom = min(1.2, max(0.8, zoom))
+
+        x, y, w, h = self.box
+        cx = x + w / 2 + dx / self._scale
+        cy = y + h / 2 + dy / self._scale
+        w, h = w * zoom, h * zoom
+
+        frame_h, frame_w = frame.shape[:2]
+        box = (int(round(cx - w / 2)), int(round(cy - h / 2)), int(round(w)), int(round(h)))
+        if box[2] <= 0 or box[3] <= 0 or box[0] + box[2] <= 0 or box[1] + box[3] <= 0 \
+                or box[0] >= frame_w or box[1] >= frame_h:
+            self._lose_track()
+            return None
+
+        self.box = box
+        self._prev_gray = gray
+        self._points = new.reshape(-1, 1, 2)
+        self.frames_since_detection += 1
+        self.tracked_frames += 1
+        return box
+
+    def _lose_track(self):
+        """跟踪丢失，下一帧重新检测"""
+        self.track_losses += 1
+        logger.debug("face_track_lost", session_id=self.session_id, confidence=round(self.confidence, 2))
+        self.reset()
+
+    def reset(self):
+        """清空跟踪状态"""
+        self.box = None
+        self.face_count = 0
+        self._prev_gray = None
+        self._points = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取跟踪统计信息"""
+        total = self.detections + self.tracked_frames
+        return {
+            "is_tracking": self.is_tracking,
+            "confidence": round(self.confidence, 2),
+            "detect_interval": self.detect_interval,
+            "detections": self.detections,
+            "tracked_frames": self.tracked_frames,
+            "track_losses": self.track_losses,
+            "detection_ratio": round(self.detections / total, 3) if total else None,
+        }
@@ -0,0 +1,476 @@
+"""
+ffmpeg单进程拉流
+每个RTSP流只启动一个ffmpeg进程：视频缩放后以BGR原始帧输出到stdout，音频重采样为16kHz PCM输出到独立管道
+
+两个管道各由一个排空线程持续读取到有界缓冲区（满时丢弃最旧数据），
+任一消费者停顿都不会写满管道阻塞ffmpeg，进而拖住另一路输出
+"""
+
+import asyncio
+import os
+import subprocess
+import threading
+from collections import deque
+from typing import BinaryIO, Deque, List, Optional, Tuple
+import numpy as np
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# read()单次等待时长（秒），每次醒来检查是否已被release()关闭
+_READ_WAIT_SECONDS = 0.5
+
+
+class AudioChunkBuffer:
+    """
+    有界音频缓冲区（排空线程写入，事件循环读取）
+
+    - put()在排空线程中调用，总字节数超过上限时丢弃最旧的数据块（块按采样对齐）
+    - readexactly()在事件循环中等待，接口与asyncio.StreamReader.readexactly一致
+    - close()后读完剩余数据即返回EOF（IncompleteReadError）
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes: 缓冲上限（字节）
+        """
+        self.max_bytes = max(1, max_bytes)
+        self._chunks: Deque[bytes] = deque()
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._waiter: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = None
+
+        # 统计
+        self.bytes_dropped = 0
+
+    def _notify(self):
+        """唤醒等待中的读取方（调用方持有锁）"""
+        if self._waiter is not None:
+            loop, event = self._waiter
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def put(self, chunk: bytes):
+        """写入一个数据块（超过上限时丢弃最旧的块）"""
+        with self._lock:
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+            while self._size > self.max_bytes and len(self._chunks) > 1:
+                dropped = self._chunks.popleft()
+                self._size -= len(dropped)
+                self.bytes_dropped += len(dropped)
+            self._notify()
+
+    def close(self):
+        """标记写入结束"""
+        with self._lock:
+            self._closed = True
+            self._notify()
+
+    async def readexactly(self, n: int) -> bytes:
+        """
+        读取恰好n字节
+
+        Raises:
+            asyncio.IncompleteReadError: 写入已结束且剩余数据不足n字节
+        """
+        event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self._lock:
+                if self._size >= n or self._closed:
+                    data = b"".join(self._chunks)
+                    self._chunks.clear()
+                    if len(data) > n:
+                        self._chunks.append(data[n:])
+                    self._size = len(data) - min(n, len(data))
+                    self._waiter = None
+                    if len(data) < n:
+                        raise asyncio.IncompleteReadError(data, n)
+                    return data[:n]
+
+                event.clear()
+                self._waiter = (loop, event)
+            await event.wait()
+
+    @property
+    def buffered_bytes(self) -> int:
+        """当前缓冲的字节数"""
+        return self._size
+
+
+class FFmpegIngest:
+    """
+    ffmpeg拉流进程（视频+音频共用一个RTSP连接）
+
+    功能：
+    - 视频：fps限流 + 等比缩放并补边到固定分辨率，bgr24原始帧写入stdout
+    - 音频：16kHz单声道s16le写入额外管道（audio_stream）；
+      启用服务内重采样时按audio_ingest_sample_rate/audio_ingest_channels输出，由AudioExtractor转换
+    - 视频侧提供与cv2.VideoCapture一致的isOpened()/read()/release()接口，
+      FrameGrabber和共享内存帧环无需修改即可使用（read(slot)复制到槽位）
+    - 视频和音频管道各由一个排空线程读取：视频帧缓冲ffmpeg_ingest_buffer_frames帧，
+      音频缓冲ffmpeg_ingest_audio_buffer_seconds秒，满时丢弃最旧数据并计数
+    """
+
+    def __init__(
+        self,
+        rtsp_url: str,
+        session_id: str,
+        with_audio: bool = True,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        fps: Optional[float] = None,
+    ):
+        """
+        Args:
+            rtsp_url: RTSP流URL
+            session_id: 会话ID（用于日志）
+            with_audio: 是否输出音频管道（没有音频消费者时关闭，避免无用的音频解码和缓冲）
+            width: 输出帧宽度（默认取settings.ffmpeg_ingest_width）
+            height: 输出帧高度（默认取settings.ffmpeg_ingest_height）
+            fps: 输出帧率上限（默认取settings.ffmpeg_ingest_fps，0表示不限）
+        """
+        self.rtsp_url = rtsp_url
+        self.session_id = session_id
+        self.with_audio = with_audio
+        self.width = width or settings.ffmpeg_ingest_width
+        self.height = height or settings.ffmpeg_ingest_height
+        self.fps = settings.ffmpeg_ingest_fps if fps is None else fps
+        if settings.audio_resample_in_service:
+            self.sample_rate = settings.audio_ingest_sample_rate
+            self.channels = settings.audio_ingest_channels
+        else:
+            self.sample_rate = settings.emotion2vec_sample_rate
+            self.channels = 1
+
+        self.frame_shape: Tuple[int, int, int] = (self.height, self.width, 3)
+        self.frame_bytes = self.height * self.width * 3
+
+        self.process: Optional[subprocess.Popen] = None
+        self.audio_stream: Optional[BinaryIO] = None
+        self._threads: List[threading.Thread] = []
+
+        # 视频帧缓冲（排空线程写入，read()取出）；取出/丢弃的数组回收复用
+        self.buffer_frames = max(1, settings.ffmpeg_ingest_buffer_frames)
+        self._frames: Deque[np.ndarray] = deque()
+        self._free_frames: List[np.ndarray] = []
+        self._frames_cond = threading.Condition()
+        self._video_ended = False
+        self._closed = False
+
+        # 音频缓冲（按采样对齐的数据块）
+        self.sample_bytes = 2 * self.channels
+        self.audio_buffer: Optional[AudioChunkBuffer] = None
+
+        # 统计
+        self.frames_read = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.bytes_read = 0
+        self.audio_bytes_read = 0
+
+    def _build_command(self, audio_fd: Optional[int]) -> list:
+        """构建ffmpeg命令"""
+        video_filters = []
+        if self.fps and self.fps > 0:
+            video_filters.append(f"fps={self.fps}")
+        video_filters.append(
+            f"scale={self.width}:{self.height}:force_original_aspect_ratio=decrease"
+        )
+        video_filters.append(f"pad={self.width}:{self.height}:(ow-iw)/2:(oh-ih)/2")
+
+        cmd = [
+            'ffmpeg',
+            '-hide_banner',
+            '-loglevel', 'warning',
+            '-rtsp_transport', 'tcp',         # 强制使用TCP传输（更稳定）
+        ]
+        if settings.ffmpeg_ingest_rw_timeout_seconds > 0:
+            # 读写超时（微秒）：源停止发送数据时ffmpeg报错退出，而不是永久阻塞
+            cmd += ['-rw_timeout', str(int(settings.ffmpeg_ingest_rw_timeout_seconds * 1_000_000))]
+        cmd += [
+            '-i', self.rtsp_url,
+            # 视频输出：缩放后的BGR原始帧
+            '-map', '0:v:0',
+            '-an',
+            '-vf', ','.join(video_filters),
+            '-pix_fmt', 'bgr24',
+            '-f', 'rawvideo',
+            'pipe:1',
+        ]
+
+        if audio_fd is not None:
+            # 音频输出：PCM写入额外管道
+            cmd += [
+                '-map', '0:a:0',
+                '-vn',
+                '-ar', str(self.sample_rate),
+                '-ac', str(self.channels),
+                '-acodec', 'pcm_s16le',
+                '-f', 's16le',
+                f'pipe:{audio_fd}',
+            ]
+
+        return cmd
+
+    def open(self) -> bool:
+        """
+        启动ffmpeg进程
+
+        Returns:
+            是否启动成功
+        """
+        audio_read_fd: Optional[int] = None
+        audio_write_fd: Optional[int] = None
+
+        try:
+            if self.with_audio:
+                audio_read_fd, audio_write_fd = os.pipe()
+
+            self.process = subprocess.Popen(
+                self._build_command(audio_write_fd),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                pass_fds=(audio_write_fd,) if audio_write_fd is not None else (),
+                bufsize=0,
+            )
+
+            targets = [("stderr", self._drain_stderr), ("video", self._drain_video)]
+            if audio_read_fd is not None:
+                # 写端只保留在子进程中，ffmpeg退出后读端才能读到EOF
+                os.close(audio_write_fd)
+                audio_write_fd = None
+                self.audio_stream = os.fdopen(audio_read_fd, 'rb', buffering=0)
+                audio_read_fd = None
+                audio_buffer_bytes = int(settings.ffmpeg_ingest_audio_buffer_seconds * self.sample_rate) * self.sample_bytes
+                self.audio_buffer = AudioChunkBuffer(audio_buffer_bytes)
+                targets.append(("audio", self._drain_audio))
+
+            self._threads = [
+                threading.Thread(target=target, name=f"ffmpeg-{name}-{self.session_id}", daemon=True)
+                for name, target in targets
+            ]
+            for thread in self._threads:
+                thread.start()
+
+            logger.info(
+                "ffmpeg_ingest_started",
+                session_id=self.session_id,
+                pid=self.process.pid,
+                frame_shape=self.frame_shape,
+                fps=self.fps,
+                with_audio=self.with_audio,
+            )
+            return True
+
+        except Exception as e:
+            logger.error("ffmpeg_ingest_start_error", session_id=self.session_id, error=str(e))
+            for fd in (audio_read_fd, audio_write_fd):
+                if fd is not None:
+                    os.close(fd)
+            return False
+
+    def wait_ready(self, timeout: float = 10.0) -> bool:
+        """
+        等待第一帧到达（阻塞，应在线程池中调用）
+
+        第一帧留在缓冲区中，下一次read()返回
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            是否在超时前收到第一帧
+        """
+        if not self.isOpened():
+            return False
+
+        with self._frames_cond:
+            self._frames_cond.wait_for(lambda: self._frames or self._video_ended, timeout)
+            return bool(self._frames)
+
+    def isOpened(self) -> bool:
+        """ffmpeg进程是否在运行（与cv2.VideoCapture接口一致）"""
+        return self.process is not None and self.process.poll() is None
+
+    def set(self, prop_id: int, value) -> bool:
+        """兼容cv2.VideoCapture.set()（ffmpeg模式下无需设置）"""
+        return False
+
+    def _read_exact(self, out: np.ndarray) -> bool:
+        """从stdout读取恰好一帧到out中（排空线程调用）"""
+        view = memoryview(out).cast('B')
+        received = 0
+        while received < self.frame_bytes:
+            n = self.process.stdout.readinto(view[received:])
+            if not n:
+                return False
+            received += n
+        self.bytes_read += received
+        return True
+
+    def _drain_video(self):
+        """持续读取视频管道到帧缓冲区（满时丢弃最旧帧，ffmpeg不会因读取方停顿而阻塞）"""
+        try:
+            while True:
+                with self._frames_cond:
+                    frame = self._free_frames.pop() if self._free_frames else None
+                if frame is None:
+                    frame = np.empty(self.frame_shape, dtype=np.uint8)
+
+                if not self._read_exact(frame):
+                    break
+
+                with self._frames_cond:
+                    self.frames_decoded += 1
+                    if len(self._frames) >= self.buffer_frames:
+                        self._free_frames.append(self._frames.popleft())
+                        self.frames_dropped += 1
+                    self._frames.append(frame)
+                    self._frames_cond.notify()
+        except Exception as e:
+            logger.error("ffmpeg_video_drain_error", session_id=self.session_id, error=str(e))
+        finally:
+            with self._frames_cond:
+                self._video_ended = True
+                self._frames_cond.notify_all()
+
+    def _drain_audio(self):
+        """持续读取音频管道到音频缓冲区（按采样对齐，满时丢弃最旧数据）"""
+        chunk_bytes = max(self.sample_bytes, (self.sample_rate // 10) * self.sample_bytes)  # 约100ms
+        remainder = b""
+        try:
+            while True:
+                data = self.audio_stream.read(chunk_bytes)
+                if not data:
+                    break
+                self.audio_bytes_read += len(data)
+
+                data = remainder + data
+                aligned = len(data) - len(data) % self.sample_bytes
+                remainder = data[aligned:]
+                if aligned:
+                    self.audio_buffer.put(data[:aligned])
+        except Exception as e:
+            if self.isOpened():
+                logger.error("ffmpeg_audio_drain_error", session_id=self.session_id, error=str(e))
+        finally:
+            self.audio_buffer.close()
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        读取一帧（与cv2.VideoCapture.read()接口一致）
+
+        Args:
+            image: 可选的输出数组，形状匹配时直接读入（零拷贝写入共享内存槽位）
+
+        Returns:
+            (是否成功, BGR帧)
+        """
+        if self.process is None or self.process.stdout is None:
+            return False, None
+
+        with self._frames_cond:
+            # 分段等待：release()从其它线程关闭时能及时返回
+            while not (self._frames or self._video_ended or self._closed):
+                self._frames_cond.wait(_READ_WAIT_SECONDS)
+            if not self._frames or self._closed:
+                return False, None
+            frame = self._frames.popleft()
+
+        if image is None or image.shape != self.frame_shape or image.dtype != np.uint8:
+            image = frame
+        else:
+            image[...] = frame
+            with self._frames_cond:
+                self._free_frames.append(frame)
+
+        self.frames_read += 1
+        return True, image
+
+    def release(self):
+        """
+        停止ffmpeg进程并关闭管道（与cv2.VideoCapture接口一致）
+
+        可以在read()阻塞时从其它线程调用：先唤醒读取方，重复调用直接返回
+        """
+        if self.process is None:
+            return
+
+        with self._frames_cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._frames_cond.notify_all()
+
+        try:
+            if self.process.poll() is None:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=3)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+        except Exception as e:
+            logger.error("ffmpeg_ingest_termination_error", session_id=self.session_id, error=str(e))
+
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+        for stream in (self.process.stdout, self.audio_stream):
+            try:
+                if stream:
+                    stream.close()
+            except Exception:
+                pass
+
+        logger.info(
+            "ffmpeg_ingest_stopped",
+            session_id=self.session_id,
+            frames_read=self.frames_read,
+            frames_dropped=self.frames_dropped,
+            audio_bytes_dropped=self.audio_buffer.bytes_dropped if self.audio_buffer else 0,
+            returncode=self.process.returncode,
+        )
+
+    def _drain_stderr(self):
+        """持续读取stderr（避免管道写满阻塞ffmpeg），记录错误和警告"""
+        try:
+            for line in iter(self.process.stderr.readline, b''):
+                line_str = line.decode('utf-8', errors='ignore').strip()
+                if not line_str:
+                    continue
+
+                if 'error' in line_str.lower() or 'failed' in line_str.lower():
+                    logger.error("ffmpeg_stderr_error", session_id=self.session_id, message=line_str)
+                else:
+                    logger.warning("ffmpeg_stderr_warning", session_id=self.session_id, message=line_str)
+
+        except Exception as e:
+            logger.error("ffmpeg_stderr_monitor_error", session_id=self.session_id, error=str(e))
+
+    def get_stats(self) -> dict:
+        """获取拉流统计信息"""
+        return {
+            "running": self.isOpened(),
+            "pid": self.process.pid if self.process else None,
+            "frame_shape": list(self.frame_shape),
+            "fps": self.fps,
+            "with_audio": self.with_audio,
+            "frames_read": self.frames_read,
+            "frames_decoded": self.frames_decoded,
+            "frames_dropped": self.frames_dropped,
+            "bytes_read": self.bytes_read,
+            "audio_bytes_read": self.audio_bytes_read,
+            "audio_bytes_buffered": self.audio_buffer.buffered_bytes if self.audio_buffer else 0,
+            "audio_bytes_dropped": self.audio_buffer.bytes_dropped if self.audio_buffer else 0,
+        }
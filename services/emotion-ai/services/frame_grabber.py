@@ -0,0 +1,292 @@
+"""
+帧抓取线程
+在独立线程中读取cv2.VideoCapture，避免阻塞asyncio事件循环
+"""
+
+import asyncio
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Optional, Tuple, Dict, Any
+from services.frame_ring import SharedFrameRing
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def read_retry_delay(consecutive_failures: int) -> float:
+    """
+    读帧失败后的重试间隔（第一次失败立即重试，之后从5ms开始翻倍，上限0.5秒）
+
+    Args:
+        consecutive_failures: 连续失败次数
+
+    Returns:
+        等待时间（秒）
+    """
+    if consecutive_failures <= 1:
+        return 0.0
+    return min(0.5, 0.005 * 2 ** (consecutive_failures - 2))
+
+
+class FrameGrabber:
+    """
+    帧抓取器（每个RTSP流一个线程）
+
+    功能：
+    - 独立线程中持续调用cap.read()，慢速RTSP源不会拖住其它消费器
+    - 单槽缓冲区：只保留最新一帧，未被消费的旧帧直接丢弃
+    - 新帧到达时通过asyncio.Event唤醒事件循环中的消费者（wait_latest()，无需轮询）
+    - 可选共享内存帧环：帧直接解码进预分配槽位，推理进程按索引读取
+    - 统计抓帧数、丢帧数、读取失败数
+    """
+
+    def __init__(self, cap: cv2.VideoCapture, session_id: str, ring_slots: int = 0):
+        """
+        Args:
+            cap: 已打开的VideoCapture（由抓取线程负责释放）
+            session_id: 会话ID（用于日志）
+            ring_slots: 共享内存帧环槽位数（0表示不使用帧环）
+        """
+        self.cap = cap
+        self.session_id = session_id
+        self.ring_slots = ring_slots
+        self.frame_ring: Optional[SharedFrameRing] = None
+
+        # 单槽缓冲区
+        self._lock = threading.Lock()
+        self._frame: Optional[np.ndarray] = None
+        self._frame_time: float = 0.0
+        self._frame_seq: int = 0
+        self._frame_slot: Optional[int] = None
+
+        # 线程控制
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 新帧就绪事件（start()时绑定调用方的事件循环）
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready: Optional[asyncio.Event] = None
+
+        # 统计
+        self.frames_grabbed = 0
+        self.frames_dropped = 0
+        self.read_failures = 0
+        self.last_grab_time: Optional[float] = None
+
+    def start(self):
+        """启动抓取线程"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._ready = asyncio.Event()
+        except RuntimeError:
+            # 不在事件循环中启动时只能轮询get_latest()
+            self._loop = None
+            self._ready = None
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"frame-grabber-{self.session_id}",
+            daemon=True,
+        )
+        self._thread.start()
+
+        logger.info("frame_grabber_started", session_id=self.session_id)
+
+    def stop(self, timeout: float = 5.0):
+        """
+        停止抓取线程（阻塞直到线程退出或超时，应在线程池中调用）
+
+        Args:
+            timeout: 等待线程退出的最长时间（秒）
+        """
+        self._stop_event.set()
+
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logger.warning("frame_grabber_stop_timeout", session_id=self.session_id)
+
+        logger.info(
+            "frame_grabber_stopped",
+            session_id=self.session_id,
+            frames_grabbed=self.frames_grabbed,
+            frames_dropped=self.frames_dropped,
+        )
+
+    @property
+    def is_alive(self) -> bool:
+        """抓取线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_latest(self) -> Optional[Tuple[np.ndarray, float, int, Optional[int]]]:
+        """
+        取出最新一帧（取出后槽位清空）
+
+        帧位于共享内存帧环中时，调用方用完后需要release_slot()
+
+        Returns:
+            (帧, 抓取时间monotonic, 帧序号, 帧环槽位索引)，没有新帧时返回None
+        """
+        with self._lock:
+            if self._frame is None:
+                return None
+            item = (self._frame, self._frame_time, self._frame_seq, self._frame_slot)
+            self._frame = None
+            self._frame_slot = None
+            return item
+
+    async def wait_latest(self, timeout: Optional[float] = None) -> Optional[Tuple[np.ndarray, float, int, Optional[int]]]:
+        """
+        等待并取出最新一帧（抓取线程写入新帧或退出时唤醒）
+
+        Args:
+            timeout: 最长等待时间（秒，None表示一直等待）
+
+        Returns:
+            同get_latest()，超时或线程退出时返回None
+        """
+        item = self.get_latest()
+        if item is not None or self._ready is None:
+            return item
+
+        # 先清除事件再复查，避免错过清除前刚写入的帧
+        self._ready.clear()
+        item = self.get_latest()
+        if item is not None or not self.is_alive:
+            return item
+
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.get_latest()
+
+    def _notify(self):
+        """从抓取线程唤醒事件循环中的等待者"""
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # 事件循环已关闭
+            self._loop = None
+
+    def release_slot(self, slot: Optional[int]):
+        """归还帧环槽位"""
+        if slot is not None and self.frame_ring:
+            self.frame_ring.release(slot)
+
+    def close_ring(self):
+        """释放帧环（抓取线程停止且没有在途推理后调用）"""
+        if not self.frame_ring:
+            return
+
+        # 抓取线程仍可能在往槽位里解码，此时不能释放
+        if self.is_alive:
+            logger.warning("shared_frame_ring_close_skipped", session_id=self.session_id)
+            return
+
+        with self._lock:
+            self._frame = None
+            self._frame_slot = None
+
+        self.frame_ring.close()
+        self.frame_ring = None
+
+    def _read_into_ring(self) -> Tuple[bool, Optional[np.ndarray], Optional[int]]:
+        """
+        读取一帧，尽量直接解码进帧环槽位
+
+        Returns:
+            (是否成功, 帧, 槽位索引)
+        """
+        slot = self.frame_ring.acquire() if self.frame_ring else None
+        if slot is None:
+            ret, frame = self.cap.read()
+        else:
+            ret, frame = self.cap.read(self.frame_ring.slot(slot))
+            # 分辨率变化时OpenCV会重新分配，此时不再使用槽位
+            if not ret or frame is None or not np.shares_memory(frame, self.frame_ring.frames):
+                self.frame_ring.release(slot)
+                slot = None
+
+        # 第一帧确定形状后创建帧环
+        if ret and frame is not None and self.ring_slots and self.frame_ring is None:
+            try:
+                self.frame_ring = SharedFrameRing(self.session_id, frame.shape, self.ring_slots)
+            except Exception as e:
+                logger.error("shared_frame_ring_create_failed", session_id=self.session_id, error=str(e))
+                self.ring_slots = 0
+
+        return ret, frame, slot
+
+    def _run(self):
+        """抓取线程主循环"""
+        consecutive_failures = 0
+        try:
+            while not self._stop_event.is_set():
+                ret, frame, slot = self._read_into_ring()
+
+                if not ret or frame is None:
+                    self.read_failures += 1
+                    consecutive_failures += 1
+                    logger.warning("rtsp_frame_read_failed", session_id=self.session_id)
+                    # 偶发失败立即重试，连续失败时指数退避（上限0.5秒）
+                    self._stop_event.wait(read_retry_delay(consecutive_failures))
+                    continue
+
+                consecutive_failures = 0
+
+                now = time.monotonic()
+                with self._lock:
+                    # 槽位中的旧帧还没被消费，直接覆盖（丢帧）
+                    if self._frame is not None:
+                        self.frames_dropped += 1
+                        self.release_slot(self._frame_slot)
+                    self._frame = frame
+                    self._frame_time = now
+                    self._frame_seq += 1
+                    self._frame_slot = slot
+
+                self.frames_grabbed += 1
+                self.last_grab_time = now
+                self._notify()
+
+        except Exception as e:
+            logger.error(
+                "frame_grabber_error",
+                session_id=self.session_id,
+                error=str(e),
+                error_type=type(e).__name__,
+            )
+
+        finally:
+            # 唤醒等待者（线程退出后is_alive为False，消费者据此结束）
+            self._notify()
+
+            # 由抓取线程释放VideoCapture，避免read()进行中被其它线程释放
+            try:
+                self.cap.release()
+            except Exception as e:
+                logger.error("frame_grabber_release_error", session_id=self.session_id, error=str(e))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取抓取统计信息"""
+        return {
+            "is_alive": self.is_alive,
+            "frames_grabbed": self.frames_grabbed,
+            "frames_dropped": self.frames_dropped,
+            "read_failures": self.read_failures,
+            "frame_ring": self.frame_ring.get_stats() if self.frame_ring else None,
+            "last_grab_age_ms": (
+                round((time.monotonic() - self.last_grab_time) * 1000, 1)
+                if self.last_grab_time
+                else None
+            ),
+        }
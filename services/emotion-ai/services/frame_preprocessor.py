@@ -0,0 +1,238 @@
+"""
+推理前帧预处理
+缩放到推理分辨率，并按上一次的人脸框裁剪带边距的ROI，定期回到整帧重新检测
+"""
+
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import cv2
+import numpy as np
+from config import settings
+from services.face_analysis import FaceBox
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 裁剪区域格式：(x, y, w, h)，原始帧坐标
+Region = Tuple[int, int, int, int]
+
+
+class PreparedFrame(NamedTuple):
+    """预处理结果（推理图像 + 映射回原始帧坐标所需的信息）"""
+
+    image: np.ndarray
+    region: Optional[Region]  # 裁剪区域（None表示整帧）
+    scale: float              # 裁剪后的缩放比例（<=1）
+
+
+def compute_scale(width: int, height: int, max_width: int) -> float:
+    """
+    计算缩放比例（只缩小不放大）
+
+    Args:
+        width: 图像宽度
+        height: 图像高度
+        max_width: 推理分辨率宽度上限（0表示不缩放）
+
+    Returns:
+        缩放比例
+    """
+    if max_width <= 0 or width <= max_width:
+        return 1.0
+    return max_width / width
+
+
+def pad_region(box: FaceBox, frame_w: int, frame_h: int, padding: float = 0.0) -> Optional[Region]:
+    """
+    人脸框加边距并裁剪到帧范围内
+
+    Args:
+        box: 人脸框 (x, y, w, h)
+        frame_w: 帧宽度
+        frame_h: 帧高度
+        padding: 边距（相对人脸框宽高的比例）
+
+    Returns:
+        裁剪区域，与帧不相交时返回None
+    """
+    x, y, w, h = box
+    pad_x = int(w * padding)
+    pad_y = int(h * padding)
+
+    x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+    x1, y1 = min(frame_w, x + w + pad_x), min(frame_h, y + h + pad_y)
+    if x1 <= x0 or y1 <= y0:
+        return None
+
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def crop_and_scale(frame: np.ndarray, region: Optional[Region], scale: float) -> np.ndarray:
+    """
+    按区域裁剪并缩放（裁剪是视图，只有缩放会分配新内存）
+
+    主进程和推理进程（帧环槽位）共用
+
+    Args:
+        frame: BGR帧
+        region: 裁剪区域（None表示整帧）
+        scale: 缩放比例
+
+    Returns:
+        推理图像
+    """
+    if region is not None:
+        x, y, w, h = region
+        frame = frame[y:y + h, x:x + w]
+
+    if scale < 1.0:
+        height, width = frame.shape[:2]
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    return frame
+
+
+def map_result_to_frame(
+    result: Optional[Dict[str, Any]],
+    region: Optional[Region],
+    scale: float,
+) -> Optional[Dict[str, Any]]:
+    """
+    将推理结果中的face_region映射回原始帧坐标（原地修改）
+
+    Args:
+        result: 推理结果
+        region: 裁剪区域
+        scale: 缩放比例
+
+    Returns:
+        映射后的结果
+    """
+    if not result or not result.get("face_region"):
+        return result
+
+    if region is None and scale == 1.0:
+        return result
+
+    offset_x, offset_y = (region[0], region[1]) if region else (0, 0)
+    face = result["face_region"]
+    result["face_region"] = {
+        "x": int(round(face.get("x", 0) / scale)) + offset_x,
+        "y": int(round(face.get("y", 0) / scale)) + offset_y,
+        "w": int(round(face.get("w", 0) / scale)),
+        "h": int(round(face.get("h", 0) / scale)),
+    }
+    return result
+
+
+class FramePreprocessor:
+    """
+    每个流一个的推理前预处理器
+
+    功能：
+    - 整帧模式：缩放到推理分辨率宽度（inference_frame_width）
+    - ROI模式：上一次检测到人脸时，按人脸框加边距裁剪，裁剪后再按需缩放
+    - 人脸丢失或距上次整帧检测超过face_roi_redetect_seconds时回到整帧模式
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        max_width: Optional[int] = None,
+        roi_padding: Optional[float] = None,
+        redetect_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            session_id: 会话ID（用于日志）
+            max_width: 推理分辨率宽度上限（默认取settings.inference_frame_width）
+            roi_padding: ROI边距（相对人脸框宽高的比例，默认取settings.face_roi_padding）
+            redetect_seconds: 整帧重新检测间隔（秒，默认取settings.face_roi_redetect_seconds）
+        """
+        self.session_id = session_id
+        self.max_width = settings.inference_frame_width if max_width is None else max_width
+        self.roi_padding = settings.face_roi_padding if roi_padding is None else roi_padding
+        self.redetect_seconds = (
+            settings.face_roi_redetect_seconds if redetect_seconds is None else redetect_seconds
+        )
+
+        self.last_face_box: Optional[FaceBox] = None
+        self.last_full_frame_time = 0.0
+
+        # 统计
+        self.full_frames = 0
+        self.roi_frames = 0
+        self.roi_misses = 0
+
+    def plan(self, frame_shape: Tuple[int, ...], now: Optional[float] = None) -> Tuple[Optional[Region], float]:
+        """
+        决定本帧的裁剪区域和缩放比例（不处理像素）
+
+        Args:
+            frame_shape: 原始帧形状
+            now: 当前时间（秒，单调时钟）
+
+        Returns:
+            (裁剪区域, 缩放比例)
+        """
+        now = now if now is not None else time.monotonic()
+        frame_h, frame_w = frame_shape[:2]
+
+        region = None
+        if (
+            self.last_face_box is not None
+            and self.roi_padding >= 0
+            and now - self.last_full_frame_time < self.redetect_seconds
+        ):
+            region = pad_region(self.last_face_box, frame_w, frame_h, self.roi_padding)
+
+        if region is None:
+            self.full_frames += 1
+            self.last_full_frame_time = now
+            return None, compute_scale(frame_w, frame_h, self.max_width)
+
+        self.roi_frames += 1
+        return region, compute_scale(region[2], region[3], self.max_width)
+
+    def prepare(self, frame: np.ndarray, now: Optional[float] = None) -> PreparedFrame:
+        """
+        生成推理图像
+
+        Args:
+            frame: 原始BGR帧
+            now: 当前时间（秒，单调时钟）
+
+        Returns:
+            PreparedFrame
+        """
+        region, scale = self.plan(frame.shape, now)
+        return PreparedFrame(crop_and_scale(frame, region, scale), region, scale)
+
+    def update(self, result: Optional[Dict[str, Any]], region: Optional[Region]):
+        """
+        用推理结果（已映射回原始帧坐标）更新人脸框
+
+        Args:
+            result: 推理结果
+            region: 本次使用的裁剪区域
+        """
+        face = result.get("face_region") if result else None
+        if face and face.get("w", 0) > 0 and face.get("h", 0) > 0:
+            self.last_face_box = (face["x"], face["y"], face["w"], face["h"])
+            return
+
+        if region is not None:
+            # ROI内丢失人脸，下一帧回到整帧检测
+            self.roi_misses += 1
+        self.last_face_box = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取预处理统计信息"""
+        return {
+            "max_width": self.max_width,
+            "full_frames": self.full_frames,
+            "roi_frames": self.roi_frames,
+            "roi_misses": self.roi_misses,
+            "tracking_face": self.last_face_box is not None,
+        }
@@ -0,0 +1,253 @@
+"""
+共享内存帧环
+每个消费器预分配固定形状的帧槽位，推理进程通过槽位索引直接读取帧，无需复制和序列化
+"""
+
+import multiprocessing
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Collection, Dict, NamedTuple, Optional, Set, Tuple
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class FrameSlot(NamedTuple):
+    """帧槽位引用（可跨进程传递，只有几十字节）"""
+
+    shm_name: str
+    num_slots: int
+    shape: Tuple[int, ...]
+    index: int
+    region: Optional[Tuple[int, int, int, int]] = None  # 推理进程中裁剪的ROI（原始帧坐标）
+    scale: float = 1.0                                  # 裁剪后的缩放比例
+
+
+# 本进程创建且尚未关闭的帧环（推理进程据此释放已关闭会话的映射）
+_live_rings: Set[str] = set()
+_live_rings_lock = threading.Lock()
+
+
+def live_ring_names() -> Tuple[str, ...]:
+    """当前存活的帧环名称"""
+    with _live_rings_lock:
+        return tuple(_live_rings)
+
+
+class SharedFrameRing:
+    """
+    预分配的共享内存帧环
+
+    功能：
+    - 创建时一次性分配num_slots个固定形状的uint8帧槽位
+    - acquire()/release()管理槽位占用（线程安全）
+    - 抓帧线程可以直接把帧解码进槽位（cap.read(slot_array)）
+    """
+
+    def __init__(self, session_id: str, shape: Tuple[int, ...], num_slots: int = 4):
+        """
+        Args:
+            session_id: 会话ID（用于日志）
+            shape: 帧形状（H, W, C）
+            num_slots: 槽位数量
+        """
+        self.session_id = session_id
+        self.shape = tuple(shape)
+        self.num_slots = max(2, num_slots)
+
+        slot_bytes = int(np.prod(self.shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=slot_bytes * self.num_slots)
+        self.frames = np.ndarray((self.num_slots,) + self.shape, dtype=np.uint8, buffer=self._shm.buf)
+
+        self._lock = threading.Lock()
+        self._in_use = [False] * self.num_slots
+        self._next = 0
+
+        # 统计
+        self.acquire_failures = 0
+
+        with _live_rings_lock:
+            _live_rings.add(self._shm.name)
+
+        logger.info(
+            "shared_frame_ring_created",
+            session_id=session_id,
+            shm_name=self._shm.name,
+            shape=self.shape,
+            num_slots=self.num_slots,
+            size_mb=round(self._shm.size / 1024 / 1024, 2),
+        )
+
+    @property
+    def name(self) -> str:
+        """共享内存名称"""
+        return self._shm.name
+
+    def fits(self, frame: np.ndarray) -> bool:
+        """帧形状是否与槽位一致"""
+        return frame.dtype == np.uint8 and frame.shape == self.shape
+
+    def acquire(self) -> Optional[int]:
+        """
+        申请一个空闲槽位
+
+        Returns:
+            槽位索引，全部占用时返回None
+        """
+        with self._lock:
+            for offset in range(self.num_slots):
+                index = (self._next + offset) % self.num_slots
+                if not self._in_use[index]:
+                    self._in_use[index] = True
+                    self._next = (index + 1) % self.num_slots
+                    return index
+
+        self.acquire_failures += 1
+        return None
+
+    def release(self, index: int):
+        """释放槽位"""
+        with self._lock:
+            self._in_use[index] = False
+
+    def slot(self, index: int) -> np.ndarray:
+        """槽位数组视图"""
+        return self.frames[index]
+
+    def ref(
+        self,
+        index: int,
+        region: Optional[Tuple[int, int, int, int]] = None,
+        scale: float = 1.0,
+    ) -> FrameSlot:
+        """
+        槽位的跨进程引用
+
+        Args:
+            index: 槽位索引
+            region: 推理进程中裁剪的ROI（可选）
+            scale: 裁剪后的缩放比例
+
+        Returns:
+            FrameSlot
+        """
+        return FrameSlot(self._shm.name, self.num_slots, self.shape, index, region, scale)
+
+    def close(self):
+        """释放共享内存"""
+        with _live_rings_lock:
+            _live_rings.discard(self._shm.name)
+
+        del self.frames
+        try:
+            self._shm.close()
+        except BufferError:
+            # 仍有帧视图未释放，映射随其回收；名称照常删除
+            pass
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+        logger.info("shared_frame_ring_closed", session_id=self.session_id)
+
+    def get_stats(self) -> Dict[str, object]:
+        """获取帧环统计信息"""
+        with self._lock:
+            in_use = sum(self._in_use)
+        return {
+            "shape": list(self.shape),
+            "num_slots": self.num_slots,
+            "slots_in_use": in_use,
+            "acquire_failures": self.acquire_failures,
+        }
+
+
+# ============================================================================
+# 推理进程侧：按名称挂载帧环（带缓存，随会话关闭释放）
+# ============================================================================
+
+_attached_rings: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    挂载已存在的共享内存（只读写，不接管生命周期，由创建方unlink）
+
+    spawn/fork出的工作进程与主进程共用同一个resource_tracker：挂载时的重复登记没有副作用，
+    但在工作进程中注销会删掉主进程的登记，导致主进程unlink()时tracker报KeyError、
+    主进程崩溃时共享内存也不再被回收。因此：
+    - Python 3.13+挂载时传track=False，不登记
+    - 更早版本只在本进程使用独立tracker时（不是multiprocessing子进程）注销登记
+
+    Args:
+        name: 共享内存名称
+
+    Returns:
+        SharedMemory实例
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    shm = shared_memory.SharedMemory(name=name)
+    if multiprocessing.parent_process() is None:
+        # 独立进程的tracker会在进程退出时误删共享内存
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm
+
+
+def detach_rings(live_names: Collection[str]) -> int:
+    """
+    释放已关闭帧环的映射（缓存大小因此不超过存活会话数）
+
+    Args:
+        live_names: 主进程中仍存活的帧环名称
+
+    Returns:
+        释放的帧环数量
+    """
+    live = set(live_names)
+    stale = [name for name in _attached_rings if name not in live]
+    for name in stale:
+        shm, frames = _attached_rings.pop(name)
+        del frames
+        try:
+            shm.close()
+        except BufferError:
+            # 仍有视图在使用，交给进程退出时回收
+            pass
+
+    if stale:
+        logger.debug("shared_frame_rings_detached", count=len(stale), attached=len(_attached_rings))
+    return len(stale)
+
+
+def resolve_frame_slot(ref: FrameSlot) -> np.ndarray:
+    """
+    在推理进程中把槽位引用解析为帧视图（零拷贝）
+
+    Args:
+        ref: 槽位引用
+
+    Returns:
+        推理图像（无裁剪缩放时为槽位视图）
+    """
+    cached = _attached_rings.get(ref.shm_name)
+    if cached is None:
+        shm = attach_shared_memory(ref.shm_name)
+        frames = np.ndarray((ref.num_slots,) + tuple(ref.shape), dtype=np.uint8, buffer=shm.buf)
+        cached = (shm, frames)
+        _attached_rings[ref.shm_name] = cached
+
+    frame = cached[1][ref.index]
+    if ref.region is None and ref.scale >= 1.0:
+        return frame
+
+    from services.frame_preprocessor import crop_and_scale
+
+    return crop_and_scale(frame, ref.region, ref.scale)
@@ -0,0 +1,347 @@
+"""
+推理调度器
+将所有活跃会话的待分析帧（以及音频片段）合并为微批（micro-batch），统一执行模型推理
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+from config import settings
+from services.audio_analysis import analyze_audio_batch
+from services.face_analysis import analyze_frames
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _BatchItem:
+    """队列中的单个推理请求"""
+
+    __slots__ = ("payload", "future", "enqueued_at")
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class MicroBatcher:
+    """
+    通用微批处理器
+
+    功能：
+    - 多个会话并发submit()，请求进入同一个队列
+    - 批次达到max_batch_size或首个请求等待超过max_wait_ms时触发推理
+    - 批处理函数每批只调用一次，结果按顺序回填到各自的Future
+    - 推理在独立线程中执行，不占用事件循环和默认线程池
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        num_workers: int = 1,
+    ):
+        """
+        Args:
+            name: 名称（用于日志和线程命名）
+            batch_fn: 批处理函数，输入payload列表，返回等长结果列表
+            max_batch_size: 单批最大请求数
+            max_wait_ms: 批次最长等待时间（毫秒）
+            num_workers: 推理线程数
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.num_workers = max(1, num_workers)
+
+        self._queue: "queue.Queue[Optional[_BatchItem]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._running = False
+
+        # 统计
+        self.batches_run = 0
+        self.items_processed = 0
+        self.items_failed = 0
+        self.last_batch_size = 0
+        self.avg_batch_latency_ms = 0.0
+        self.avg_queue_wait_ms = 0.0
+
+    def start(self):
+        """启动推理线程"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._threads = [
+                threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+                for i in range(self.num_workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+        logger.info(
+            "micro_batcher_started",
+            name=self.name,
+            max_batch_size=self.max_batch_size,
+            max_wait_ms=round(self.max_wait * 1000, 1),
+            num_workers=self.num_workers,
+        )
+
+    def stop(self, timeout: float = 5.0):
+        """
+        停止推理线程（阻塞，应在线程池中调用）
+
+        Args:
+            timeout: 每个线程的等待时间（秒）
+        """
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+        # 取消未处理的请求
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.future.cancel()
+
+        logger.info("micro_batcher_stopped", name=self.name, batches_run=self.batches_run)
+
+    def submit(self, payload: Any) -> Future:
+        """
+        提交推理请求（线程安全）
+
+        Args:
+            payload: 推理输入
+
+        Returns:
+            concurrent.futures.Future（异步代码中用asyncio.wrap_future等待）
+        """
+        if not self._running:
+            self.start()
+
+        item = _BatchItem(payload)
+        self._queue.put(item)
+        return item.future
+
+    @property
+    def pending(self) -> int:
+        """队列中等待推理的请求数"""
+        return self._queue.qsize()
+
+    def estimated_throughput(self) -> Optional[float]:
+        """
+        估计推理吞吐（请求/秒）
+
+        Returns:
+            基于平均批大小和批延迟的估计值，尚无统计时返回None
+        """
+        if self.batches_run == 0 or self.avg_batch_latency_ms <= 0:
+            return None
+
+        avg_batch_size = self.items_processed / self.batches_run
+        return avg_batch_size / (self.avg_batch_latency_ms / 1000.0) * self.num_workers
+
+    def _collect_batch(self) -> Optional[List[_BatchItem]]:
+        """阻塞收集一个批次（收到停止信号时返回None）"""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # 把停止信号放回去，先处理完当前批次
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        """推理线程主循环"""
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                break
+            if not batch:
+                continue
+
+            # 跳过已被取消的请求（例如会话已停止）
+            batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_BatchItem]):
+        """执行一次批推理并分发结果"""
+        started = time.monotonic()
+        queue_wait_ms = (started - min(item.enqueued_at for item in batch)) * 1000
+
+        try:
+            results = self.batch_fn([item.payload for item in batch])
+
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"batch_fn returned {len(results)} results for {len(batch)} inputs"
+                )
+
+            for item, result in zip(batch, results):
+                item.future.set_result(result)
+
+        except Exception as e:
+            self.items_failed += len(batch)
+            logger.error(
+                "micro_batch_failed",
+                name=self.name,
+                batch_size=len(batch),
+                error=str(e),
+                error_type=type(e).__name__,
+            )
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+        latency_ms = (time.monotonic() - started) * 1000
+
+        # 指数滑动平均（平滑单批抖动）
+        alpha = 0.2
+        if self.batches_run == 0:
+            self.avg_batch_latency_ms = latency_ms
+            self.avg_queue_wait_ms = queue_wait_ms
+        else:
+            self.avg_batch_latency_ms += alpha * (latency_ms - self.avg_batch_latency_ms)
+            self.avg_queue_wait_ms += alpha * (queue_wait_ms - self.avg_queue_wait_ms)
+
+        self.batches_run += 1
+        self.items_processed += len(batch)
+        self.last_batch_size = len(batch)
+
+        logger.debug(
+            "micro_batch_completed",
+            name=self.name,
+            batch_size=len(batch),
+            latency_ms=round(latency_ms, 1),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计信息"""
+        return {
+            "name": self.name,
+            "is_running": self._running,
+            "pending": self.pending,
+            "batches_run": self.batches_run,
+            "items_processed": self.items_processed,
+            "items_failed": self.items_failed,
+            "last_batch_size": self.last_batch_size,
+            "avg_batch_size": (
+                round(self.items_processed / self.batches_run, 2)
+                if self.batches_run
+                else 0
+            ),
+            "avg_batch_latency_ms": round(self.avg_batch_latency_ms, 1),
+            "avg_queue_wait_ms": round(self.avg_queue_wait_ms, 1),
+            "estimated_throughput": (
+                round(self.estimated_throughput(), 2)
+                if self.estimated_throughput() is not None
+                else None
+            ),
+        }
+
+
+def default_executor_workers() -> int:
+    """与asyncio默认线程池相同的线程数"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+# ============================================================================
+# 视频情绪推理
+# ============================================================================
+
+_inference_scheduler: Optional[MicroBatcher] = None
+
+
+def get_inference_scheduler() -> MicroBatcher:
+    """获取全局视频推理调度器"""
+    global _inference_scheduler
+    if _inference_scheduler is None:
+        batch_fn = analyze_frames
+        num_workers = settings.inference_batch_workers or default_executor_workers()
+
+        # 启用进程池时，每个进程同时处理一个批次
+        if settings.inference_worker_pool_enabled:
+            from services.inference_workers import get_inference_worker_pool
+
+            worker_pool = get_inference_worker_pool()
+            batch_fn = worker_pool.analyze_frames
+            num_workers = worker_pool.processes
+
+        _inference_scheduler = MicroBatcher(
+            name="video-inference",
+            batch_fn=batch_fn,
+            max_batch_size=settings.batch_size,
+            max_wait_ms=settings.inference_batch_max_wait_ms,
+            num_workers=num_workers,
+        )
+    return _inference_scheduler
+
+
+# ============================================================================
+# 音频情绪推理
+# ============================================================================
+
+_audio_inference_scheduler: Optional[MicroBatcher] = None
+
+
+def get_audio_inference_scheduler() -> MicroBatcher:
+    """获取全局音频推理调度器"""
+    global _audio_inference_scheduler
+    if _audio_inference_scheduler is None:
+        batch_fn = analyze_audio_batch
+        num_workers = settings.inference_batch_workers or default_executor_workers()
+
+        if settings.inference_worker_pool_enabled:
+            from services.inference_workers import get_inference_worker_pool
+
+            worker_pool = get_inference_worker_pool()
+            batch_fn = worker_pool.analyze_audio
+            num_workers = worker_pool.processes
+
+        _audio_inference_scheduler = MicroBatcher(
+            name="audio-inference",
+            batch_fn=batch_fn,
+            max_batch_size=settings.audio_batch_size,
+            max_wait_ms=settings.audio_batch_max_wait_ms,
+            num_workers=num_workers,
+        )
+    return _audio_inference_scheduler
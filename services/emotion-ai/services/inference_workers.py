@@ -0,0 +1,312 @@
+"""
+多进程推理工作池
+DeepFace（TensorFlow）和emotion2vec（PyTorch）在独立进程中运行，绕开单进程GIL
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from config import settings
+from services.face_analysis import FrameRequest
+from services.frame_ring import attach_shared_memory, detach_rings, live_ring_names
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 共享内存中单个数组的描述：(偏移字节数, 形状, dtype字符串)
+ArraySpec = Tuple[int, Tuple[int, ...], str]
+
+
+# ============================================================================
+# 工作进程侧
+# ============================================================================
+
+
+def _worker_init(threads_per_worker: int):
+    """
+    工作进程初始化：限制计算线程数并加载模型（每个进程只加载一次）
+
+    Args:
+        threads_per_worker: 每个进程的计算线程数
+    """
+    threads = str(max(1, threads_per_worker))
+    os.environ["OMP_NUM_THREADS"] = threads
+    os.environ["TF_NUM_INTRAOP_THREADS"] = threads
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+
+    try:
+        import torch
+        torch.set_num_threads(max(1, threads_per_worker))
+    except ImportError:
+        pass
+
+    from services.audio_analysis import get_audio_model
+    from services.face_analysis import detect_faces, load_emotion_models
+
+    # 预热检测器和情绪模型（批量路径不可用时才初始化DeepFace封装器）
+    detect_faces(np.zeros((64, 64, 3), dtype=np.uint8))
+    load_emotion_models()
+
+    try:
+        get_audio_model()
+    except Exception as e:
+        logger.error("worker_emotion2vec_init_failed", pid=os.getpid(), error=str(e))
+
+    logger.info("inference_worker_ready", pid=os.getpid(), threads=threads_per_worker)
+
+
+def _attach_arrays(shm_name: str, specs: List[ArraySpec]) -> Tuple[shared_memory.SharedMemory, List[np.ndarray]]:
+    """在工作进程中挂载共享内存并构建数组视图"""
+    shm = attach_shared_memory(shm_name)
+    arrays = [
+        np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        for offset, shape, dtype in specs
+    ]
+    return shm, arrays
+
+
+def _worker_analyze_frames(
+    shm_name: Optional[str],
+    specs: List[ArraySpec],
+    items: List[Any],
+    live_rings: Tuple[str, ...] = (),
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    工作进程：分析一批推理请求
+
+    items中的整数表示共享内存中的第几个数组；FrameSlot直接读取帧环槽位（零拷贝）；
+    FrameRequest的image同样可以是数组下标或FrameSlot。
+    live_rings为提交时主进程中存活的帧环，其余已挂载的帧环先释放
+    """
+    from services.face_analysis import FrameRequest, analyze_frames
+
+    detach_rings(live_rings)
+    shm, arrays = _attach_arrays(shm_name, specs) if shm_name else (None, [])
+    resolved: List[Any] = []
+    try:
+        for item in items:
+            if isinstance(item, int):
+                resolved.append(arrays[item])
+            elif isinstance(item, FrameRequest) and isinstance(item.image, int):
+                resolved.append(item._replace(image=arrays[item.image]))
+            else:
+                resolved.append(item)
+        return analyze_frames(resolved)
+    finally:
+        del arrays, resolved
+        if shm:
+            shm.close()
+
+
+def _worker_detach_rings(live_rings: Tuple[str, ...]) -> int:
+    """工作进程：释放已关闭会话的帧环映射"""
+    return detach_rings(live_rings)
+
+
+def _worker_analyze_audio(shm_name: str, specs: List[ArraySpec]) -> List[Optional[Dict[str, Any]]]:
+    """工作进程：分析共享内存中的一批音频片段"""
+    from services.audio_analysis import analyze_audio_batch
+
+    shm, segments = _attach_arrays(shm_name, specs)
+    try:
+        return analyze_audio_batch(segments)
+    finally:
+        del segments
+        shm.close()
+
+
+# ============================================================================
+# 主进程侧
+# ============================================================================
+
+
+def _pack_arrays(arrays: List[np.ndarray]) -> Tuple[shared_memory.SharedMemory, List[ArraySpec]]:
+    """
+    将一组数组打包进一块共享内存（按64字节对齐）
+
+    Returns:
+        (共享内存块, 各数组描述)
+    """
+    specs: List[ArraySpec] = []
+    offset = 0
+    for array in arrays:
+        specs.append((offset, tuple(array.shape), array.dtype.str))
+        offset += (array.nbytes + 63) & ~63
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for array, (spec_offset, shape, dtype) in zip(arrays, specs):
+        np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=spec_offset)[...] = array
+
+    return shm, specs
+
+
+class InferenceWorkerPool:
+    """
+    推理进程池
+
+    功能：
+    - 进程数由WORKER_PROCESSES决定（0表示按CPU核心数/THREADS_PER_WORKER自动计算）
+    - 每个进程启动时加载一次模型，之后常驻
+    - 输入数组通过共享内存传递，结果（小字典）通过进程池结果队列返回
+    """
+
+    def __init__(self, processes: Optional[int] = None, threads_per_worker: Optional[int] = None):
+        """
+        Args:
+            processes: 进程数（默认取settings.worker_processes）
+            threads_per_worker: 每个进程的计算线程数（默认取settings.threads_per_worker）
+        """
+        self.threads_per_worker = max(1, threads_per_worker or settings.threads_per_worker)
+        processes = processes if processes is not None else settings.worker_processes
+        if processes <= 0:
+            processes = max(1, (os.cpu_count() or 1) // self.threads_per_worker)
+        self.processes = processes
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # 统计
+        self.frame_batches = 0
+        self.audio_batches = 0
+        self.bytes_transferred = 0
+        self.slot_frames = 0
+
+    def start(self):
+        """启动进程池（spawn方式，避免继承TensorFlow/PyTorch的线程状态）"""
+        if self._executor is not None:
+            return
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(self.threads_per_worker,),
+        )
+
+        logger.info(
+            "inference_worker_pool_started",
+            processes=self.processes,
+            threads_per_worker=self.threads_per_worker,
+        )
+
+    def shutdown(self):
+        """关闭进程池（阻塞，应在线程池中调用）"""
+        if self._executor is None:
+            return
+
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+        logger.info("inference_worker_pool_stopped")
+
+    def _run(self, fn, arrays: List[np.ndarray], *args) -> List[Optional[Dict[str, Any]]]:
+        """打包到共享内存，提交到工作进程并等待结果（阻塞）"""
+        self.start()
+
+        if not arrays:
+            return self._executor.submit(fn, None, [], *args).result()
+
+        shm, specs = _pack_arrays(arrays)
+        self.bytes_transferred += shm.size
+        try:
+            future = self._executor.submit(fn, shm.name, specs, *args)
+            return future.result()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def analyze_frames(self, frames: List[Any]) -> List[Optional[Dict[str, Any]]]:
+        """
+        在工作进程中分析一批帧（阻塞，供推理调度器线程调用）
+
+        帧环槽位引用只传索引；普通数组打包进临时共享内存
+
+        Args:
+            frames: BGR帧、FrameSlot或FrameRequest列表
+
+        Returns:
+            与输入等长的结果列表
+        """
+        self.frame_batches += 1
+
+        if not frames:
+            return []
+
+        arrays: List[np.ndarray] = []
+        items: List[Any] = []
+        for frame in frames:
+            if isinstance(frame, FrameRequest) and isinstance(frame.image, np.ndarray):
+                items.append(frame._replace(image=len(arrays)))
+                arrays.append(frame.image)
+            elif isinstance(frame, np.ndarray):
+                items.append(len(arrays))
+                arrays.append(frame)
+            else:
+                self.slot_frames += 1
+                items.append(frame)
+
+        return self._run(_worker_analyze_frames, arrays, items, live_ring_names())
+
+    def release_closed_rings(self):
+        """
+        通知工作进程释放已关闭帧环的映射（不等待）
+
+        每个进程各提交一次释放任务；之后的推理任务也会附带存活帧环列表，
+        没有收到释放任务的进程在下一批推理前释放
+        """
+        if self._executor is None:
+            return
+
+        live_rings = live_ring_names()
+        try:
+            for _ in range(self.processes):
+                self._executor.submit(_worker_detach_rings, live_rings)
+        except RuntimeError:
+            # 进程池正在关闭
+            pass
+
+    def analyze_audio(self, segments: List[np.ndarray]) -> List[Optional[Dict[str, Any]]]:
+        """
+        在工作进程中分析一批音频片段（阻塞）
+
+        Args:
+            segments: float32单声道音频列表
+
+        Returns:
+            与输入等长的结果列表
+        """
+        self.audio_batches += 1
+
+        if not segments:
+            return []
+
+        return self._run(_worker_analyze_audio, segments)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取进程池统计信息"""
+        return {
+            "is_running": self._executor is not None,
+            "processes": self.processes,
+            "threads_per_worker": self.threads_per_worker,
+            "frame_batches": self.frame_batches,
+            "audio_batches": self.audio_batches,
+            "bytes_transferred": self.bytes_transferred,
+            "slot_frames": self.slot_frames,
+        }
+
+
+# ============================================================================
+# 全局实例
+# ============================================================================
+
+_worker_pool: Optional[InferenceWorkerPool] = None
+
+
+def get_inference_worker_pool() -> InferenceWorkerPool:
+    """获取全局推理进程池"""
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = InferenceWorkerPool()
+    return _worker_pool
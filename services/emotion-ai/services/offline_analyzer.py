@@ -0,0 +1,768 @@
+"""
+离线重分析
+对录制的考试音视频文件做快于实时的解码，复用DeepFace/emotion2vec/PPG流水线，
+写入标准检查点文件并计算聚合指标（用于回填实时分析失败的会话）
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from config import settings
+from services.audio_analysis import analyze_audio_batch
+from services.audio_resampler import AudioConverter
+from services.audio_ring_buffer import AudioRingBuffer
+from services.face_analysis import analyze_frames, face_region_to_box
+from services.frame_preprocessor import compute_scale, crop_and_scale, map_result_to_frame
+from services.ppg_session import SessionPPG
+from services.vad import EnergyVAD
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RecordingItem(NamedTuple):
+    """一个待重分析的录制文件"""
+
+    media_path: str
+    session_id: str
+    exam_result_id: Optional[str] = None
+    recorded_at: Optional[datetime] = None  # 录制开始时间（UTC），用于生成检查点时间戳
+
+
+def resolve_recording_path(media_path: str) -> Path:
+    """
+    解析录制文件路径，限制在settings.offline_recordings_root目录下
+
+    Args:
+        media_path: 绝对路径或相对于录制目录的路径
+
+    Returns:
+        解析后的绝对路径（已展开符号链接）
+
+    Raises:
+        ValueError: 路径不在录制目录下
+    """
+    root = Path(settings.offline_recordings_root).resolve()
+    path = Path(media_path)
+    if not path.is_absolute():
+        path = root / path
+    path = path.resolve()
+
+    if not path.is_relative_to(root):
+        raise ValueError(f"录制文件必须位于录制目录下: {media_path}")
+    return path
+
+
+async def _read_stderr(process: asyncio.subprocess.Process) -> str:
+    """读取ffmpeg的stderr（进程退出后用于诊断）"""
+    if process.stderr is None:
+        return ""
+    data = await process.stderr.read()
+    return data.decode("utf-8", errors="replace")[-2000:]
+
+
+class RecordingAnalyzer:
+    """
+    单个录制文件的离线分析
+
+    - 视频和音频各用一个ffmpeg进程解码（不加-re，解码速度只受CPU限制）
+    - 视频按offline_decode_fps解码，所有帧用于PPG；每隔若干帧取一帧送DeepFace，凑满一批再推理
+    - 音频按实时路径同样的窗口/步长切片，经VAD过滤后凑批送emotion2vec
+    - 推理下一批时继续解码（最多一批在途），启用进程池时占满所有核心
+    - 结果按实时路径的格式写入检查点文件，时间戳为录制开始时间 + 媒体时间
+    """
+
+    def __init__(
+        self,
+        item: RecordingItem,
+        batch_size: Optional[int] = None,
+        decode_fps: Optional[float] = None,
+        emotion_fps: Optional[float] = None,
+        use_worker_pool: Optional[bool] = None,
+    ):
+        """
+        Args:
+            item: 录制文件
+            batch_size: 每批推理的帧数/片段数（默认取settings.offline_batch_size）
+            decode_fps: 解码帧率（默认取settings.offline_decode_fps）
+            emotion_fps: 视频情绪分析帧率（默认取settings.offline_emotion_fps）
+            use_worker_pool: 是否使用多进程推理池（默认取settings.offline_use_worker_pool）
+        """
+        self.item = item
+        self.session_id = item.session_id
+        self.media_path = Path(item.media_path)
+        self.recorded_at = item.recorded_at or datetime.utcnow()
+
+        self.batch_size = max(1, batch_size or settings.offline_batch_size)
+        self.decode_fps = decode_fps or settings.offline_decode_fps
+        emotion_fps = min(emotion_fps or settings.offline_emotion_fps, self.decode_fps)
+        self.emotion_stride = max(1, int(round(self.decode_fps / emotion_fps)))
+
+        use_worker_pool = settings.offline_use_worker_pool if use_worker_pool is None else use_worker_pool
+        if use_worker_pool:
+            from services.inference_workers import get_inference_worker_pool
+            self.worker_pool = get_inference_worker_pool()
+        else:
+            self.worker_pool = None
+
+        # 视频解码输出（与ffmpeg拉流模式一致：等比缩放后补边）
+        self.width = settings.ffmpeg_ingest_width
+        self.height = settings.ffmpeg_ingest_height
+        self.frame_shape = (self.height, self.width, 3)
+        self.inference_scale = compute_scale(self.width, self.height, settings.inference_frame_width)
+
+        self.ppg = SessionPPG(self.session_id)
+        self.vad = EnergyVAD(settings.emotion2vec_sample_rate) if settings.vad_enabled else None
+
+        self.embedding_store = None
+        if settings.audio_embeddings_enabled:
+            from services.embedding_store import SessionEmbeddingStore
+            self.embedding_store = SessionEmbeddingStore(self.session_id)
+
+        # 视频检查点按媒体时间窗口采样（与实时路径的checkpoint_save_interval一致）
+        self.save_interval = settings.checkpoint_save_interval
+        self.sampling_strategy = settings.checkpoint_sampling_strategy
+        self._window_start = 0.0
+        self._window_point: Optional[Dict[str, Any]] = None
+
+        self.data_points: List[Dict[str, Any]] = []
+
+        # 统计
+        self.frames_decoded = 0
+        self.frames_analyzed = 0
+        self.emotions_detected = 0
+        self.heart_rate_measurements = 0
+        self.audio_segments = 0
+        self.audio_segments_silent = 0
+        self.audio_emotions_detected = 0
+        self.media_duration = 0.0
+
+    # ------------------------------------------------------------------
+    # 入口
+    # ------------------------------------------------------------------
+
+    async def run(self, overwrite: bool = True) -> Dict[str, Any]:
+        """
+        分析录制文件并写入检查点文件
+
+        Args:
+            overwrite: 会话已有检查点文件时先删除（否则追加）
+
+        Returns:
+            分析结果（文件信息、聚合指标、统计）
+        """
+        from services.aggregator import get_aggregator
+        from services.checkpoint_file_writer import get_checkpoint_file_writer
+
+        if not self.media_path.is_file():
+            raise FileNotFoundError(f"录制文件不存在: {self.media_path}")
+
+        started = time.monotonic()
+        loop = asyncio.get_event_loop()
+        file_writer = get_checkpoint_file_writer()
+
+        logger.info(
+            "offline_analysis_started",
+            session_id=self.session_id,
+            media_path=str(self.media_path),
+            batch_size=self.batch_size,
+            decode_fps=self.decode_fps,
+            emotion_stride=self.emotion_stride,
+            worker_pool=self.worker_pool is not None,
+        )
+
+        if self.worker_pool is None:
+            await loop.run_in_executor(None, self._initialize_analyzers)
+
+        # 写入会话已有检查点所在的日期分区（覆盖时删除的就是实时路径留下的文件），
+        # 没有已有文件时按录制开始时间分区
+        partition = await loop.run_in_executor(None, file_writer.find_partition, self.session_id)
+        partition = partition or self.recorded_at
+
+        if overwrite:
+            await loop.run_in_executor(None, file_writer.delete_file, self.session_id, partition)
+
+        relative_path = await loop.run_in_executor(
+            None,
+            lambda: file_writer.initialize_file(
+                session_id=self.session_id,
+                exam_result_id=self.item.exam_result_id,
+                timestamp=partition,
+                metadata={
+                    "fps": self.decode_fps,
+                    "sampling_strategy": self.sampling_strategy,
+                    "sampling_interval_seconds": self.save_interval,
+                    "source": "offline",
+                    "media_path": str(self.media_path),
+                    "recorded_at": self.recorded_at.isoformat() + "Z",
+                },
+            ),
+        )
+
+        await asyncio.gather(self._analyze_video(), self._analyze_audio())
+
+        if self._window_point is not None:
+            self.data_points.append(self._window_point)
+            self._window_point = None
+
+        file_info = {"relative_path": relative_path, "checkpoint_count": 0, "file_size": 0}
+        if self.data_points:
+            file_info = await loop.run_in_executor(
+                None, file_writer.append_data_points, self.session_id, self.data_points, partition
+            )
+
+        if self.embedding_store is not None and self.embedding_store.count:
+            await loop.run_in_executor(
+                None, file_writer.save_embeddings, self.session_id, self.embedding_store, partition
+            )
+
+        checkpoint_data = await loop.run_in_executor(
+            None, file_writer.read_checkpoint_data, self.session_id, partition
+        )
+        aggregate = get_aggregator().calculate_aggregate(checkpoint_data) if checkpoint_data else None
+
+        if settings.checkpoint_columnar_enabled and self.data_points:
+            file_info = await loop.run_in_executor(
+                None, file_writer.compact_to_columnar, self.session_id, partition
+            )
+
+        elapsed = time.monotonic() - started
+        stats = self.get_stats()
+        stats["elapsed_seconds"] = round(elapsed, 2)
+        stats["speed"] = round(self.media_duration / elapsed, 2) if elapsed > 0 else None
+
+        logger.info(
+            "offline_analysis_completed",
+            session_id=self.session_id,
+            file_path=file_info["relative_path"],
+            checkpoint_count=file_info["checkpoint_count"],
+            media_duration=round(self.media_duration, 1),
+            elapsed=round(elapsed, 1),
+            speed=stats["speed"],
+        )
+
+        return {
+            "session_id": self.session_id,
+            "exam_result_id": self.item.exam_result_id,
+            "file_info": file_info,
+            "aggregate": aggregate,
+            "stats": stats,
+        }
+
+    @staticmethod
+    def _initialize_analyzers():
+        """不使用进程池时在当前进程加载模型"""
+        from services.audio_analysis import load_audio_model
+        from services.face_analysis import load_emotion_models
+
+        # 批量路径不可用时才初始化DeepFace封装器
+        load_emotion_models()
+
+        # 音频片段由services.audio_analysis直接推理，只加载这一份emotion2vec模型
+        if not load_audio_model():
+            logger.error("offline_emotion2vec_init_failed")
+
+    async def _spawn_ffmpeg(self, output_args: List[str]) -> asyncio.subprocess.Process:
+        """启动解码录制文件的ffmpeg进程（输出到stdout）"""
+        cmd = [
+            'ffmpeg',
+            '-hide_banner',
+            '-nostats',
+            '-loglevel', 'error',
+            '-i', str(self.media_path),
+            *output_args,
+            'pipe:1',
+        ]
+        return await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    async def _finish_ffmpeg(self, process: asyncio.subprocess.Process, stderr_task: asyncio.Task, stream: str):
+        """等待ffmpeg退出并记录错误输出"""
+        if process.returncode is None:
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+        stderr = await stderr_task
+        if process.returncode != 0:
+            logger.warning(
+                "offline_ffmpeg_failed",
+                session_id=self.session_id,
+                stream=stream,
+                returncode=process.returncode,
+                stderr=stderr,
+            )
+
+    def _timestamp(self, media_time: float) -> str:
+        """媒体时间 -> 检查点时间戳"""
+        return (self.recorded_at + timedelta(seconds=media_time)).isoformat() + "Z"
+
+    # ------------------------------------------------------------------
+    # 视频
+    # ------------------------------------------------------------------
+
+    async def _analyze_video(self):
+        """解码视频并分批分析（情绪 + PPG）"""
+        process = await self._spawn_ffmpeg([
+            '-map', '0:v:0',
+            '-an',
+            '-vf', (
+                f"fps={self.decode_fps},"
+                f"scale={self.width}:{self.height}:force_original_aspect_ratio=decrease,"
+                f"pad={self.width}:{self.height}:(ow-iw)/2:(oh-ih)/2"
+            ),
+            '-pix_fmt', 'bgr24',
+            '-f', 'rawvideo',
+        ])
+        stderr_task = asyncio.create_task(_read_stderr(process))
+        frame_bytes = self.height * self.width * 3
+
+        frames: List[Tuple[float, np.ndarray]] = []
+        emotion_count = 0
+        pending: Optional[asyncio.Task] = None
+
+        try:
+            while True:
+                try:
+                    data = await process.stdout.readexactly(frame_bytes)
+                except asyncio.IncompleteReadError:
+                    break
+
+                media_time = self.frames_decoded / self.decode_fps
+                is_emotion_frame = self.frames_decoded % self.emotion_stride == 0
+                self.frames_decoded += 1
+                self.media_duration = max(self.media_duration, media_time)
+
+                frames.append((media_time, np.frombuffer(data, dtype=np.uint8).reshape(self.frame_shape)))
+                emotion_count += is_emotion_frame
+
+                if emotion_count >= self.batch_size:
+                    # 上一批推理完成后再提交这一批（解码与推理重叠，最多一批在途）
+                    if pending is not None:
+                        await pending
+                    pending = asyncio.create_task(self._process_video_batch(frames))
+                    frames = []
+                    emotion_count = 0
+
+            if pending is not None:
+                await pending
+            if frames:
+                await self._process_video_batch(frames)
+        finally:
+            await self._finish_ffmpeg(process, stderr_task, "video")
+
+    async def _process_video_batch(self, frames: List[Tuple[float, np.ndarray]]):
+        """
+        对一批解码帧执行情绪推理，再按时间顺序更新PPG
+
+        Args:
+            frames: (媒体时间, BGR帧)列表，第一帧的序号决定哪些帧送DeepFace
+        """
+        first_index = int(round(frames[0][0] * self.decode_fps))
+        emotion_positions = [
+            position for position in range(len(frames))
+            if (first_index + position) % self.emotion_stride == 0
+        ]
+        images = [
+            crop_and_scale(frames[position][1], None, self.inference_scale)
+            for position in emotion_positions
+        ]
+
+        loop = asyncio.get_event_loop()
+        if not images:
+            results = []
+        elif self.worker_pool is not None:
+            results = await loop.run_in_executor(None, self.worker_pool.analyze_frames, images)
+        else:
+            results = await loop.run_in_executor(None, analyze_frames, images)
+
+        self.frames_analyzed += len(images)
+        by_position = dict(zip(emotion_positions, results))
+
+        # PPG和检查点整理放到线程池（ROI均值、滤波、FFT）
+        await loop.run_in_executor(None, self._apply_video_results, frames, by_position)
+
+    def _apply_video_results(self, frames: List[Tuple[float, np.ndarray]], results: Dict[int, Optional[Dict[str, Any]]]):
+        """按时间顺序应用推理结果：更新PPG人脸框、采样PPG、生成检查点"""
+        for position, (media_time, frame) in enumerate(frames):
+            if position in results:
+                result = map_result_to_frame(results[position], None, self.inference_scale)
+                self.ppg.update_face_box(
+                    face_region_to_box(result.get("face_region")) if result else None,
+                    now=media_time,
+                )
+                if result is not None:
+                    self._add_video_emotion(result, media_time)
+
+            self.ppg.push_frame(frame, media_time)
+            if self.ppg.ready_for_estimate(media_time):
+                hr_result = self.ppg.estimate(self.ppg.window(), now=media_time)
+                if hr_result:
+                    self._add_heart_rate(hr_result, media_time)
+
+    def _add_video_emotion(self, result: Dict[str, Any], media_time: float):
+        """按采样策略保留每个时间窗口的一个视频情绪检查点"""
+        self.emotions_detected += 1
+
+        point = {
+            "timestamp": self._timestamp(media_time),
+            "data_type": "video_emotion",
+            "confidence": result["confidence"],
+            "dominant_emotion": result["dominant_emotion"],
+            "emotion_scores": result["emotion_scores"],
+            "metadata": {
+                "frame_number": int(round(media_time * self.decode_fps)),
+                "media_time": round(media_time, 3),
+            },
+        }
+
+        if media_time - self._window_start >= self.save_interval:
+            if self._window_point is not None:
+                self.data_points.append(self._window_point)
+            self._window_start = media_time
+            self._window_point = point
+        elif self.sampling_strategy == "last_valid":
+            self._window_point = point
+        elif self._window_point is None or point["confidence"] > self._window_point["confidence"]:
+            self._window_point = point
+
+    def _add_heart_rate(self, hr_result: Dict[str, Any], media_time: float):
+        """生成心率检查点"""
+        self.heart_rate_measurements += 1
+        self.data_points.append({
+            "timestamp": self._timestamp(media_time),
+            "data_type": "heart_rate",
+            "confidence": hr_result["confidence"],
+            "heart_rate": hr_result["heart_rate"],
+            "signal_quality": hr_result["signal_quality"],
+            "metadata": {
+                "measurement_number": self.heart_rate_measurements,
+                "frame_number": int(round(media_time * self.decode_fps)),
+                "media_time": round(media_time, 3),
+            },
+        })
+
+    # ------------------------------------------------------------------
+    # 音频
+    # ------------------------------------------------------------------
+
+    async def _analyze_audio(self):
+        """解码音频，按窗口切片并分批分析"""
+        sample_rate = settings.emotion2vec_sample_rate
+        converter: Optional[AudioConverter] = None
+        ingest_rate, ingest_channels = sample_rate, 1
+        if settings.audio_resample_in_service:
+            ingest_rate = settings.audio_ingest_sample_rate
+            ingest_channels = settings.audio_ingest_channels
+            converter = AudioConverter(ingest_rate, ingest_channels, sample_rate)
+
+        process = await self._spawn_ffmpeg([
+            '-map', '0:a:0',
+            '-vn',
+            '-ar', str(ingest_rate),
+            '-ac', str(ingest_channels),
+            '-acodec', 'pcm_s16le',
+            '-f', 's16le',
+        ])
+        stderr_task = asyncio.create_task(_read_stderr(process))
+
+        window_samples = int(sample_rate * settings.audio_window_seconds)
+        buffer = AudioRingBuffer(window_samples, hop_samples=int(sample_rate * settings.audio_hop_seconds))
+        chunk_bytes = ingest_rate * 2 * ingest_channels  # 每次读1秒
+
+        segments: List[Tuple[int, np.ndarray, Optional[float]]] = []
+        pending: Optional[asyncio.Task] = None
+        window_index = 0
+
+        try:
+            while True:
+                try:
+                    data = await process.stdout.readexactly(chunk_bytes)
+                    ended = False
+                except asyncio.IncompleteReadError as e:
+                    data = e.partial
+                    ended = True
+
+                if data:
+                    if converter is not None:
+                        buffer.write(converter.process_pcm16(data))
+                    else:
+                        buffer.write_pcm16(data)
+
+                    for window in buffer.pop_windows():
+                        window_index += 1
+                        speech_ratio = self.vad.speech_ratio(window) if self.vad else None
+                        if speech_ratio is not None and speech_ratio < settings.vad_min_speech_ratio:
+                            self.audio_segments_silent += 1
+                            continue
+                        # 凑批期间缓冲区会继续写入，需要复制
+                        segments.append((window_index, window.copy(), speech_ratio))
+
+                    if len(segments) >= self.batch_size:
+                        if pending is not None:
+                            await pending
+                        pending = asyncio.create_task(self._process_audio_batch(segments))
+                        segments = []
+
+                if ended:
+                    break
+
+            if pending is not None:
+                await pending
+            if segments:
+                await self._process_audio_batch(segments)
+        finally:
+            await self._finish_ffmpeg(process, stderr_task, "audio")
+
+    async def _process_audio_batch(self, segments: List[Tuple[int, np.ndarray, Optional[float]]]):
+        """
+        对一批音频片段执行emotion2vec推理并生成检查点
+
+        Args:
+            segments: (窗口序号, 片段, 语音占比)列表
+        """
+        sample_rate = settings.emotion2vec_sample_rate
+        arrays = [segment for _, segment, _ in segments]
+
+        loop = asyncio.get_event_loop()
+        if self.worker_pool is not None:
+            results = await loop.run_in_executor(None, self.worker_pool.analyze_audio, arrays)
+        else:
+            results = await loop.run_in_executor(None, analyze_audio_batch, arrays)
+
+        for (window_index, segment, speech_ratio), result in zip(segments, results):
+            self.audio_segments += 1
+            if result is None:
+                continue
+
+            # 片段结束时刻对应实时路径中回调触发的时间
+            start_time = (window_index - 1) * settings.audio_hop_seconds
+            media_time = start_time + len(segment) / sample_rate
+            self.media_duration = max(self.media_duration, media_time)
+            self.audio_emotions_detected += 1
+
+            self.data_points.append({
+                "timestamp": self._timestamp(media_time),
+                "data_type": "audio_emotion",
+                "confidence": result["confidence"],
+                "dominant_emotion": result["dominant_emotion"],
+                "emotion_scores": result["emotion_scores"],
+                "metadata": {
+                    "audio_segment_number": self.audio_segments,
+                    "audio_duration": len(segment) / sample_rate,
+                    "speech_ratio": round(speech_ratio, 3) if speech_ratio is not None else None,
+                    "media_time": round(start_time, 3),
+                },
+            })
+
+            if self.embedding_store is not None and result.get("embedding") is not None:
+                self.embedding_store.append(
+                    result["embedding"],
+                    self.audio_segments,
+                    (self.recorded_at + timedelta(seconds=media_time)).timestamp(),
+                    result["dominant_emotion"],
+                )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取分析统计信息"""
+        return {
+            "media_duration_seconds": round(self.media_duration, 2),
+            "frames_decoded": self.frames_decoded,
+            "frames_analyzed": self.frames_analyzed,
+            "emotions_detected": self.emotions_detected,
+            "heart_rate_measurements": self.heart_rate_measurements,
+            "audio_segments": self.audio_segments,
+            "audio_segments_silent": self.audio_segments_silent,
+            "audio_emotions_detected": self.audio_emotions_detected,
+            "data_points": len(self.data_points),
+        }
+
+
+class OfflineJob:
+    """一个离线重分析任务（包含一个或多个录制文件，按顺序处理）"""
+
+    def __init__(self, items: List[RecordingItem], upload: bool = False, overwrite: bool = True):
+        """
+        Args:
+            items: 录制文件列表
+            upload: 完成后把聚合指标和文件信息写入后端API
+            overwrite: 覆盖会话已有的检查点文件
+        """
+        self.job_id = uuid.uuid4().hex
+        self.items = items
+        self.upload = upload
+        self.overwrite = overwrite
+
+        self.status = "pending"  # pending/running/completed/failed/cancelled
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.results: List[Dict[str, Any]] = []
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """任务状态（API响应）"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "upload": self.upload,
+            "created_at": self.created_at.isoformat() + "Z",
+            "started_at": self.started_at.isoformat() + "Z" if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() + "Z" if self.finished_at else None,
+            "total_items": len(self.items),
+            "completed_items": len(self.results),
+            "results": self.results,
+        }
+
+
+async def upload_results(result: Dict[str, Any]):
+    """
+    把离线分析的文件信息和聚合指标写入后端API（与实时会话结束时的调用一致）
+
+    Args:
+        result: RecordingAnalyzer.run()的返回值
+    """
+    from services.data_writer import get_data_writer
+
+    session_id = result["session_id"]
+    file_info = result["file_info"]
+    aggregate = result["aggregate"]
+
+    async with get_data_writer() as writer:
+        await writer.update_session_file_info(
+            session_id=session_id,
+            file_path=file_info["relative_path"],
+            checkpoint_count=file_info["checkpoint_count"],
+            file_size=file_info["file_size"],
+        )
+        if aggregate:
+            aggregate_without_ids = {
+                k: v for k, v in aggregate.items() if k not in ["session_id", "exam_result_id"]
+            }
+            await writer.save_aggregate(
+                session_id=session_id,
+                exam_result_id=result["exam_result_id"],
+                **aggregate_without_ids,
+            )
+
+
+class OfflineJobManager:
+    """
+    离线重分析任务管理器
+
+    任务在事件循环中后台运行，同时运行的任务数受offline_max_concurrent_jobs限制
+    （每个任务内部已通过批量推理和进程池占满CPU）
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, OfflineJob] = {}
+        self.semaphore = asyncio.Semaphore(max(1, settings.offline_max_concurrent_jobs))
+
+    def submit(self, items: List[RecordingItem], upload: bool = False, overwrite: bool = True) -> OfflineJob:
+        """
+        提交任务（立即返回，后台运行）
+
+        Args:
+            items: 录制文件列表
+            upload: 完成后写入后端API
+            overwrite: 覆盖已有检查点文件
+
+        Returns:
+            OfflineJob
+        """
+        job = OfflineJob(items, upload=upload, overwrite=overwrite)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run_job(job))
+
+        logger.info("offline_job_submitted", job_id=job.job_id, items=len(items), upload=upload)
+        return job
+
+    async def _run_job(self, job: OfflineJob):
+        """按顺序分析任务中的每个文件（单个文件失败不影响后续文件）"""
+        async with self.semaphore:
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            failed = 0
+
+            try:
+                for item in job.items:
+                    try:
+                        result = await RecordingAnalyzer(item).run(overwrite=job.overwrite)
+                        if job.upload:
+                            await upload_results(result)
+                            result["uploaded"] = True
+                        result["status"] = "completed"
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        failed += 1
+                        logger.error(
+                            "offline_item_failed",
+                            job_id=job.job_id,
+                            session_id=item.session_id,
+                            media_path=item.media_path,
+                            error=str(e),
+                            error_type=type(e).__name__,
+                        )
+                        result = {
+                            "session_id": item.session_id,
+                            "exam_result_id": item.exam_result_id,
+                            "status": "failed",
+                            "error": str(e),
+                        }
+                    job.results.append(result)
+
+                job.status = "failed" if failed == len(job.items) else "completed"
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                raise
+            finally:
+                job.finished_at = datetime.utcnow()
+                logger.info(
+                    "offline_job_finished",
+                    job_id=job.job_id,
+                    status=job.status,
+                    items=len(job.items),
+                    failed=failed,
+                )
+
+    def get_job(self, job_id: str) -> Optional[OfflineJob]:
+        """获取任务"""
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[OfflineJob]:
+        """所有任务（按创建时间）"""
+        return sorted(self.jobs.values(), key=lambda job: job.created_at)
+
+    async def cancel_all(self):
+        """取消所有未完成的任务（服务关闭时调用）"""
+        tasks = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ============================================================================
+# 全局实例
+# ============================================================================
+
+_job_manager: Optional[OfflineJobManager] = None
+
+
+def get_offline_job_manager() -> OfflineJobManager:
+    """获取全局离线任务管理器"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = OfflineJobManager()
+    return _job_manager
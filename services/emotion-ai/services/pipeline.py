@@ -0,0 +1,183 @@
+"""
+分阶段流水线基础组件
+有界阶段队列（满时丢弃最旧的可丢弃项）和阶段延迟统计，连接RTSP消费器的抓帧/预处理/推理/发布阶段
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+
+class FrameItem(NamedTuple):
+    """视频流水线中的一帧"""
+
+    frame: np.ndarray
+    grab_time: float          # 抓取时间（monotonic）
+    slot: Optional[int]       # 共享内存帧环槽位（None表示普通数组）
+    frame_number: int = 0     # 会话内帧序号（有效帧计数）
+
+
+class InferenceRequest(NamedTuple):
+    """预处理阶段产出的推理请求"""
+
+    item: FrameItem
+    payload: Any                                          # 推理输入（图像、FrameSlot或FrameRequest）
+    region: Optional[Tuple[int, int, int, int]]           # 裁剪区域（原始帧坐标，None表示整帧）
+    scale: float                                          # 裁剪后的缩放比例
+    tracked_box: Optional[Tuple[int, int, int, int]]      # 光流跟踪到的人脸框（None表示检测帧）
+
+
+class StageQueue:
+    """
+    有界阶段队列（仅在事件循环线程中使用）
+
+    - 队列满时丢弃最旧的一项再放入新项：下游慢时保留最新数据，延迟不会无限增长
+    - keep(item)为True的项（例如需要持久化的结果）不会被丢弃：满时丢弃最旧的可丢弃项，
+      没有可丢弃项时照常放入（超出容量，计入overflowed）
+    - 丢弃的项交给on_drop回调（例如归还帧环槽位）
+    - 统计入队数、丢弃数、当前/最大深度和排队等待时间
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        on_drop: Optional[Callable[[Any], None]] = None,
+        keep: Optional[Callable[[Any], bool]] = None,
+    ):
+        """
+        Args:
+            name: 阶段名称（用于统计）
+            maxsize: 队列容量
+            on_drop: 丢弃项回调
+            keep: 判断一项是否必须保留（默认所有项都可丢弃）
+        """
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.on_drop = on_drop
+        self.keep = keep
+        self._items: Deque[Tuple[float, Any]] = deque()
+        self._not_empty = asyncio.Event()
+
+        # 统计
+        self.enqueued = 0
+        self.dropped = 0
+        self.overflowed = 0
+        self.max_depth = 0
+        self.avg_wait_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _droppable_index(self) -> Optional[int]:
+        """最旧的可丢弃项位置（停止信号None始终保留）"""
+        for index, (_, item) in enumerate(self._items):
+            if item is not None and (self.keep is None or not self.keep(item)):
+                return index
+        return None
+
+    def put(self, item: Any):
+        """
+        放入一项（不等待；队列满时丢弃最旧的可丢弃项）
+
+        Args:
+            item: 队列项
+        """
+        if len(self._items) >= self.maxsize:
+            index = self._droppable_index()
+            if index is None:
+                self.overflowed += 1
+            else:
+                _, oldest = self._items[index]
+                del self._items[index]
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(oldest)
+
+        self._items.append((time.monotonic(), item))
+        self._not_empty.set()
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._items))
+
+    async def get(self) -> Any:
+        """
+        取出一项（队列为空时等待）
+
+        Returns:
+            队列项
+        """
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        enqueued_at, item = self._items.popleft()
+        wait_ms = (time.monotonic() - enqueued_at) * 1000
+        self.avg_wait_ms += 0.2 * (wait_ms - self.avg_wait_ms)
+        return item
+
+    def drain(self) -> List[Any]:
+        """
+        取出所有剩余项（阶段停止时用于归还资源）
+
+        Returns:
+            剩余项列表
+        """
+        items = [item for _, item in self._items]
+        self._items.clear()
+        return items
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息"""
+        return {
+            "depth": len(self._items),
+            "max_depth": self.max_depth,
+            "capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+            "avg_wait_ms": round(self.avg_wait_ms, 1),
+        }
+
+
+class StageMetrics:
+    """阶段处理延迟统计（指数滑动平均 + 最大值）"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: 阶段名称
+        """
+        self.name = name
+        self.processed = 0
+        self.errors = 0
+        self.last_latency_ms = 0.0
+        self.avg_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    def record(self, started: float):
+        """
+        记录一次处理
+
+        Args:
+            started: 开始时间（monotonic）
+        """
+        latency_ms = (time.monotonic() - started) * 1000
+        if self.processed == 0:
+            self.avg_latency_ms = latency_ms
+        else:
+            self.avg_latency_ms += 0.2 * (latency_ms - self.avg_latency_ms)
+        self.last_latency_ms = latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+        self.processed += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取阶段统计信息"""
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "last_latency_ms": round(self.last_latency_ms, 1),
+            "avg_latency_ms": round(self.avg_latency_ms, 1),
+            "max_latency_ms": round(self.max_latency_ms, 1),
+        }
@@ -0,0 +1,308 @@
+"""
+会话级PPG心率检测
+每个RTSP消费器持有独立的ROI信号缓冲区，心率估计使用向量化的rPPG算法
+"""
+
+import time
+import numpy as np
+from typing import Optional, Dict, Any, Tuple
+from scipy import signal as sp_signal
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 心率频带（Hz）：45-180 bpm
+HR_MIN_HZ = 0.75
+HR_MAX_HZ = 3.0
+
+# 插值后的均匀采样率范围（Hz）
+MIN_RESAMPLE_FPS = 8.0
+MAX_RESAMPLE_FPS = 30.0
+
+
+def extract_forehead_roi(frame: np.ndarray, face_box: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
+    """
+    从人脸框中提取前额区域（顶部10%-40%，宽度中央50%）
+
+    Args:
+        frame: BGR帧
+        face_box: 人脸框 (x, y, w, h)
+
+    Returns:
+        前额ROI（视图，不复制），区域无效时返回None
+    """
+    x, y, w, h = face_box
+    frame_h, frame_w = frame.shape[:2]
+
+    x0 = max(0, x + int(w * 0.25))
+    x1 = min(frame_w, x + int(w * 0.75))
+    y0 = max(0, y + int(h * 0.1))
+    y1 = min(frame_h, y + int(h * 0.4))
+
+    if x1 <= x0 or y1 <= y0:
+        return None
+
+    return frame[y0:y1, x0:x1]
+
+
+def estimate_heart_rate(values: np.ndarray, timestamps: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    向量化rPPG心率估计（POS算法 + 带通滤波 + FFT峰值）
+
+    Args:
+        values: ROI的BGR通道均值，形状 (N, 3)
+        timestamps: 对应时间戳（秒，单调递增），形状 (N,)
+
+    Returns:
+        {'heart_rate', 'confidence', 'signal_quality'}，信号不足时返回None
+    """
+    duration = float(timestamps[-1] - timestamps[0])
+    if len(values) < 32 or duration <= 0:
+        return None
+
+    # 帧到达间隔不均匀（跳帧、丢帧），先插值到均匀时间网格
+    fps = float(np.clip((len(values) - 1) / duration, MIN_RESAMPLE_FPS, MAX_RESAMPLE_FPS))
+    n_samples = int(duration * fps)
+    grid = timestamps[0] + np.arange(n_samples) / fps
+    rgb = np.stack(
+        [np.interp(grid, timestamps, values[:, c]) for c in (2, 1, 0)],  # BGR -> RGB
+        axis=1,
+    )
+
+    # POS投影（Wang et al. 2017）：对光照强度变化鲁棒
+    normalized = rgb / (rgb.mean(axis=0) + 1e-6)
+    s1 = normalized[:, 1] - normalized[:, 2]
+    s2 = normalized[:, 1] + normalized[:, 2] - 2 * normalized[:, 0]
+    pulse = s1 + (s1.std() / (s2.std() + 1e-9)) * s2
+
+    # 去趋势 + 带通滤波
+    pulse = sp_signal.detrend(pulse)
+    nyquist = fps / 2
+    high = min(HR_MAX_HZ, nyquist * 0.95)
+    if high <= HR_MIN_HZ or n_samples <= 3 * 7:
+        return None
+    b, a = sp_signal.butter(3, [HR_MIN_HZ / nyquist, high / nyquist], btype="band")
+    pulse = sp_signal.filtfilt(b, a, pulse)
+
+    # 补零FFT提高频率分辨率
+    n_fft = max(1024, 1 << int(np.ceil(np.log2(n_samples * 8))))
+    spectrum = np.abs(np.fft.rfft(pulse * np.hanning(n_samples), n=n_fft)) ** 2
+    freqs = np.fft.rfftfreq(n_fft, d=1.0 / fps)
+
+    band = (freqs >= HR_MIN_HZ) & (freqs <= high)
+    if not band.any():
+        return None
+
+    band_power = spectrum[band]
+    band_freqs = freqs[band]
+    peak_idx = int(np.argmax(band_power))
+    peak_hz = float(band_freqs[peak_idx])
+
+    # 信号质量：峰值附近（±0.1Hz）能量占频带总能量的比例
+    peak_mask = np.abs(band_freqs - peak_hz) <= 0.1
+    total_power = float(band_power.sum())
+    signal_quality = float(band_power[peak_mask].sum() / total_power) if total_power > 0 else 0.0
+
+    return {
+        "heart_rate": round(peak_hz * 60, 1),
+        "confidence": round(min(1.0, signal_quality * 2), 3),
+        "signal_quality": round(signal_quality, 3),
+    }
+
+
+class SessionPPG:
+    """
+    会话级PPG状态
+
+    功能：
+    - 环形缓冲区保存每帧前额ROI的BGR均值及时间戳（与其它会话完全隔离）
+    - 每帧只做一次切片求均值，不进入线程池
+    - 人脸框来自帧分析流水线的检测结果（不再单独检测），心率每个hop窗口估计一次
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        window_seconds: Optional[float] = None,
+        hop_seconds: Optional[float] = None,
+    ):
+        """
+        Args:
+            session_id: 会话ID
+            window_seconds: 心率估计窗口（秒）
+            hop_seconds: 两次估计之间的间隔（秒）
+        """
+        self.session_id = session_id
+        self.window_seconds = window_seconds or settings.ppg_window_seconds
+        self.hop_seconds = hop_seconds or settings.ppg_hop_seconds
+
+        # 环形缓冲区（按最高帧率预留容量）
+        self.capacity = int(self.window_seconds * MAX_RESAMPLE_FPS * 1.5)
+        self._values = np.zeros((self.capacity, 3), dtype=np.float32)
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._head = 0  # 下一个写入位置
+        self._count = 0
+
+        # 人脸框（由帧分析流水线更新；短暂漏检时在宽限时间内沿用上一个人脸框）
+        self.face_box: Optional[Tuple[int, int, int, int]] = None
+        self.last_face_update_time = 0.0
+        self.last_face_seen_time = 0.0
+        self.face_lost_grace_seconds = settings.ppg_face_lost_grace_seconds
+
+        self.last_estimate_time = 0.0
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.estimates_computed = 0
+
+    # ------------------------------------------------------------------
+    # 缓冲区
+    # ------------------------------------------------------------------
+
+    def push(self, bgr_mean: np.ndarray, timestamp: float):
+        """
+        写入一个ROI均值样本
+
+        Args:
+            bgr_mean: ROI的BGR通道均值 (3,)
+            timestamp: 帧时间戳（秒，单调时钟）
+        """
+        self._values[self._head] = bgr_mean
+        self._times[self._head] = timestamp
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def push_frame(self, frame: np.ndarray, timestamp: float) -> bool:
+        """
+        从帧中提取前额ROI均值并写入缓冲区（需要已有人脸框）
+
+        Args:
+            frame: BGR帧
+            timestamp: 帧时间戳（秒，单调时钟）
+
+        Returns:
+            是否写入成功
+        """
+        if self.face_box is None:
+            return False
+
+        roi = extract_forehead_roi(frame, self.face_box)
+        if roi is None or roi.size == 0:
+            return False
+
+        self.push(roi.reshape(-1, 3).mean(axis=0), timestamp)
+        return True
+
+    def window(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按时间顺序返回最近一个窗口内的样本（副本，可安全交给其它线程）
+
+        Returns:
+            (values (N, 3), timestamps (N,))
+        """
+        if self._count < self.capacity:
+            values = self._values[:self._count].copy()
+            times = self._times[:self._count].copy()
+        else:
+            order = np.roll(np.arange(self.capacity), -self._head)
+            values = self._values[order]
+            times = self._times[order]
+
+        if len(times) == 0:
+            return values, times
+
+        start = np.searchsorted(times, times[-1] - self.window_seconds)
+        return values[start:], times[start:]
+
+    def reset(self):
+        """清空缓冲区（例如人脸丢失后重新开始累积）"""
+        self._head = 0
+        self._count = 0
+
+    # ------------------------------------------------------------------
+    # 人脸定位
+    # ------------------------------------------------------------------
+
+    def update_face_box(self, face_box: Optional[Tuple[int, int, int, int]], now: Optional[float] = None):
+        """
+        更新人脸框
+
+        单帧检测失败不立即清空缓冲区：距上次检测到人脸不超过face_lost_grace_seconds时沿用上一个人脸框，
+        超过后才视为人脸丢失并重新累积
+
+        Args:
+            face_box: 新的人脸框（None表示本帧未检测到人脸）
+            now: 检测时间（秒，单调时钟或媒体时间）
+        """
+        now = now if now is not None else time.monotonic()
+        self.last_face_update_time = now
+
+        if face_box is not None:
+            self.face_box = face_box
+            self.last_face_seen_time = now
+            return
+
+        if self.face_box is None or now - self.last_face_seen_time < self.face_lost_grace_seconds:
+            return
+
+        # 人脸丢失超过宽限时间，旧信号不再连续
+        self.reset()
+        self.face_box = None
+
+    # ------------------------------------------------------------------
+    # 心率估计
+    # ------------------------------------------------------------------
+
+    def ready_for_estimate(self, now: Optional[float] = None) -> bool:
+        """是否到达下一个hop窗口且缓冲区覆盖足够时长"""
+        now = now if now is not None else time.monotonic()
+        if now - self.last_estimate_time < self.hop_seconds or self._count < 2:
+            return False
+
+        newest = self._times[(self._head - 1) % self.capacity]
+        oldest = self._times[0] if self._count < self.capacity else self._times[self._head]
+        return newest - oldest >= self.window_seconds * 0.8
+
+    def estimate(
+        self,
+        window: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+        now: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        对一个窗口执行心率估计
+
+        在线程池中调用时，应先在写入线程中取好window()再传入
+
+        Args:
+            window: (values, timestamps)，默认取当前窗口
+            now: 估计时间（秒，默认单调时钟；离线分析时传入媒体时间）
+
+        Returns:
+            心率结果，信号不足时返回None
+        """
+        self.last_estimate_time = now if now is not None else time.monotonic()
+        values, times = window if window is not None else self.window()
+
+        try:
+            result = estimate_heart_rate(values, times)
+        except Exception as e:
+            logger.debug("ppg_estimate_failed", session_id=self.session_id, error=str(e))
+            return None
+
+        if result:
+            self.estimates_computed += 1
+            self.last_result = result
+
+        return result
+
+    def get_buffer_status(self) -> Dict[str, Any]:
+        """获取缓冲区状态"""
+        _, times = self.window()
+        return {
+            "samples": int(len(times)),
+            "capacity": self.capacity,
+            "window_seconds": self.window_seconds,
+            "covered_seconds": round(float(times[-1] - times[0]), 2) if len(times) > 1 else 0.0,
+            "face_locked": self.face_box is not None,
+            "estimates_computed": self.estimates_computed,
+            "last_heart_rate": self.last_result["heart_rate"] if self.last_result else None,
+        }
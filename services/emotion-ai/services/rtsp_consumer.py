@@ -7,17 +7,34 @@ import asyncio
 import cv2
 import numpy as np
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 from config import settings
 from utils.logger import get_logger
-from models.deepface_analyzer import get_deepface_analyzer
-from models.emotion2vec_analyzer import get_emotion2vec_analyzer
-from models.ppg_detector import get_ppg_detector
 from models.video_processor import VideoFrameProcessor
 from services.data_writer import get_data_writer
 from services.redis_publisher import get_redis_publisher
 from services.audio_extractor import AudioExtractor
+from services.frame_grabber import FrameGrabber, read_retry_delay
+from services.inference_scheduler import get_audio_inference_scheduler, get_inference_scheduler
+from services.ppg_session import SessionPPG
+from services.audio_analysis import analyze_audio_batch, load_audio_model
+from services.face_analysis import FrameRequest, analyze_request, face_region_to_box, load_emotion_models
+from services.face_tracker import FaceTracker
+from services.embedding_store import SessionEmbeddingStore
+from services.adaptive_rate import AdaptiveRateController
+from services.inference_workers import get_inference_worker_pool
+from services.ffmpeg_ingest import FFmpegIngest
+from services.checkpoint_persister import get_checkpoint_persister
+from services.pipeline import FrameItem, InferenceRequest, StageMetrics, StageQueue
+from services.frame_preprocessor import (
+    FramePreprocessor,
+    Region,
+    compute_scale,
+    crop_and_scale,
+    map_result_to_frame,
+    pad_region,
+)
 
 logger = get_logger(__name__)
 
@@ -49,18 +66,42 @@ class RTSPConsumer:
         self.rtsp_url = f"rtsp://{host_ip}:8554/{stream_name}"
 
         # 组件
-        self.deepface = get_deepface_analyzer()
-        self.emotion2vec = get_emotion2vec_analyzer()
-        self.ppg_detector = get_ppg_detector()
+        self.ppg = SessionPPG(session_id)
+        self.rate_controller = (
+            AdaptiveRateController(session_id) if settings.adaptive_frame_rate_enabled else None
+        )
         self.video_processor = VideoFrameProcessor(target_size=None)
+        self.preprocessor = (
+            FramePreprocessor(session_id) if settings.frame_preprocessing_enabled else None
+        )
+        self.face_tracker = FaceTracker(session_id) if settings.face_tracking_enabled else None
         self.data_writer = get_data_writer()
         self.redis_publisher = get_redis_publisher()
-        self.audio_extractor = AudioExtractor(self.rtsp_url, session_id)
+        self.ingest_mode = settings.rtsp_ingest_mode
+        self.audio_extractor = AudioExtractor(
+            self.rtsp_url, session_id, shared_ingest=self.ingest_mode == "ffmpeg"
+        )
+        self.inference_scheduler = (
+            get_inference_scheduler() if settings.inference_batching_enabled else None
+        )
+        self.worker_pool = (
+            get_inference_worker_pool() if settings.inference_worker_pool_enabled else None
+        )
+        self.audio_scheduler = (
+            get_audio_inference_scheduler() if settings.audio_batching_enabled else None
+        )
+        self.embedding_store = (
+            SessionEmbeddingStore(session_id) if settings.audio_embeddings_enabled else None
+        )
 
         # 状态
         self.is_running = False
-        self.cap: Optional[cv2.VideoCapture] = None
+        self.cap: Optional[cv2.VideoCapture] = None  # ffmpeg模式下为FFmpegIngest（接口兼容）
         self.task: Optional[asyncio.Task] = None
+        self.publish_task: Optional[asyncio.Task] = None
+        self.ppg_estimate: Optional[asyncio.Future] = None
+        self.frame_grabber: Optional[FrameGrabber] = None
+        self.use_grabber_thread = settings.rtsp_grabber_thread_enabled
 
         # 统计
         self.frames_processed = 0
@@ -69,6 +110,33 @@ class RTSPConsumer:
         self.audio_emotions_detected = 0
         self.heart_rate_measurements = 0
         self.start_time: Optional[datetime] = None
+        self.last_frame_age_ms: Optional[float] = None
+        self.max_frame_age_ms = 0.0
+
+        # 分阶段流水线：抓帧 -> 预处理 -> 推理 -> 发布（有界队列，满时丢弃最旧项）
+        self.preprocess_queue = StageQueue(
+            "preprocess", settings.pipeline_frame_queue_size, on_drop=self._release_frame
+        )
+        self.infer_queue = StageQueue(
+            "infer",
+            settings.pipeline_frame_queue_size,
+            on_drop=lambda request: self._release_frame(request.item),
+        )
+        # 发布队列只丢弃视频情绪结果（实时显示用，检查点按时间窗口采样）；
+        # 音频情绪和心率结果每条都要写入检查点，不丢弃
+        self.publish_queue = StageQueue(
+            "publish",
+            settings.pipeline_publish_queue_size,
+            on_drop=self._on_publish_dropped,
+            keep=lambda entry: entry[0] != "video_emotion",
+        )
+        self.publish_dropped: Dict[str, int] = {}
+        self.stage_metrics = {
+            name: StageMetrics(name) for name in ("ingest", "preprocess", "infer", "publish")
+        }
+        # 端到端延迟：抓帧 -> 结果发布
+        self.end_to_end_metrics = StageMetrics("end_to_end")
+        self.consecutive_read_failures = 0
 
         # 配置
         self.frame_skip_interval = settings.frame_skip_interval
@@ -134,29 +202,36 @@ class RTSPConsumer:
             logger.error("checkpoint_file_init_failed", session_id=self.session_id, error=str(e))
             # 非致命错误，继续运行
 
-        # 初始化DeepFace分析器
-        if not self.deepface.is_initialized:
-            self.deepface.initialize()
+        # 加载情绪分类模型（批量路径不可用时才初始化DeepFace封装器）
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, load_emotion_models)
 
-        # 初始化emotion2vec分析器
-        if not self.emotion2vec.is_initialized:
-            try:
-                self.emotion2vec.initialize()
-                logger.info("emotion2vec_initialized", session_id=self.session_id)
-            except Exception as e:
-                logger.error(
-                    "emotion2vec_init_failed",
-                    session_id=self.session_id,
-                    error=str(e),
-                    message="音频情绪分析将被禁用"
-                )
+        # 加载emotion2vec模型（与批量推理共用同一实例，已加载时直接返回）
+        audio_enabled = await loop.run_in_executor(None, load_audio_model)
+        if audio_enabled:
+            logger.info("emotion2vec_initialized", session_id=self.session_id)
+        else:
+            logger.error(
+                "emotion2vec_init_failed",
+                session_id=self.session_id,
+                message="音频情绪分析将被禁用"
+            )
+
+        # 发布阶段（视频/音频/心率结果 -> 检查点缓冲区和Redis）
+        if self.main_loop is None:
+            self.main_loop = asyncio.get_running_loop()
+        self.publish_task = asyncio.create_task(self._publish_stage())
 
         # 设置音频回调并启动音频提取器
-        if self.emotion2vec.is_initialized:
+        if audio_enabled:
             self.audio_extractor.set_audio_callback(self._on_audio_ready)
             await self.audio_extractor.start()
             logger.info("audio_extractor_started", session_id=self.session_id)
 
+        # 登记为活跃流（参与分析帧率分摊）
+        if self.rate_controller:
+            self.rate_controller.register()
+
         # 启动异步任务
         self.is_running = True
         self.start_time = datetime.now()
@@ -174,12 +249,15 @@ class RTSPConsumer:
 
         self.is_running = False
 
+        if self.rate_controller:
+            self.rate_controller.unregister()
+
         # 停止音频提取器
         if self.audio_extractor:
             await self.audio_extractor.stop()
             logger.info("audio_extractor_stopped", session_id=self.session_id)
 
-        # 等待任务完成
+        # 等待帧处理阶段结束
         if self.task:
             try:
                 await asyncio.wait_for(self.task, timeout=5.0)
@@ -187,10 +265,17 @@ class RTSPConsumer:
                 logger.warning("rtsp_consumer_stop_timeout", session_id=self.session_id)
                 self.task.cancel()
 
+        # 发布阶段处理完队列中剩余的结果
+        if self.publish_task:
+            self.publish_queue.put(None)
+            try:
+                await asyncio.wait_for(self.publish_task, timeout=5.0)
+            except asyncio.TimeoutError:
+                logger.warning("publish_task_stop_timeout", session_id=self.session_id)
+                self.publish_task.cancel()
+
         # 释放OpenCV资源
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        await self._release_capture()
 
         # ✅ 确保最后一个窗口的检查点被添加到缓冲区（修复checkpoint丢失问题）
         if self.current_window_checkpoint:
@@ -202,8 +287,37 @@ class RTSPConsumer:
                 buffer_size=len(self.checkpoint_buffer)
             )
 
-        # 保存剩余检查点到文件
+        # 保存剩余检查点到文件，并等待写入线程把本会话数据全部落盘
         await self._flush_checkpoints()
+        try:
+            await get_checkpoint_persister().flush(self.session_id)
+        except Exception as e:
+            logger.error("checkpoint_final_flush_failed", session_id=self.session_id, error=str(e))
+
+        # 可选：转换为列式格式（之后读取和文件信息都使用.npz）
+        if settings.checkpoint_columnar_enabled:
+            try:
+                from services.checkpoint_file_writer import get_checkpoint_file_writer
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(
+                    None, get_checkpoint_file_writer().compact_to_columnar, self.session_id
+                )
+            except Exception as e:
+                logger.error("checkpoint_compaction_failed", session_id=self.session_id, error=str(e))
+
+        # 保存音频嵌入（与检查点文件同目录）
+        if self.embedding_store is not None and self.embedding_store.count:
+            try:
+                from services.checkpoint_file_writer import get_checkpoint_file_writer
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(
+                    None,
+                    get_checkpoint_file_writer().save_embeddings,
+                    self.session_id,
+                    self.embedding_store,
+                )
+            except Exception as e:
+                logger.error("save_audio_embeddings_failed", session_id=self.session_id, error=str(e))
 
         # 更新数据库中的文件信息（新架构）
         # ✅ 修复：使用session_id判断
@@ -211,7 +325,8 @@ class RTSPConsumer:
             try:
                 from services.checkpoint_file_writer import get_checkpoint_file_writer
                 file_writer = get_checkpoint_file_writer()
-                file_info = file_writer.get_file_info(self.session_id)
+                loop = asyncio.get_event_loop()
+                file_info = await loop.run_in_executor(None, file_writer.get_file_info, self.session_id)
 
                 if file_info:
                     async with self.data_writer as writer:
@@ -258,7 +373,10 @@ class RTSPConsumer:
                 )
 
                 # 读取检查点数据
-                checkpoint_data = file_writer.read_checkpoint_data(self.session_id)
+                loop = asyncio.get_event_loop()
+                checkpoint_data = await loop.run_in_executor(
+                    None, file_writer.read_checkpoint_data, self.session_id
+                )
 
                 # ⭐ 增强日志：checkpoint读取后
                 logger.info(
@@ -409,6 +527,8 @@ class RTSPConsumer:
                 # raise
         # ✅ 修复：删除else分支，因为session_id始终有值
 
+        get_checkpoint_persister().discard(self.session_id)
+
         logger.info(
             "rtsp_consumer_stopped",
             session_id=self.session_id,
@@ -467,149 +587,477 @@ class RTSPConsumer:
         try:
             logger.info("connecting_to_rtsp", rtsp_url=self.rtsp_url)
 
-            # 使用OpenCV连接RTSP
-            self.cap = cv2.VideoCapture(self.rtsp_url)
+            # 释放上一次连接（重连场景）
+            await self._release_capture()
 
-            if not self.cap.isOpened():
-                logger.error("rtsp_stream_not_opened", rtsp_url=self.rtsp_url)
-                return False
+            loop = asyncio.get_event_loop()
+            if self.ingest_mode == "ffmpeg":
+                # 单个ffmpeg进程同时输出视频帧和音频（一个RTSP连接）
+                self.cap = await self._open_ffmpeg_ingest()
+                if self.cap is None:
+                    logger.error("rtsp_stream_not_opened", rtsp_url=self.rtsp_url)
+                    return False
+            else:
+                # 使用OpenCV连接RTSP（打开流可能耗时数秒，放到线程池中）
+                self.cap = await loop.run_in_executor(None, cv2.VideoCapture, self.rtsp_url)
+
+                if not self.cap.isOpened():
+                    logger.error("rtsp_stream_not_opened", rtsp_url=self.rtsp_url)
+                    return False
 
-            # 设置缓冲区大小（减少延迟）
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                # 设置缓冲区大小（减少延迟）
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
-            logger.info("rtsp_connected", rtsp_url=self.rtsp_url)
+            # 抓帧线程模式：cap.read()在独立线程中执行
+            if self.use_grabber_thread:
+                # 启用推理进程池时，帧直接解码进共享内存帧环
+                ring_slots = settings.frame_ring_slots if self.worker_pool else 0
+                self.frame_grabber = FrameGrabber(self.cap, self.session_id, ring_slots=ring_slots)
+                self.frame_grabber.start()
+
+            logger.info(
+                "rtsp_connected",
+                rtsp_url=self.rtsp_url,
+                ingest_mode=self.ingest_mode,
+                grabber_thread=self.use_grabber_thread,
+            )
             return True
 
         except Exception as e:
             logger.error("rtsp_connection_error", error=str(e), rtsp_url=self.rtsp_url)
             return False
 
+    async def _open_ffmpeg_ingest(self) -> Optional[FFmpegIngest]:
+        """
+        启动ffmpeg拉流进程并等待第一帧
+
+        源流没有音轨时ffmpeg会直接退出，此时去掉音频输出重试一次
+
+        Returns:
+            FFmpegIngest，失败时返回None
+        """
+        loop = asyncio.get_event_loop()
+        # 没有音频消费者时不输出音频（管道写满会阻塞视频）
+        with_audio = self.audio_extractor.is_running
+
+        for audio in ([True, False] if with_audio else [False]):
+            ingest = FFmpegIngest(self.rtsp_url, self.session_id, with_audio=audio)
+            if not ingest.open():
+                return None
+
+            if await loop.run_in_executor(None, ingest.wait_ready):
+                self.audio_extractor.attach_ingest(ingest if audio else None)
+                return ingest
+
+            await loop.run_in_executor(None, ingest.release)
+            logger.warning(
+                "ffmpeg_ingest_not_ready",
+                session_id=self.session_id,
+                with_audio=audio,
+            )
+
+        return None
+
+    async def _release_capture(self):
+        """释放VideoCapture（抓帧线程模式下由线程自行释放）"""
+        if self.ingest_mode == "ffmpeg":
+            self.audio_extractor.attach_ingest(None)
+
+        if self.frame_grabber:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.frame_grabber.stop)
+
+            # 抓取线程卡在read()中（源停止发送数据）：由这里终止ffmpeg唤醒读取方，再等线程退出
+            # （OpenCV的VideoCapture不能在read()进行中从其它线程释放）
+            if self.frame_grabber.is_alive and isinstance(self.cap, FFmpegIngest):
+                await loop.run_in_executor(None, self.cap.release)
+                await loop.run_in_executor(None, self.frame_grabber.stop)
+
+            self.frame_grabber.close_ring()
+            self.frame_grabber = None
+            if self.worker_pool:
+                self.worker_pool.release_closed_rings()
+            self.cap = None
+
+        if self.cap:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self.cap.release)
+            self.cap = None
+
+    async def _read_frame(self) -> Optional[FrameItem]:
+        """
+        读取下一帧
+
+        抓帧线程模式下等待抓帧线程的新帧通知（不轮询），否则在线程池中调用cap.read()
+
+        Returns:
+            FrameItem（暂无可用帧时返回None）
+        """
+        if self.frame_grabber:
+            # 超时只是为了让调用方定期检查运行状态
+            item = await self.frame_grabber.wait_latest(timeout=0.5)
+            if item is None:
+                return None
+
+            frame, grab_time, _, slot = item
+            self.last_frame_age_ms = (time.monotonic() - grab_time) * 1000
+            self.max_frame_age_ms = max(self.max_frame_age_ms, self.last_frame_age_ms)
+            return FrameItem(frame, grab_time, slot)
+
+        loop = asyncio.get_event_loop()
+        ret, frame = await loop.run_in_executor(None, self.cap.read)
+
+        if not ret or frame is None:
+            self.consecutive_read_failures += 1
+            logger.warning("rtsp_frame_read_failed", session_id=self.session_id)
+            delay = read_retry_delay(self.consecutive_read_failures)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return None
+
+        self.consecutive_read_failures = 0
+        return FrameItem(frame, time.monotonic(), None)
+
+    def _is_capture_open(self) -> bool:
+        """视频源是否仍然可读"""
+        if self.frame_grabber:
+            return self.frame_grabber.is_alive
+        return self.cap is not None and self.cap.isOpened()
+
+    def _release_frame(self, item: Optional[FrameItem]):
+        """归还帧占用的共享内存帧环槽位"""
+        if item is not None and item.slot is not None and self.frame_grabber:
+            self.frame_grabber.release_slot(item.slot)
+
     async def _process_frames(self):
-        """处理视频帧"""
-        while self.is_running and self.cap and self.cap.isOpened():
-            # 读取帧
-            ret, frame = self.cap.read()
-
-            if not ret or frame is None:
-                logger.warning("rtsp_frame_read_failed", session_id=self.session_id)
-                await asyncio.sleep(0.1)
+        """
+        处理视频帧
+
+        抓帧 -> 预处理 -> 推理 -> 发布 四个阶段并发运行，阶段之间用有界队列连接（满时丢弃最旧项），
+        推理变慢时只会丢弃排队中的旧帧，不会拖慢抓帧和PPG采样
+        """
+        stages = [
+            asyncio.create_task(self._preprocess_stage()),
+            asyncio.create_task(self._infer_stage()),
+        ]
+        try:
+            await self._ingest_stage()
+        finally:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+
+            # 归还排队中的帧（连接释放前帧环必须空闲）
+            for item in self.preprocess_queue.drain():
+                self._release_frame(item)
+            for request in self.infer_queue.drain():
+                self._release_frame(request.item)
+
+    async def _ingest_stage(self):
+        """抓帧阶段：读取帧、PPG采样、分析帧率控制，需要分析的帧交给预处理阶段"""
+        metrics = self.stage_metrics["ingest"]
+
+        while self.is_running and self._is_capture_open():
+            item = await self._read_frame()
+            if item is None:
                 continue
 
-            # 验证帧有效性
-            if not self.video_processor.is_valid_frame(frame):
-                logger.debug("invalid_frame_skipped", session_id=self.session_id)
+            started = time.monotonic()
+            forwarded = False
+            try:
+                # 验证帧有效性
+                if not self.video_processor.is_valid_frame(item.frame):
+                    logger.debug("invalid_frame_skipped", session_id=self.session_id)
+                    continue
+
+                self.frames_processed += 1
+                item = item._replace(frame_number=self.frames_processed)
+
+                # PPG心率检测（每帧采样ROI均值，按hop窗口计算心率）
+                self._sample_ppg(item)
+
+                # 帧跳过（降低分析频率）
+                if self._should_skip_analysis():
+                    continue
+
+                self.preprocess_queue.put(item)
+                forwarded = True
+            finally:
+                if not forwarded:
+                    self._release_frame(item)
+                metrics.record(started)
+
+    async def _preprocess_stage(self):
+        """预处理阶段：人脸跟踪、ROI规划、构建推理输入"""
+        metrics = self.stage_metrics["preprocess"]
+
+        while True:
+            item = await self.preprocess_queue.get()
+            started = time.monotonic()
+            try:
+                request = self._prepare_inference(item)
+            except Exception as e:
+                metrics.errors += 1
+                self._release_frame(item)
+                logger.error(
+                    "frame_preprocess_error",
+                    session_id=self.session_id,
+                    error=str(e),
+                    error_type=type(e).__name__,
+                )
                 continue
 
-            self.frames_processed += 1
+            self.infer_queue.put(request)
+            metrics.record(started)
+
+    async def _infer_stage(self):
+        """推理阶段：提交推理、更新ROI/跟踪/PPG人脸框，识别结果交给发布阶段"""
+        metrics = self.stage_metrics["infer"]
+
+        while True:
+            request = await self.infer_queue.get()
+            started = time.monotonic()
+            try:
+                result = await self._run_inference(request.payload)
+                self._update_analysis_rate((time.monotonic() - started) * 1000)
+                result = self._apply_inference_result(request, result)
+            except Exception as e:
+                metrics.errors += 1
+                result = None
+                logger.error(
+                    "frame_analysis_error",
+                    session_id=self.session_id,
+                    error=str(e),
+                    error_type=type(e).__name__,
+                )
+            finally:
+                # 跟踪器已用完帧数据，归还槽位
+                self._release_frame(request.item)
+
+            metrics.record(started)
 
-            # 帧跳过（降低分析频率）
-            if self.video_processor.should_skip_frame(self.frame_skip_interval):
+            if result is None:
+                logger.debug("no_emotion_detected_in_frame", session_id=self.session_id)
                 continue
 
-            # 异步处理帧（避免阻塞）
-            await self._analyze_frame(frame)
+            self.publish_queue.put(("video_emotion", {
+                "result": result,
+                "timestamp": datetime.now(),
+                "frame_number": request.item.frame_number,
+                "grab_time": request.item.grab_time,
+            }))
+
+    def _should_skip_analysis(self) -> bool:
+        """
+        当前帧是否跳过分析
 
-            # PPG心率检测（添加帧到缓冲区并可能计算心率）
-            await self._process_ppg_frame(frame)
+        自适应模式下由帧率控制器决定，否则按固定间隔每N帧分析一次
+        """
+        if self.rate_controller:
+            return not self.rate_controller.should_analyze()
+        return self.video_processor.should_skip_frame(self.frame_skip_interval)
 
-            # 定期保存检查点
-            await self._maybe_flush_checkpoints()
+    def _update_analysis_rate(self, latency_ms: float):
+        """将推理延迟和队列积压（调度器队列 + 本流推理队列）反馈给帧率控制器"""
+        if not self.rate_controller:
+            return
+
+        if self.inference_scheduler:
+            queue_depth = self.inference_scheduler.pending
+            throughput = self.inference_scheduler.estimated_throughput()
+        else:
+            queue_depth = 0
+            throughput = None
 
-            # 让出控制权
-            await asyncio.sleep(0.01)
+        self.rate_controller.update(latency_ms, queue_depth + len(self.infer_queue), throughput)
 
-    async def _analyze_frame(self, frame):
+    def _inference_payload(self, item: FrameItem, region: Optional[Region], scale: float):
         """
-        分析单帧图像
+        推理输入：帧位于共享内存帧环时只传槽位引用（裁剪缩放在推理进程中完成，无需复制）
 
         Args:
-            frame: OpenCV帧
+            item: 帧
+            region: 裁剪区域（None表示整帧）
+            scale: 缩放比例
+
+        Returns:
+            FrameSlot或推理图像
         """
-        try:
-            # 在线程池中运行DeepFace分析（避免阻塞事件循环）
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, self.deepface.analyze_emotion, frame)
+        if (
+            self.worker_pool
+            and item.slot is not None
+            and self.frame_grabber
+            and self.frame_grabber.frame_ring
+        ):
+            return self.frame_grabber.frame_ring.ref(item.slot, region, scale)
+        return crop_and_scale(item.frame, region, scale)
+
+    def _prepare_inference(self, item: FrameItem) -> InferenceRequest:
+        """
+        构建推理请求
 
-            if result is None:
-                logger.debug("no_emotion_detected_in_frame", session_id=self.session_id)
-                return
+        跟踪成功时只对跟踪到的人脸框做情绪分类（跳过检测）；否则缩放到推理分辨率，
+        有上一次人脸框时只分析ROI
 
-            self.emotions_detected += 1
+        Args:
+            item: 帧
 
-            # 构建检查点数据
-            checkpoint = {
-                "session_id": self.session_id,
-                "timestamp": datetime.now(),
-                "data_type": "video_emotion",
-                "payload": {
-                    "dominant_emotion": result["dominant_emotion"],
-                    "emotion_scores": result["emotion_scores"],
-                },
-                "confidence": result["confidence"],
-                "metadata": {
-                    "frame_number": self.frames_processed,
-                },
-            }
+        Returns:
+            InferenceRequest
+        """
+        frame = item.frame
+        tracked_box = self.face_tracker.track(frame) if self.face_tracker else None
+        region = (
+            pad_region(tracked_box, frame.shape[1], frame.shape[0]) if tracked_box else None
+        )
 
-            # ✨ 实时推送到Redis（每帧都推送，不受采样策略影响）
-            await self.redis_publisher.publish_analysis_result(
-                session_id=self.session_id,
-                data_type="video_emotion",
-                result={
-                    "dominant_emotion": result["dominant_emotion"],
-                    "emotion_scores": result["emotion_scores"],
-                    "confidence": result["confidence"],
-                    "frame_number": self.frames_processed,
-                    "face_detected": result.get("face_detected", False),
-                    "face_count": result.get("face_count", 0),
-                }
+        if region is not None:
+            scale = compute_scale(region[2], region[3], settings.inference_frame_width)
+            face_box = (0, 0, int(round(region[2] * scale)), int(round(region[3] * scale)))
+            payload = FrameRequest(
+                self._inference_payload(item, region, scale),
+                face_box,
+                self.face_tracker.face_count,
             )
+            return InferenceRequest(item, payload, region, scale, tracked_box)
 
-            # ⭐ 时间窗口采样逻辑（性能优化，仅用于文件持久化）
-            current_time = time.time()
-            time_in_window = current_time - self.current_window_start
+        region, scale = self.preprocessor.plan(frame.shape) if self.preprocessor else (None, 1.0)
+        return InferenceRequest(item, self._inference_payload(item, region, scale), region, scale, None)
 
-            if time_in_window >= self.checkpoint_save_interval:
-                # 窗口结束，保存上一个窗口的检查点
-                if self.current_window_checkpoint:
-                    self.checkpoint_buffer.append(self.current_window_checkpoint)
-                    logger.debug(
-                        "checkpoint_sampled",
-                        session_id=self.session_id,
-                        strategy=self.checkpoint_sampling_strategy,
-                        window_duration=time_in_window,
-                    )
+    async def _run_inference(self, payload: Any) -> Optional[Dict[str, Any]]:
+        """
+        执行一次帧推理
+
+        Args:
+            payload: 推理输入（图像、FrameSlot或FrameRequest）
 
-                # 重置窗口
-                self.current_window_start = current_time
+        Returns:
+            推理结果
+        """
+        if self.inference_scheduler:
+            # 提交到跨会话推理调度器（与其它会话的帧合并为微批）
+            return await asyncio.wrap_future(self.inference_scheduler.submit(payload))
+
+        loop = asyncio.get_event_loop()
+        if self.worker_pool:
+            # 单帧提交到推理进程池
+            results = await loop.run_in_executor(None, self.worker_pool.analyze_frames, [payload])
+            return results[0]
+
+        # 在线程池中运行帧分析（避免阻塞事件循环）
+        return await loop.run_in_executor(None, analyze_request, payload)
+
+    def _apply_inference_result(
+        self,
+        request: InferenceRequest,
+        result: Optional[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        推理结果映射回原始帧坐标，并更新ROI、人脸跟踪和PPG人脸框
+
+        Args:
+            request: 推理请求
+            result: 推理结果
+
+        Returns:
+            映射后的结果
+        """
+        result = map_result_to_frame(result, request.region, request.scale)
+        if self.preprocessor:
+            self.preprocessor.update(result, request.region)
+
+        if self.face_tracker:
+            if request.tracked_box is None:
+                # 检测帧：用检测结果重新初始化跟踪
+                self.face_tracker.on_detection(
+                    request.item.frame,
+                    face_region_to_box(result.get("face_region")) if result else None,
+                    result.get("face_count", 0) if result else 0,
+                )
+            elif result is None:
+                self.face_tracker.reset()
+
+        # 人脸检测结果共享给PPG（短暂未检测到人脸时PPG在宽限时间内沿用上一个人脸框）
+        self.ppg.update_face_box(face_region_to_box(result.get("face_region")) if result else None)
+        return result
+
+    async def _handle_video_result(self, item: Dict[str, Any]):
+        """
+        发布一条视频情绪结果：实时推送Redis，并按时间窗口采样写入检查点缓冲区
+
+        Args:
+            item: 推理阶段提交的结果（result、timestamp、frame_number、grab_time）
+        """
+        result = item["result"]
+        self.emotions_detected += 1
+        self.end_to_end_metrics.record(item["grab_time"])
+
+        # 构建检查点数据
+        checkpoint = {
+            "session_id": self.session_id,
+            "timestamp": item["timestamp"],
+            "data_type": "video_emotion",
+            "payload": {
+                "dominant_emotion": result["dominant_emotion"],
+                "emotion_scores": result["emotion_scores"],
+            },
+            "confidence": result["confidence"],
+            "metadata": {
+                "frame_number": item["frame_number"],
+            },
+        }
+
+        # ✨ 实时推送到Redis（每帧都推送，不受采样策略影响）
+        await self.redis_publisher.publish_analysis_result(
+            session_id=self.session_id,
+            data_type="video_emotion",
+            result={
+                "dominant_emotion": result["dominant_emotion"],
+                "emotion_scores": result["emotion_scores"],
+                "confidence": result["confidence"],
+                "frame_number": item["frame_number"],
+                "face_detected": result.get("face_detected", False),
+                "face_count": result.get("face_count", 0),
+            }
+        )
+
+        # ⭐ 时间窗口采样逻辑（性能优化，仅用于文件持久化）
+        current_time = time.time()
+        time_in_window = current_time - self.current_window_start
+
+        if time_in_window >= self.checkpoint_save_interval:
+            # 窗口结束，保存上一个窗口的检查点
+            if self.current_window_checkpoint:
+                self.checkpoint_buffer.append(self.current_window_checkpoint)
+                logger.debug(
+                    "checkpoint_sampled",
+                    session_id=self.session_id,
+                    strategy=self.checkpoint_sampling_strategy,
+                    window_duration=time_in_window,
+                )
+
+            # 重置窗口
+            self.current_window_start = current_time
+            self.current_window_checkpoint = checkpoint
+        else:
+            # 窗口内，根据策略更新候选检查点
+            if self.checkpoint_sampling_strategy == "last_valid":
+                # 最近帧策略：直接替换
                 self.current_window_checkpoint = checkpoint
-            else:
-                # 窗口内，根据策略更新候选检查点
-                if self.checkpoint_sampling_strategy == "last_valid":
-                    # 最近帧策略：直接替换
+            elif self.checkpoint_sampling_strategy == "highest_confidence":
+                # 最高置信度策略：比较置信度
+                if (
+                    not self.current_window_checkpoint
+                    or checkpoint["confidence"] > self.current_window_checkpoint["confidence"]
+                ):
                     self.current_window_checkpoint = checkpoint
-                elif self.checkpoint_sampling_strategy == "highest_confidence":
-                    # 最高置信度策略：比较置信度
-                    if (
-                        not self.current_window_checkpoint
-                        or checkpoint["confidence"] > self.current_window_checkpoint["confidence"]
-                    ):
-                        self.current_window_checkpoint = checkpoint
 
-            logger.debug(
-                "emotion_detected",
-                session_id=self.session_id,
-                emotion=result["dominant_emotion"],
-                confidence=result["confidence"],
-            )
-
-        except Exception as e:
-            logger.error(
-                "frame_analysis_error",
-                session_id=self.session_id,
-                error=str(e),
-                error_type=type(e).__name__,
-            )
+        logger.debug(
+            "emotion_detected",
+            session_id=self.session_id,
+            emotion=result["dominant_emotion"],
+            confidence=result["confidence"],
+        )
 
     async def _maybe_flush_checkpoints(self):
         """根据时间间隔决定是否刷新检查点"""
@@ -618,7 +1066,7 @@ class RTSPConsumer:
             await self._flush_checkpoints()
 
     async def _flush_checkpoints(self):
-        """批量保存检查点到JSON文件（新架构）"""
+        """批量提交检查点给写入线程（不在事件循环中做文件I/O）"""
         # 添加当前窗口的检查点（如果存在）
         if self.current_window_checkpoint:
             self.checkpoint_buffer.append(self.current_window_checkpoint)
@@ -647,19 +1095,13 @@ class RTSPConsumer:
 
                 data_points.append(data_point)
 
-            # 写入文件
-            file_info = self.data_writer.write_checkpoint_file(
-                session_id=self.session_id,
-                data_points=data_points
-            )
+            # 交给写入线程（同一会话未写完的批次会合并为一次追加）
+            get_checkpoint_persister().submit(self.session_id, data_points)
 
-            logger.info(
-                "checkpoints_flushed_to_file",
+            logger.debug(
+                "checkpoints_submitted",
                 session_id=self.session_id,
                 count=len(data_points),
-                file_path=file_info["relative_path"],
-                total_count=file_info["checkpoint_count"],
-                size_kb=round(file_info["file_size"] / 1024, 2)
             )
 
             # 清空缓冲区
@@ -674,79 +1116,45 @@ class RTSPConsumer:
                 buffer_size=len(self.checkpoint_buffer),
             )
 
-    def _on_audio_ready(self, audio_data: 'np.ndarray'):
+    async def _on_audio_ready(self, audio_data: 'np.ndarray', speech_ratio: Optional[float] = None):
         """
-        音频准备就绪回调（同步函数，在线程池中执行）
+        音频准备就绪回调（在事件循环中等待推理结果）
+
+        推理在调度器/进程池/线程池中运行，事件循环只等待future，不占用线程池线程；
+        检查点缓冲和Redis推送交给发布阶段处理
 
         Args:
             audio_data: 音频numpy数组（float32, 单声道, 16kHz）
+            speech_ratio: VAD语音占比（静音片段已在提取器中过滤）
         """
         try:
-            import numpy as np
-
             self.audio_segments_processed += 1
+            segment_number = self.audio_segments_processed
+            loop = asyncio.get_running_loop()
 
             # 使用emotion2vec分析音频情绪
-            result = self.emotion2vec.analyze_audio_array(audio_data)
+            if self.audio_scheduler:
+                # 与其它会话的片段合并为微批（等待期间片段视图保持有效）
+                result = await asyncio.wrap_future(self.audio_scheduler.submit(audio_data))
+            elif self.worker_pool:
+                # 启用进程池时在工作进程中运行
+                results = await loop.run_in_executor(None, self.worker_pool.analyze_audio, [audio_data])
+                result = results[0]
+            else:
+                results = await loop.run_in_executor(None, analyze_audio_batch, [audio_data])
+                result = results[0]
 
             if result is None:
                 logger.debug("no_audio_emotion_detected", session_id=self.session_id)
                 return
 
-            self.audio_emotions_detected += 1
-
-            # 构建检查点数据
-            checkpoint = {
-                "session_id": self.session_id,
+            self.publish_queue.put(("audio_emotion", {
+                "result": result,
                 "timestamp": datetime.now(),
-                "data_type": "audio_emotion",
-                "payload": {
-                    "dominant_emotion": result["dominant_emotion"],
-                    "emotion_scores": result["emotion_scores"],
-                },
-                "confidence": result["confidence"],
-                "metadata": {
-                    "audio_segment_number": self.audio_segments_processed,
-                    "audio_duration": len(audio_data) / self.audio_extractor.sample_rate,
-                },
-            }
-
-            # 添加到检查点缓冲区
-            self.checkpoint_buffer.append(checkpoint)
-
-            logger.info(
-                "audio_emotion_detected",
-                session_id=self.session_id,
-                emotion=result["dominant_emotion"],
-                confidence=result["confidence"],
-                segment=self.audio_segments_processed,
-            )
-
-            # ✅ 使用run_coroutine_threadsafe推送Redis实时数据（线程安全）
-            if self.main_loop and self.main_loop.is_running():
-                try:
-                    future = asyncio.run_coroutine_threadsafe(
-                        self.redis_publisher.publish_analysis_result(
-                            session_id=self.session_id,
-                            data_type="audio_emotion",
-                            result={
-                                "dominant_emotion": result["dominant_emotion"],
-                                "emotion_scores": result["emotion_scores"],
-                                "confidence": result["confidence"],
-                                "segment_number": self.audio_segments_processed,
-                            }
-                        ),
-                        self.main_loop
-                    )
-                    future.result(timeout=2.0)
-                except Exception as redis_error:
-                    logger.warning(
-                        "redis_publish_failed_audio",
-                        session_id=self.session_id,
-                        error=str(redis_error)
-                    )
-            else:
-                logger.debug("main_loop_not_available", session_id=self.session_id)
+                "segment_number": segment_number,
+                "audio_duration": len(audio_data) / self.audio_extractor.sample_rate,
+                "speech_ratio": speech_ratio,
+            }))
 
         except Exception as e:
             logger.error(
@@ -756,64 +1164,139 @@ class RTSPConsumer:
                 error_type=type(e).__name__,
             )
 
-    async def _process_ppg_frame(self, frame: np.ndarray):
-        """
-        处理PPG心率检测帧
+    def _on_publish_dropped(self, entry: Tuple[str, Dict[str, Any]]):
+        """发布队列满时丢弃的结果（只可能是视频情绪结果）"""
+        data_type = entry[0]
+        self.publish_dropped[data_type] = self.publish_dropped.get(data_type, 0) + 1
+        logger.debug(
+            "publish_result_dropped",
+            session_id=self.session_id,
+            data_type=data_type,
+            dropped=self.publish_dropped[data_type],
+        )
+
+    async def _publish_stage(self):
+        """发布阶段（事件循环侧）：消费视频/音频/心率结果，写入检查点缓冲区并推送Redis"""
+        handlers = {
+            "video_emotion": self._handle_video_result,
+            "audio_emotion": self._handle_audio_result,
+            "heart_rate": self._handle_heart_rate_result,
+        }
+        metrics = self.stage_metrics["publish"]
+
+        while True:
+            entry = await self.publish_queue.get()
+            if entry is None:
+                break
+
+            data_type, item = entry
+            started = time.monotonic()
+            try:
+                await handlers[data_type](item)
+                # 定期保存检查点
+                await self._maybe_flush_checkpoints()
+            except Exception as e:
+                metrics.errors += 1
+                logger.error(
+                    "result_publish_error",
+                    session_id=self.session_id,
+                    data_type=data_type,
+                    error=str(e),
+                    error_type=type(e).__name__,
+                )
+            metrics.record(started)
 
-        每帧都会添加到PPG缓冲区，当缓冲区满时自动计算心率
+    async def _handle_audio_result(self, item: Dict[str, Any]):
+        """
+        处理一条音频情绪结果
 
         Args:
-            frame: OpenCV帧
+            item: 推理线程提交的结果（result、timestamp、segment_number等）
         """
+        result = item["result"]
+        speech_ratio = item["speech_ratio"]
+
+        self.audio_emotions_detected += 1
+
+        # 构建检查点数据
+        checkpoint = {
+            "session_id": self.session_id,
+            "timestamp": item["timestamp"],
+            "data_type": "audio_emotion",
+            "payload": {
+                "dominant_emotion": result["dominant_emotion"],
+                "emotion_scores": result["emotion_scores"],
+            },
+            "confidence": result["confidence"],
+            "metadata": {
+                "audio_segment_number": item["segment_number"],
+                "audio_duration": item["audio_duration"],
+                "speech_ratio": round(speech_ratio, 3) if speech_ratio is not None else None,
+            },
+        }
+
+        # 添加到检查点缓冲区
+        self.checkpoint_buffer.append(checkpoint)
+
+        # 保留片段嵌入（启用audio_embeddings_enabled时分析结果带embedding）
+        if self.embedding_store is not None and result.get("embedding") is not None:
+            self.embedding_store.append(
+                result["embedding"],
+                item["segment_number"],
+                item["timestamp"].timestamp(),
+                result["dominant_emotion"],
+            )
+
+        logger.info(
+            "audio_emotion_detected",
+            session_id=self.session_id,
+            emotion=result["dominant_emotion"],
+            confidence=result["confidence"],
+            segment=item["segment_number"],
+        )
+
+        # 推送Redis实时数据
         try:
-            # 在线程池中运行PPG帧处理（避免阻塞事件循环）
-            loop = asyncio.get_event_loop()
-            hr_result = await loop.run_in_executor(None, self.ppg_detector.detect_heart_rate, frame)
-
-            # 如果detect_heart_rate返回了结果（缓冲区已满并成功计算）
-            if hr_result:
-                self.heart_rate_measurements += 1
-
-                # 构建检查点数据
-                checkpoint = {
-                    "session_id": self.session_id,
-                    "timestamp": datetime.now(),
-                    "data_type": "heart_rate",
-                    "payload": {
-                        "heart_rate": hr_result['heart_rate'],
-                        "confidence": hr_result['confidence'],
-                        "signal_quality": hr_result['signal_quality'],
-                    },
-                    "confidence": hr_result['confidence'],
-                    "metadata": {
-                        "measurement_number": self.heart_rate_measurements,
-                        "frame_number": self.frames_processed,
-                    },
+            await self.redis_publisher.publish_analysis_result(
+                session_id=self.session_id,
+                data_type="audio_emotion",
+                result={
+                    "dominant_emotion": result["dominant_emotion"],
+                    "emotion_scores": result["emotion_scores"],
+                    "confidence": result["confidence"],
+                    "segment_number": item["segment_number"],
                 }
+            )
+        except Exception as redis_error:
+            logger.warning(
+                "redis_publish_failed_audio",
+                session_id=self.session_id,
+                error=str(redis_error)
+            )
 
-                # 添加到检查点缓冲区
-                self.checkpoint_buffer.append(checkpoint)
+    def _sample_ppg(self, item: FrameItem):
+        """
+        PPG采样（抓帧阶段每帧调用）
 
-                logger.info(
-                    "heart_rate_detected",
-                    session_id=self.session_id,
-                    bpm=hr_result['heart_rate'],
-                    confidence=hr_result['confidence'],
-                    quality=hr_result['signal_quality'],
-                    measurement=self.heart_rate_measurements,
-                )
+        每帧在事件循环中直接采样前额ROI均值（仅切片求均值），
+        人脸框复用推理阶段的检测结果，心率每个hop窗口在线程池中估计一次（不等待，结果交给发布阶段）
 
-                # 推送到Redis
-                await self.redis_publisher.publish_analysis_result(
-                    session_id=self.session_id,
-                    data_type="heart_rate",
-                    result={
-                        "heart_rate": hr_result['heart_rate'],
-                        "confidence": hr_result['confidence'],
-                        "signal_quality": hr_result['signal_quality'],
-                        "measurement_number": self.heart_rate_measurements,
-                    }
-                )
+        Args:
+            item: 帧
+        """
+        try:
+            self.ppg.push_frame(item.frame, item.grab_time)
+
+            if self.ppg_estimate is not None and not self.ppg_estimate.done():
+                return
+            if not self.ppg.ready_for_estimate():
+                return
+
+            loop = asyncio.get_event_loop()
+            self.ppg_estimate = loop.run_in_executor(None, self.ppg.estimate, self.ppg.window())
+            self.ppg_estimate.add_done_callback(
+                lambda future, frame_number=item.frame_number: self._on_ppg_estimate(future, frame_number)
+            )
 
         except Exception as e:
             logger.debug(
@@ -822,6 +1305,68 @@ class RTSPConsumer:
                 error=str(e),
             )
 
+    def _on_ppg_estimate(self, future: asyncio.Future, frame_number: int):
+        """心率估计完成回调（事件循环线程）"""
+        if future.cancelled() or future.exception() is not None or not future.result():
+            return
+
+        self.publish_queue.put(("heart_rate", {
+            "result": future.result(),
+            "timestamp": datetime.now(),
+            "frame_number": frame_number,
+        }))
+
+    async def _handle_heart_rate_result(self, item: Dict[str, Any]):
+        """
+        发布一条心率结果
+
+        Args:
+            item: PPG估计结果（result、timestamp、frame_number）
+        """
+        hr_result = item["result"]
+        self.heart_rate_measurements += 1
+
+        # 构建检查点数据
+        checkpoint = {
+            "session_id": self.session_id,
+            "timestamp": item["timestamp"],
+            "data_type": "heart_rate",
+            "payload": {
+                "heart_rate": hr_result['heart_rate'],
+                "confidence": hr_result['confidence'],
+                "signal_quality": hr_result['signal_quality'],
+            },
+            "confidence": hr_result['confidence'],
+            "metadata": {
+                "measurement_number": self.heart_rate_measurements,
+                "frame_number": item["frame_number"],
+            },
+        }
+
+        # 添加到检查点缓冲区
+        self.checkpoint_buffer.append(checkpoint)
+
+        logger.info(
+            "heart_rate_detected",
+            session_id=self.session_id,
+            bpm=hr_result['heart_rate'],
+            confidence=hr_result['confidence'],
+            quality=hr_result['signal_quality'],
+            measurement=self.heart_rate_measurements,
+        )
+
+        # 推送到Redis
+        await self.redis_publisher.publish_analysis_result(
+            session_id=self.session_id,
+            data_type="heart_rate",
+            result={
+                "heart_rate": hr_result['heart_rate'],
+                "confidence": hr_result['confidence'],
+                "signal_quality": hr_result['signal_quality'],
+                "measurement_number": self.heart_rate_measurements,
+            }
+        )
+
     def get_stats(self) -> Dict[str, Any]:
         """获取消费器统计信息"""
         return {
@@ -839,5 +1384,31 @@ class RTSPConsumer:
                 else 0
             ),
             "buffer_size": len(self.checkpoint_buffer),
-            "ppg_buffer_status": self.ppg_detector.get_buffer_status() if self.ppg_detector else {},
+            "frame_age_ms": (
+                round(self.last_frame_age_ms, 1)
+                if self.last_frame_age_ms is not None
+                else None
+            ),
+            "max_frame_age_ms": round(self.max_frame_age_ms, 1),
+            "pipeline": {
+                "stages": {name: metrics.get_stats() for name, metrics in self.stage_metrics.items()},
+                "end_to_end": self.end_to_end_metrics.get_stats(),
+                "queues": {
+                    queue.name: queue.get_stats()
+                    for queue in (self.preprocess_queue, self.infer_queue, self.publish_queue)
+                },
+                "publish_dropped": dict(self.publish_dropped),
+            },
+            "ingest_mode": self.ingest_mode,
+            "ffmpeg_ingest": self.cap.get_stats() if isinstance(self.cap, FFmpegIngest) else None,
+            "frame_grabber": self.frame_grabber.get_stats() if self.frame_grabber else None,
+            "frame_preprocessor": self.preprocessor.get_stats() if self.preprocessor else None,
+            "face_tracker": self.face_tracker.get_stats() if self.face_tracker else None,
+            "audio_embeddings": self.embedding_store.get_stats() if self.embedding_store else None,
+            "ppg_buffer_status": self.ppg.get_buffer_status(),
+            "analysis_rate": (
+                self.rate_controller.get_stats()
+                if self.rate_controller
+                else {"frame_skip_interval": self.frame_skip_interval}
+            ),
         }
@@ -6,6 +6,10 @@ RTSP消费管理器
 from typing import Dict, Optional
 import httpx
 from services.rtsp_consumer import RTSPConsumer
+from services.inference_scheduler import get_audio_inference_scheduler, get_inference_scheduler
+from services.inference_workers import get_inference_worker_pool
+from services.checkpoint_persister import get_checkpoint_persister
+from services.checkpoint_compactor import get_checkpoint_compactor
 from config import settings
 from utils.logger import get_logger
 
@@ -176,6 +180,27 @@ class RTSPConsumerManager:
         """获取所有消费器的统计信息"""
         return {
             "total_consumers": len(self.consumers),
+            "inference_scheduler": (
+                get_inference_scheduler().get_stats()
+                if settings.inference_batching_enabled
+                else None
+            ),
+            "audio_inference_scheduler": (
+                get_audio_inference_scheduler().get_stats()
+                if settings.audio_batching_enabled
+                else None
+            ),
+            "inference_worker_pool": (
+                get_inference_worker_pool().get_stats()
+                if settings.inference_worker_pool_enabled
+                else None
+            ),
+            "checkpoint_persister": get_checkpoint_persister().get_stats(),
+            "checkpoint_compactor": (
+                get_checkpoint_compactor().get_stats()
+                if settings.checkpoint_compaction_enabled
+                else None
+            ),
             "consumers": {
                 session_id: consumer.get_stats()
                 for session_id, consumer in self.consumers.items()
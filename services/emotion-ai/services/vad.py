@@ -0,0 +1,100 @@
+"""
+语音活动检测（VAD）
+基于短时能量和过零率，在emotion2vec推理前过滤静音片段
+"""
+
+from typing import Any, Dict, Optional
+import numpy as np
+from config import settings
+
+
+class EnergyVAD:
+    """
+    能量/过零率VAD（每个会话一个，维护自适应噪声底）
+
+    - 片段按20ms分帧（reshape视图，不复制），逐帧计算能量(dB)和过零率
+    - 语音帧：能量高于max(绝对阈值, 噪声底+margin)且过零率不超过上限（排除嘶声类噪声）
+    - 语音帧前后各保留若干帧（hangover），避免音节间的短暂停顿被判为静音
+    - 噪声底跟踪每个片段能量的低分位数：下降立即跟随，上升缓慢跟随
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: float = 20.0,
+        energy_threshold_db: Optional[float] = None,
+        noise_margin_db: Optional[float] = None,
+        max_zcr: float = 0.35,
+        hangover_frames: int = 5,
+    ):
+        """
+        Args:
+            sample_rate: 采样率
+            frame_ms: 分帧长度（毫秒）
+            energy_threshold_db: 绝对能量阈值（dBFS，默认取settings.vad_energy_threshold_db）
+            noise_margin_db: 高于噪声底的余量（dB，默认取settings.vad_noise_margin_db）
+            max_zcr: 语音帧过零率上限
+            hangover_frames: 语音帧前后保留的帧数
+        """
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.energy_threshold_db = (
+            settings.vad_energy_threshold_db if energy_threshold_db is None else energy_threshold_db
+        )
+        self.noise_margin_db = (
+            settings.vad_noise_margin_db if noise_margin_db is None else noise_margin_db
+        )
+        self.max_zcr = max_zcr
+        self.hangover_frames = hangover_frames
+
+        self.noise_floor_db: Optional[float] = None
+
+        # 统计
+        self.segments_checked = 0
+        self.last_speech_ratio = 0.0
+
+    def speech_ratio(self, segment: np.ndarray) -> float:
+        """
+        计算片段中语音帧的比例
+
+        Args:
+            segment: float32单声道音频（[-1, 1]）
+
+        Returns:
+            语音帧比例（0~1）
+        """
+        n_frames = len(segment) // self.frame_length
+        if n_frames == 0:
+            return 0.0
+
+        frames = segment[:n_frames * self.frame_length].reshape(n_frames, self.frame_length)
+
+        energy_db = 10.0 * np.log10(np.einsum("ij,ij->i", frames, frames) / self.frame_length + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.frame_length
+
+        # 自适应噪声底
+        floor = float(np.percentile(energy_db, 10))
+        if self.noise_floor_db is None or floor < self.noise_floor_db:
+            self.noise_floor_db = floor
+        else:
+            self.noise_floor_db += 0.05 * (floor - self.noise_floor_db)
+
+        threshold = max(self.energy_threshold_db, self.noise_floor_db + self.noise_margin_db)
+        speech = (energy_db > threshold) & (zcr <= self.max_zcr)
+
+        if self.hangover_frames > 0 and speech.any():
+            kernel = np.ones(2 * self.hangover_frames + 1)
+            speech = np.convolve(speech.astype(np.float32), kernel, mode="same") > 0
+
+        ratio = float(np.count_nonzero(speech)) / n_frames
+        self.segments_checked += 1
+        self.last_speech_ratio = ratio
+        return ratio
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取VAD统计信息"""
+        return {
+            "segments_checked": self.segments_checked,
+            "last_speech_ratio": round(self.last_speech_ratio, 3),
+            "noise_floor_db": round(self.noise_floor_db, 1) if self.noise_floor_db is not None else None,
+        }